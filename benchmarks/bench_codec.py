@@ -0,0 +1,43 @@
+import argparse
+import timeit
+from src.common.codec import CODEC_JSON, CODEC_BINARY
+from src.common.protocol import PacketProtocol, FrameDecoder
+
+MESSAGES = {
+    "REQUEST": {"type": "REQUEST", "sender": "node-17", "ts": 123456},
+    "REPLY": {"type": "REPLY", "sender": "node-17", "ts": 123457},
+    "SEAT_TAKEN": {"type": "SEAT_TAKEN", "seat_id": 42, "seat_owner": "node-17", "ts": 123458, "sender": "node-17"},
+    "STATE_REPLY": {"type": "STATE_REPLY", "seats": [None if i % 3 else f"node-{i % 7}" for i in range(2000)], "sender": "node-17"},
+}
+
+
+def bench(message: dict, codec: int, number: int):
+    frame = PacketProtocol.serialize(message, codec)
+    encode = timeit.timeit(lambda: PacketProtocol.serialize(message, codec), number=number)
+
+    decoder = FrameDecoder()
+
+    def decode():
+        decoder.feed(frame)
+        for _ in decoder.frames():
+            pass
+
+    decode_time = timeit.timeit(decode, number=number)
+    return len(frame), encode / number * 1e6, decode_time / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare JSON and binary wire codecs")
+    parser.add_argument("-n", "--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'message':<12} {'codec':<7} {'bytes':>7} {'encode us':>10} {'decode us':>10}")
+    for name, message in MESSAGES.items():
+        number = args.number if name != "STATE_REPLY" else max(1, args.number // 100)
+        for codec_name, codec in (("json", CODEC_JSON), ("binary", CODEC_BINARY)):
+            size, enc, dec = bench(message, codec, number)
+            print(f"{name:<12} {codec_name:<7} {size:>7} {enc:>10.2f} {dec:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+import argparse
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from src.nameserver.main import NameServerNode, AsyncNameServerNode
+from src.node.core import CinemaNode
+from src.node.claims import CLAIM_WINDOW
+from src.node.mutex import ALGORITHMS, DEFAULT_ALGORITHM
+from src.node.screening import DEFAULT_SHARD
+from src.common.models import MessageType
+
+WORKLOADS = ("uniform", "hot")
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+JOIN_TIMEOUT = 15.0
+OPERATION_TIMEOUT = 10.0
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class CountingNode(CinemaNode):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.received = 0
+        self.crashed = False
+        self._count_lock = threading.Lock()
+
+    def on_network_message(self, msg, sender_ip=None):
+        if msg.get("type") != MessageType.SYNC:
+            with self._count_lock:
+                self.received += 1
+        super().on_network_message(msg, sender_ip)
+
+
+class Client:
+    def __init__(self, node: CountingNode, args, seed: int):
+        self.node = node
+        self.args = args
+        self.rng = random.Random(seed)
+        self.latencies = []
+        self.reserved = 0
+        self.lost = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.hot = list(range(max(args.hot_seats, args.seats_per_request)))
+
+    def run(self, deadline):
+        while time.monotonic() < deadline and not self.node.crashed:
+            seat_ids = self._pick()
+            if seat_ids is None:
+                self.rejected += 1
+                time.sleep(0.001)
+                continue
+
+            start = time.perf_counter()
+            ok = self._call(self.node.reserve_seats, seat_ids)
+            if ok is None:
+                time.sleep(0.001)
+                continue
+            if not ok:
+                self.lost += 1
+                continue
+            self.latencies.append(time.perf_counter() - start)
+            self.reserved += 1
+            self._call(self.node.release_seats, seat_ids)
+            if self.args.think:
+                time.sleep(self.rng.uniform(0, self.args.think))
+
+    def _pick(self):
+        screening = self.node.screening()
+        seats, pending = screening.seats, screening.pending_seats()
+        k = self.args.seats_per_request
+        pool = self.hot if self.args.workload == "hot" and self.rng.random() < self.args.hot_fraction else range(len(seats))
+        free = [s for s in pool if seats[s] is None and s not in pending]
+        if len(free) < k:
+            return None
+        return self.rng.sample(free, k)
+
+    def _call(self, operation, seat_ids):
+        # None when the node could not even submit the operation or never finished it.
+        done = threading.Event()
+        result = []
+        if not operation(seat_ids, on_done=lambda ok: (result.append(ok), done.set())):
+            self.rejected += 1
+            return None
+        waited = 0.0
+        while not done.wait(0.1):
+            waited += 0.1
+            if self.node.crashed:
+                return None
+            if waited >= OPERATION_TIMEOUT:
+                self.timeouts += 1
+                return None
+        return result[0]
+
+
+def start_cluster(args):
+    ns_cls = AsyncNameServerNode if args.transport == "asyncio" else NameServerNode
+    nameserver = ns_cls("127.0.0.1", free_port())
+    threading.Thread(target=nameserver.start, daemon=True).start()
+    time.sleep(0.2)
+
+    shard = f"{DEFAULT_SHARD}:{args.seats}"
+    nodes = []
+    for i in range(args.nodes):
+        node = CountingNode(
+            f"bench{i:02}", free_port(), transport=args.transport, codec=args.codec, shards=[shard],
+            algorithm=args.algorithm, nameserver=(nameserver.host, nameserver.port), hold_time=args.hold,
+            trace_dir=args.trace_dir, optimistic=args.optimistic,
+            claim_window=args.claim_window, gossip_fanout=args.gossip_fanout
+        )
+        node.start()
+        nodes.append(node)
+
+    deadline = time.monotonic() + JOIN_TIMEOUT
+    while any(len(n.peer.get_known_peers()) < args.nodes for n in nodes):
+        if time.monotonic() > deadline:
+            raise RuntimeError("Nodes did not discover each other in time")
+        time.sleep(0.05)
+    return nameserver, nodes
+
+
+def crash_nodes(nodes, count):
+    for node in nodes[-count:]:
+        node.crashed = True
+        node.stop()
+
+
+def run(args) -> dict:
+    nameserver, nodes = start_cluster(args)
+    clients = [Client(node, args, args.seed + i) for i, node in enumerate(nodes)]
+    for node in nodes:
+        node.received = 0
+
+    start = time.monotonic()
+    deadline = start + args.duration
+    threads = [threading.Thread(target=c.run, args=(deadline,), daemon=True) for c in clients]
+    for t in threads:
+        t.start()
+    if args.crash:
+        timer = threading.Timer(args.crash_at, crash_nodes, args=(nodes, args.crash))
+        timer.daemon = True
+        timer.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - start
+
+    messages = sum(n.received for n in nodes)
+    for node in nodes:
+        if not node.crashed:
+            node.stop()
+    nameserver.stop()
+
+    latencies = [l for c in clients for l in c.latencies]
+    reserved = sum(c.reserved for c in clients)
+    return {
+        "config": vars(args),
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(time.time() - elapsed)),
+        "elapsed_s": round(elapsed, 3),
+        "reservations": reserved,
+        "lost_races": sum(c.lost for c in clients),
+        "rejected": sum(c.rejected for c in clients),
+        "timeouts": sum(c.timeouts for c in clients),
+        "reservations_per_s": round(reserved / elapsed, 2),
+        "time_to_acquire_ms": {
+            "p50": _ms(percentile(latencies, 0.50)),
+            "p99": _ms(percentile(latencies, 0.99)),
+            "max": _ms(max(latencies, default=None)),
+        },
+        # Every reservation is followed by a release round, which is counted too.
+        "messages": messages,
+        "messages_per_reservation": round(messages / reserved, 2) if reserved else None,
+        "node_stats": {node.node_id: node.stats() for node in nodes},
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reservation throughput and latency on a local cluster")
+    parser.add_argument("--nodes", type=int, default=4)
+    parser.add_argument("--seats", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load")
+    parser.add_argument("--workload", choices=WORKLOADS, default="uniform")
+    parser.add_argument("--hot-seats", type=int, default=3, help="size of the hot set for --workload hot")
+    parser.add_argument("--hot-fraction", type=float, default=0.8, help="share of requests aimed at the hot set")
+    parser.add_argument("--seats-per-request", type=int, default=1)
+    parser.add_argument("--think", type=float, default=0.0, help="max random pause between reservations, in seconds")
+    parser.add_argument("--hold", type=float, default=0.0, help="critical section hold time, in seconds")
+    parser.add_argument("--crash", type=int, default=0, help="number of nodes to stop during the run")
+    parser.add_argument("--crash-at", type=float, default=3.0, help="seconds into the run when nodes are stopped")
+    parser.add_argument("--transport", choices=["threads", "asyncio"], default="threads")
+    parser.add_argument("--codec", choices=["json", "binary"], default="binary")
+    parser.add_argument("--algorithm", choices=sorted(ALGORITHMS), default=DEFAULT_ALGORITHM)
+    parser.add_argument("--optimistic", action="store_true", help="claim uncontended seats without a mutex round; a booking can be overturned by an earlier claim arriving after the window")
+    parser.add_argument("--claim-window", type=float, default=CLAIM_WINDOW, help="optimistic claim window, in seconds")
+    parser.add_argument("--gossip-fanout", type=int, help="disseminate seat updates by gossip with this fan-out")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--trace-dir", help="record per-node message traces here (see src.analysis.critical_path)")
+    parser.add_argument("--output", help="JSON results file (default: benchmarks/results/<algorithm>-<workload>-<time>.json)")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+
+    results = run(args)
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{args.algorithm}-{args.workload}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    latency = results["time_to_acquire_ms"]
+    print(f"{results['reservations']} reservations in {results['elapsed_s']}s: {results['reservations_per_s']}/s")
+    print(f"time to acquire: p50 {latency['p50']} ms, p99 {latency['p99']} ms")
+    print(f"messages per reservation: {results['messages_per_reservation']}")
+    print(f"lost races {results['lost_races']}, rejected {results['rejected']}, timeouts {results['timeouts']}")
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
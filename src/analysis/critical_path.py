@@ -0,0 +1,226 @@
+import argparse
+import bisect
+import json
+import statistics
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from src.common.models import MessageType
+from src.common.trace import read_trace, SEND, RECV, STATE, TraceEvent
+
+# Wall times of different nodes are compared directly, so traces should come
+# from one host (or hosts with synchronised clocks). Lamport timestamps tie a
+# REQUEST to its round: every copy carries the requester's request_ts.
+STATE_LOOKBACK = 256
+
+
+class Hop:
+    def __init__(self, responder: str):
+        self.responder = responder
+        self.request_sent = None
+        self.request_received = None
+        self.reply_sent = None
+        self.reply_received = None
+        self.blocked_by = None
+
+    @property
+    def queueing(self) -> Optional[float]:
+        if self.request_received is None or self.reply_sent is None:
+            return None
+        return self.reply_sent - self.request_received
+
+    @property
+    def network(self) -> Optional[float]:
+        if None in (self.request_sent, self.request_received, self.reply_sent, self.reply_received):
+            return None
+        return (self.request_received - self.request_sent) + (self.reply_received - self.reply_sent)
+
+    def to_dict(self) -> dict:
+        return {
+            "responder": self.responder,
+            "queueing_ms": _ms(self.queueing),
+            "network_ms": _ms(self.network),
+            "reply_after_ms": None,
+            "blocked_by": self.blocked_by,
+        }
+
+
+class Round:
+    def __init__(self, node: str, key: str, ts: int, wanted: float):
+        self.node = node
+        self.key = key
+        self.ts = ts
+        self.wanted = wanted
+        self.held = None
+        self.released = None
+        self.hops: Dict[str, Hop] = {}
+
+    @property
+    def wait(self) -> Optional[float]:
+        return None if self.held is None else self.held - self.wanted
+
+    @property
+    def slowest(self) -> Optional[Hop]:
+        replied = [h for h in self.hops.values() if h.reply_received is not None]
+        return max(replied, key=lambda h: h.reply_received) if replied else None
+
+    def to_dict(self) -> dict:
+        slowest = self.slowest
+        hops = []
+        for hop in sorted(self.hops.values(), key=lambda h: h.reply_received or 0):
+            entry = hop.to_dict()
+            if hop.reply_received is not None:
+                entry["reply_after_ms"] = _ms(hop.reply_received - self.wanted)
+            hops.append(entry)
+        return {
+            "node": self.node,
+            "key": self.key,
+            "ts": self.ts,
+            "wait_ms": _ms(self.wait),
+            "slowest": slowest.responder if slowest else None,
+            "responders": hops,
+        }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+def overlaps(a: str, b: str) -> bool:
+    shard_a, _, res_a = a.partition("|")
+    shard_b, _, res_b = b.partition("|")
+    return shard_a == shard_b and bool(set(res_a.split(",")) & set(res_b.split(",")))
+
+
+def load(paths: List[str]) -> List[TraceEvent]:
+    events = []
+    for path in paths:
+        events.extend(read_trace(path))
+    events.sort(key=lambda e: e.wall)
+    return events
+
+
+def reconstruct(events: List[TraceEvent]) -> List[Round]:
+    # Events per (node, key) and state changes per node, both in wall-time order.
+    by_key = defaultdict(list)
+    states = defaultdict(list)
+    for event in events:
+        by_key[event.node, event.resource].append(event)
+        if event.kind == STATE:
+            states[event.node].append(event)
+
+    rounds = []
+    for node, node_states in states.items():
+        open_rounds = {}
+        for event in node_states:
+            if event.type == "WANTED":
+                open_rounds[event.resource] = Round(node, event.resource, event.ts, event.wall)
+            elif event.type == "HELD" and event.resource in open_rounds:
+                open_rounds[event.resource].held = event.wall
+            elif event.type == "RELEASED":
+                current = open_rounds.pop(event.resource, None)
+                if current is not None:
+                    current.released = event.wall
+                    rounds.append(current)
+        rounds.extend(open_rounds.values())
+
+    for r in rounds:
+        _trace_hops(r, by_key, states)
+    rounds.sort(key=lambda r: r.wanted)
+    return rounds
+
+
+def _since(events: List[TraceEvent], wall: float) -> int:
+    return bisect.bisect_left(events, wall, key=lambda e: e.wall)
+
+
+def _trace_hops(r: Round, by_key, states):
+    end = r.held if r.held is not None else float("inf")
+    own = by_key[r.node, r.key]
+    for event in own[_since(own, r.wanted):]:
+        if event.wall > end:
+            break
+        if event.kind == SEND and event.type == MessageType.REQUEST and event.ts == r.ts:
+            r.hops.setdefault(event.peer, Hop(event.peer)).request_sent = event.wall
+        elif event.kind == RECV and event.type == MessageType.REPLY:
+            # The last REPLY is the one the round actually waited for.
+            r.hops.setdefault(event.peer, Hop(event.peer)).reply_received = event.wall
+
+    for responder, hop in r.hops.items():
+        theirs = by_key.get((responder, r.key), [])
+        for event in theirs[_since(theirs, r.wanted):]:
+            if hop.request_received is None:
+                if event.kind == RECV and event.type == MessageType.REQUEST and event.peer == r.node and event.ts == r.ts:
+                    hop.request_received = event.wall
+                    hop.blocked_by = _state_at(states[responder], r.key, event.wall)
+            elif event.kind == SEND and event.type == MessageType.REPLY and event.peer == r.node:
+                hop.reply_sent = event.wall
+                break
+
+
+def _state_at(events: List[TraceEvent], key: str, wall: float) -> Optional[str]:
+    # The responder's own sections on an overlapping key when the REQUEST arrived;
+    # rounds are short, so looking back a few hundred state changes is enough.
+    end = bisect.bisect_right(events, wall, key=lambda e: e.wall)
+    current = {}
+    for event in events[max(0, end - STATE_LOOKBACK):end]:
+        if overlaps(event.resource, key):
+            current[event.resource] = event.type
+    active = [f"{state} {k}" for k, state in current.items() if state != "RELEASED"]
+    return ", ".join(active) or None
+
+
+def summarize(rounds: List[Round]) -> dict:
+    waits = [r.wait for r in rounds if r.wait is not None]
+    slowest = defaultdict(int)
+    queueing = []
+    network = []
+    for r in rounds:
+        hop = r.slowest
+        if hop is None:
+            continue
+        slowest[hop.responder] += 1
+        if hop.queueing is not None:
+            queueing.append(hop.queueing)
+        if hop.network is not None:
+            network.append(hop.network)
+    return {
+        "rounds": len(rounds),
+        "incomplete": len(rounds) - len(waits),
+        "wait_p50_ms": _ms(statistics.median(waits)) if waits else None,
+        "wait_max_ms": _ms(max(waits)) if waits else None,
+        "slowest_responder_counts": dict(sorted(slowest.items(), key=lambda kv: -kv[1])),
+        "critical_queueing_mean_ms": _ms(statistics.mean(queueing)) if queueing else None,
+        "critical_network_mean_ms": _ms(statistics.mean(network)) if network else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m src.analysis.critical_path", description="Critical-section rounds reconstructed from node traces")
+    parser.add_argument("traces", nargs="+", help="trace files written with --trace-dir, one per node")
+    parser.add_argument("--json", action="store_true", help="print rounds and summary as JSON")
+    parser.add_argument("--top", type=int, default=20, help="slowest rounds to list (0 for all)")
+    args = parser.parse_args()
+
+    rounds = reconstruct(load(args.traces))
+    summary = summarize(rounds)
+    listed = sorted(rounds, key=lambda r: -(r.wait or float("inf")))
+    if args.top:
+        listed = listed[:args.top]
+
+    if args.json:
+        print(json.dumps({"summary": summary, "rounds": [r.to_dict() for r in listed]}, indent=2))
+        return
+
+    for r in listed:
+        d = r.to_dict()
+        print(f"{d['node']} {d['key']} ts={d['ts']} wait={d['wait_ms']}ms slowest={d['slowest']}")
+        for hop in d["responders"]:
+            blocked = f" ({hop['blocked_by']})" if hop["blocked_by"] else ""
+            print(f"    {hop['responder']}: reply after {hop['reply_after_ms']}ms, "
+                  f"queued {hop['queueing_ms']}ms, network {hop['network_ms']}ms{blocked}")
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
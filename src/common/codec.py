@@ -0,0 +1,139 @@
+import struct
+import sys
+from array import array
+from typing import Optional
+from src.common.models import MessageType
+
+CODEC_JSON = 0
+CODEC_BINARY = 1
+# A batch payload is a run of complete JSON/binary frames, header included.
+CODEC_BATCH = 2
+CODEC_NAMES = {"json": CODEC_JSON, "binary": CODEC_BINARY, "batch": CODEC_BATCH}
+
+# Seat owners are indexes into the interned owner table; -1 marks a free seat so
+# that decoding can index a table with None appended at the end.
+NO_OWNER = -1
+
+
+class _Record:
+    def __init__(self, code: int, msg_type: str, int_fields: tuple, str_fields: tuple):
+        self.code = code
+        self.msg_type = msg_type
+        self.int_fields = int_fields
+        self.str_fields = str_fields
+        self.keys = frozenset(("type",) + int_fields + str_fields)
+        # ts is unsigned, every other integer field is a signed 32-bit value.
+        self.struct = struct.Struct(">B" + "".join("Q" if f == "ts" else "i" for f in int_fields))
+
+
+RECORDS = [
+    _Record(1, MessageType.REQUEST, ("ts",), ("sender",)),
+    _Record(2, MessageType.REPLY, ("ts",), ("sender",)),
+    _Record(3, MessageType.SEAT_TAKEN, ("ts", "seat_id"), ("sender", "seat_owner")),
+    _Record(4, MessageType.SEAT_FREED, ("ts", "seat_id"), ("sender",)),
+    _Record(6, MessageType.REQUEST, ("ts",), ("sender", "resource")),
+    _Record(7, MessageType.REPLY, ("ts",), ("sender", "resource")),
+    _Record(8, MessageType.REQUEST, ("ts",), ("sender", "resource", "shard")),
+    _Record(9, MessageType.REPLY, ("ts",), ("sender", "resource", "shard")),
+    _Record(10, MessageType.SEAT_TAKEN, ("ts", "seat_id"), ("sender", "seat_owner", "shard")),
+    _Record(11, MessageType.SEAT_FREED, ("ts", "seat_id"), ("sender", "shard")),
+]
+STATE_REPLY_CODE = 5
+
+_BY_SHAPE = {(r.msg_type, r.keys): r for r in RECORDS}
+_BY_CODE = {r.code: r for r in RECORDS}
+_STATE_HEADER = struct.Struct(">BHI")
+
+
+class BinaryCodec:
+
+    @staticmethod
+    def encode(message: dict) -> Optional[bytes]:
+        msg_type = message.get("type")
+        if msg_type == MessageType.STATE_REPLY and message.keys() == {"type", "seats", "sender"}:
+            return BinaryCodec._encode_state(message)
+
+        record = _BY_SHAPE.get((msg_type, frozenset(message)))
+        if record is None:
+            return None
+        try:
+            parts = [record.struct.pack(record.code, *(message[f] for f in record.int_fields))]
+            for field in record.str_fields:
+                parts.append(_pack_str(message[field]))
+        except (struct.error, TypeError, ValueError):
+            return None
+        return b"".join(parts)
+
+    @staticmethod
+    def decode(payload) -> dict:
+        payload = bytes(payload)
+        code = payload[0]
+        if code == STATE_REPLY_CODE:
+            return BinaryCodec._decode_state(payload)
+
+        record = _BY_CODE.get(code)
+        if record is None:
+            raise ValueError(f"Unknown record code {code}")
+        values = record.struct.unpack_from(payload)
+        message = {"type": record.msg_type}
+        message.update(zip(record.int_fields, values[1:]))
+        offset = record.struct.size
+        for field in record.str_fields:
+            message[field], offset = _unpack_str(payload, offset)
+        return message
+
+    @staticmethod
+    def _encode_state(message: dict) -> Optional[bytes]:
+        seats = message["seats"]
+        owners = {}
+        try:
+            indexes = array("h", [NO_OWNER if o is None else owners.setdefault(o, len(owners)) for o in seats])
+        except (TypeError, OverflowError):
+            return None
+        if not all(isinstance(o, str) for o in owners):
+            return None
+        if sys.byteorder == "little":
+            indexes.byteswap()
+        try:
+            parts = [_STATE_HEADER.pack(STATE_REPLY_CODE, len(owners), len(seats)), _pack_str(message["sender"])]
+            parts.extend(_pack_str(owner) for owner in owners)
+        except (struct.error, TypeError, ValueError):
+            return None
+        parts.append(indexes.tobytes())
+        return b"".join(parts)
+
+    @staticmethod
+    def _decode_state(payload: bytes) -> dict:
+        _, owner_count, seat_count = _STATE_HEADER.unpack_from(payload)
+        sender, offset = _unpack_str(payload, _STATE_HEADER.size)
+        owners = []
+        for _ in range(owner_count):
+            owner, offset = _unpack_str(payload, offset)
+            owners.append(owner)
+        owners.append(None)
+
+        indexes = array("h")
+        indexes.frombytes(payload[offset:offset + 2 * seat_count])
+        if len(indexes) != seat_count:
+            raise ValueError("Truncated seat table")
+        if sys.byteorder == "little":
+            indexes.byteswap()
+        if indexes and min(indexes) < NO_OWNER:
+            raise ValueError("Seat owner index out of range")
+        seats = [owners[i] for i in indexes]
+        return {"type": MessageType.STATE_REPLY, "seats": seats, "sender": sender}
+
+
+def _pack_str(value: str) -> bytes:
+    if not isinstance(value, str):
+        raise TypeError("String field expected")
+    raw = value.encode("utf-8")
+    if len(raw) > 255:
+        raise ValueError("String field too long for binary record")
+    return bytes((len(raw),)) + raw
+
+
+def _unpack_str(payload: bytes, offset: int):
+    length = payload[offset]
+    start = offset + 1
+    return payload[start:start + length].decode("utf-8"), start + length
@@ -0,0 +1,132 @@
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+
+# Histogram buckets: 10us up to ~40s in steps of 2^(1/4) (about 19%), plus an overflow bucket.
+BUCKET_BOUNDS = tuple(1e-5 * 2 ** (i / 4) for i in range(89))
+DUMP_INTERVAL = 10.0
+
+logger = logging.getLogger("Metrics")
+
+
+class Histogram:
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        # Upper bound of the bucket holding the q-th observation, capped at the max seen.
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= rank:
+                return min(BUCKET_BOUNDS[i], self.max) if i < len(BUCKET_BOUNDS) else self.max
+        return self.max
+
+    def summary(self) -> dict:
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 3),
+            "p50_ms": round(self.quantile(0.50) * 1000, 3),
+            "p90_ms": round(self.quantile(0.90) * 1000, 3),
+            "p99_ms": round(self.quantile(0.99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class Metrics:
+    def __init__(self):
+        self.started = time.monotonic()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def count(self, name: str, label: str = None, n: int = 1):
+        with self._lock:
+            if label is None:
+                self._counters[name] = self._counters.get(name, 0) + n
+            else:
+                labels = self._counters.setdefault(name, {})
+                labels[label] = labels.get(label, 0) + n
+
+    def gauge(self, name: str, value: float):
+        with self._lock:
+            current = self._gauges.get(name)
+            peak = value if current is None else max(current[1], value)
+            self._gauges[name] = (value, peak)
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "uptime_s": round(time.monotonic() - self.started, 3),
+                "counters": {k: dict(v) if isinstance(v, dict) else v for k, v in self._counters.items()},
+                "gauges": {k: {"value": v, "max": peak} for k, (v, peak) in self._gauges.items()},
+                "histograms": {k: h.summary() for k, h in self._histograms.items()},
+            }
+
+
+class NullMetrics(Metrics):
+    def count(self, name, label=None, n=1):
+        pass
+
+    def gauge(self, name, value):
+        pass
+
+    def observe(self, name, seconds):
+        pass
+
+
+NO_METRICS = NullMetrics()
+
+
+class MetricsDumper:
+    def __init__(self, metrics: Metrics, path: str, interval: float = DUMP_INTERVAL, extra: dict = None):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.extra = extra or {}
+        self._stop = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        self.dump()
+
+    def dump(self):
+        # Written aside and renamed, so readers never see a half-written file.
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(dict(self.extra, **self.metrics.snapshot()), f, indent=2)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning(f"Could not write stats to {self.path}: {e}")
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.dump()
@@ -14,7 +14,21 @@ class MessageType:
     REQUEST = "REQUEST"
     REPLY = "REPLY"
     RELEASE = "RELEASE"
+    INQUIRE = "INQUIRE"
+    YIELD = "YIELD"
+    FAILED = "FAILED"
+    TOKEN = "TOKEN"
+    TOKEN_PROBE = "TOKEN_PROBE"
+    TOKEN_STATUS = "TOKEN_STATUS"
     SYNC = "SYNC"       
     SEAT_TAKEN = "SEAT_TAKEN"
+    SEAT_FREED = "SEAT_FREED"
+    SEAT_CLAIMED = "SEAT_CLAIMED"
+    REGISTER = "REGISTER"
+    HEARTBEAT = "HEARTBEAT"
     STATE_REQUEST = "STATE_REQUEST" 
-    STATE_REPLY = "STATE_REPLY"      
\ No newline at end of file
+    STATE_REPLY = "STATE_REPLY"
+    STATE_DELTA = "STATE_DELTA"
+    STATE_DIGEST = "STATE_DIGEST"
+    STATE_REPAIR = "STATE_REPAIR"
+    GOSSIP = "GOSSIP"      
\ No newline at end of file
@@ -1,21 +1,82 @@
 import json
 import struct
-from typing import Tuple, Optional
+from typing import Iterator, Tuple, Optional
+from src.common.codec import BinaryCodec, CODEC_JSON, CODEC_BINARY, CODEC_BATCH
+
+# The header is a 32-bit word: the top byte selects the payload codec and the
+# low 24 bits hold the payload length. JSON frames keep a zero top byte, so they
+# are byte-for-byte identical to the original length-prefixed format.
+HEADER = struct.Struct('>I')
+LENGTH_MASK = 0xFFFFFF
+MAX_FRAME_SIZE = LENGTH_MASK
+RECV_SIZE = 65536
+
+
+class ProtocolError(ValueError):
+    pass
+
+
+class FrameTooLarge(ProtocolError):
+    pass
+
+
+class MalformedFrame(ProtocolError):
+    pass
+
 
 class PacketProtocol:
     
     @staticmethod
-    def serialize(message: dict) -> bytes:
+    def serialize(message: dict, codec: int = CODEC_JSON) -> bytes:
+        if codec == CODEC_BINARY:
+            payload = BinaryCodec.encode(message)
+            if payload is not None:
+                return HEADER.pack(CODEC_BINARY << 24 | len(payload)) + payload
+
         json_bytes = json.dumps(message).encode('utf-8')
-        header = struct.pack('>I', len(json_bytes))
+        if len(json_bytes) > MAX_FRAME_SIZE:
+            raise FrameTooLarge(f"Frame of {len(json_bytes)} bytes exceeds {MAX_FRAME_SIZE}")
+        header = HEADER.pack(len(json_bytes))
         return header + json_bytes
 
+    @staticmethod
+    def batch(frames: list) -> list:
+        # Packs already serialized frames into as few batch frames as fit.
+        if len(frames) == 1:
+            return frames
+        batches, run, size = [], [], 0
+        for frame in frames:
+            if run and size + len(frame) > MAX_FRAME_SIZE:
+                batches.append(run)
+                run, size = [], 0
+            run.append(frame)
+            size += len(frame)
+        batches.append(run)
+        return [run[0] if len(run) == 1 else HEADER.pack(CODEC_BATCH << 24 | sum(map(len, run))) + b"".join(run) for run in batches]
+
+    @staticmethod
+    def unpack_batch(payload) -> list:
+        messages = []
+        offset = 0
+        while offset < len(payload):
+            if len(payload) - offset < HEADER.size:
+                raise MalformedFrame("Truncated frame header in batch")
+            word = HEADER.unpack_from(payload, offset)[0]
+            codec, length = word >> 24, word & LENGTH_MASK
+            begin = offset + HEADER.size
+            offset = begin + length
+            if codec == CODEC_BATCH or offset > len(payload):
+                raise MalformedFrame("Invalid frame in batch")
+            messages.append(PacketProtocol.decode_payload(payload[begin:offset], codec))
+        return messages
+
     @staticmethod
     def deserialize(buffer: bytes) -> Tuple[Optional[dict], bytes]:
         if len(buffer) < 4:
             return None, buffer
         
-        msg_length = struct.unpack('>I', buffer[:4])[0]
+        word = HEADER.unpack_from(buffer)[0]
+        codec, msg_length = word >> 24, word & LENGTH_MASK
         total_length = 4 + msg_length
         
         if len(buffer) < total_length:
@@ -24,8 +85,84 @@ class PacketProtocol:
         payload = buffer[4:total_length]
         remainder = buffer[total_length:]
         
-        try:
-            message = json.loads(payload.decode('utf-8'))
-            return message, remainder
-        except json.JSONDecodeError:
-            return None, buffer
\ No newline at end of file
+        return PacketProtocol.decode_payload(payload, codec), remainder
+
+    @staticmethod
+    def decode_payload(payload, codec: int = CODEC_JSON) -> dict:
+        if codec == CODEC_JSON:
+            try:
+                return json.loads(payload)
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                raise MalformedFrame(f"Invalid JSON payload: {e}") from e
+        if codec == CODEC_BINARY:
+            try:
+                return BinaryCodec.decode(payload)
+            except (struct.error, IndexError, ValueError) as e:
+                raise MalformedFrame(f"Invalid binary payload: {e}") from e
+        raise MalformedFrame(f"Unknown codec {codec}")
+
+
+class FrameDecoder:
+    def __init__(self, max_frame_size: int = MAX_FRAME_SIZE, initial_size: int = 0):
+        self.max_frame_size = max_frame_size
+        self._buf = bytearray(initial_size)
+        self._start = 0
+        self._end = 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    def recv_into(self, sock) -> int:
+        self._reserve(max(RECV_SIZE, self._pending_frame_size()))
+        with memoryview(self._buf) as view:
+            n = sock.recv_into(view[self._end:])
+        self._end += n
+        return n
+
+    def feed(self, data: bytes):
+        self._reserve(len(data))
+        self._buf[self._end:self._end + len(data)] = data
+        self._end += len(data)
+
+    def frames(self) -> Iterator[dict]:
+        # A MalformedFrame is raised after the bad frame has been consumed,
+        # so calling frames() again resumes at the next frame.
+        while True:
+            available = self._end - self._start
+            if available < HEADER.size:
+                break
+            word = HEADER.unpack_from(self._buf, self._start)[0]
+            codec, length = word >> 24, word & LENGTH_MASK
+            if codec not in (CODEC_JSON, CODEC_BINARY, CODEC_BATCH):
+                raise ProtocolError(f"Unknown codec {codec} in frame header")
+            if length > self.max_frame_size:
+                raise FrameTooLarge(f"Frame of {length} bytes exceeds {self.max_frame_size}")
+            if available < HEADER.size + length:
+                break
+
+            begin = self._start + HEADER.size
+            self._start = begin + length
+            if self._start == self._end:
+                self._start = self._end = 0
+            if codec == CODEC_BATCH:
+                yield from PacketProtocol.unpack_batch(self._buf[begin:begin + length])
+            else:
+                yield PacketProtocol.decode_payload(self._buf[begin:begin + length], codec)
+
+    def _pending_frame_size(self) -> int:
+        if self._end - self._start < HEADER.size:
+            return 0
+        length = HEADER.unpack_from(self._buf, self._start)[0] & LENGTH_MASK
+        if length > self.max_frame_size:
+            return 0
+        return HEADER.size + length - (self._end - self._start)
+
+    def _reserve(self, needed: int):
+        if len(self._buf) - self._end >= needed:
+            return
+        unread = self._end - self._start
+        if self._start:
+            self._buf[:unread] = self._buf[self._start:self._end]
+            self._start, self._end = 0, unread
+        if len(self._buf) - unread < needed:
+            self._buf.extend(bytes(max(needed, len(self._buf))))
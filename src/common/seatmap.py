@@ -0,0 +1,132 @@
+import struct
+import sys
+from array import array
+from typing import Iterator, List, Optional, Tuple
+
+_HEADER = struct.Struct(">IH")
+_BIG_ENDIAN = sys.byteorder == "big"
+
+NO_VERSION = (0, "")
+
+
+class SeatMap:
+    def __init__(self, size: int):
+        self.size = size
+        # Owner and version-origin columns hold indexes into the interned name
+        # table; index 0 is reserved for "no owner".
+        self._names: List[Optional[str]] = [None]
+        self._name_index = {None: 0}
+        self._owners = array("H", bytes(2 * size))
+        self._version_ts = array("Q", bytes(8 * size))
+        self._version_origin = array("H", bytes(2 * size))
+        self._free = bytearray(b"\xff" * ((size + 7) // 8))
+        if size % 8:
+            self._free[-1] = (1 << (size % 8)) - 1
+        self._free_count = size
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, seat_id: int) -> Optional[str]:
+        return self._names[self._owners[seat_id]]
+
+    def __setitem__(self, seat_id: int, owner: Optional[str]):
+        self.set(seat_id, owner)
+
+    def __iter__(self) -> Iterator[Optional[str]]:
+        names = self._names
+        return (names[i] for i in self._owners)
+
+    def set(self, seat_id: int, owner: Optional[str], version: Tuple[int, str] = None):
+        was_free = self._owners[seat_id] == 0
+        self._owners[seat_id] = self._intern(owner)
+        is_free = owner is None
+        if was_free != is_free:
+            byte, bit = divmod(seat_id, 8)
+            self._free[byte] ^= 1 << bit
+            self._free_count += 1 if is_free else -1
+        if version is not None:
+            self._version_ts[seat_id] = version[0]
+            self._version_origin[seat_id] = self._intern(version[1])
+
+    def version(self, seat_id: int) -> Tuple[int, str]:
+        origin = self._names[self._version_origin[seat_id]]
+        return (self._version_ts[seat_id], origin or "")
+
+    def is_free(self, seat_id: int) -> bool:
+        return self._owners[seat_id] == 0
+
+    def free_count(self) -> int:
+        return self._free_count
+
+    def free_seats(self) -> Iterator[int]:
+        for byte_index, byte in enumerate(self._free):
+            while byte:
+                low = byte & -byte
+                yield byte_index * 8 + low.bit_length() - 1
+                byte ^= low
+
+    def owned_by(self, owner: str) -> List[int]:
+        index = self._name_index.get(owner)
+        if index is None:
+            return []
+        return [seat_id for seat_id, o in enumerate(self._owners) if o == index]
+
+    def to_bytes(self) -> bytes:
+        parts = [_HEADER.pack(self.size, len(self._names) - 1)]
+        for name in self._names[1:]:
+            raw = name.encode("utf-8")
+            parts.append(struct.pack(">H", len(raw)) + raw)
+        for column in (self._owners, self._version_ts, self._version_origin):
+            if _BIG_ENDIAN:
+                parts.append(column.tobytes())
+            else:
+                swapped = array(column.typecode, column)
+                swapped.byteswap()
+                parts.append(swapped.tobytes())
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SeatMap":
+        size, name_count = _HEADER.unpack_from(data)
+        seat_map = cls(size)
+        offset = _HEADER.size
+        for _ in range(name_count):
+            (length,) = struct.unpack_from(">H", data, offset)
+            offset += 2
+            seat_map._intern(data[offset:offset + length].decode("utf-8"))
+            offset += length
+
+        columns = []
+        for typecode in ("H", "Q", "H"):
+            column = array(typecode)
+            end = offset + column.itemsize * size
+            column.frombytes(data[offset:end])
+            if len(column) != size:
+                raise ValueError("Truncated seat map")
+            if not _BIG_ENDIAN:
+                column.byteswap()
+            columns.append(column)
+            offset = end
+
+        owners, version_ts, version_origin = columns
+        if owners and max(max(owners), max(version_origin)) >= len(seat_map._names):
+            raise ValueError("Seat map references an unknown owner")
+        seat_map._owners, seat_map._version_ts, seat_map._version_origin = owners, version_ts, version_origin
+        seat_map._free = bytearray(len(seat_map._free))
+        seat_map._free_count = 0
+        for seat_id, owner in enumerate(owners):
+            if owner == 0:
+                seat_map._free[seat_id >> 3] |= 1 << (seat_id & 7)
+                seat_map._free_count += 1
+        return seat_map
+
+    def _intern(self, name: Optional[str]) -> int:
+        index = self._name_index.get(name)
+        if index is None:
+            index = len(self._names)
+            if index > 0xFFFF:
+                raise OverflowError("Too many distinct seat owners")
+            self._names.append(name)
+            self._name_index[name] = index
+        return index
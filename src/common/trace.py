@@ -0,0 +1,145 @@
+import struct
+import threading
+import time
+from typing import List, NamedTuple
+
+# File layout: MAGIC, then the node id as a string body, then records.
+# Strings (message types, peers, resources) are interned: the first use
+# writes an 'S' record, later events refer to it by number.
+MAGIC = b"DSTR\x01"
+STRING = struct.Struct("<HH")
+EVENT = struct.Struct("<BqdHHH")
+FLUSH_SIZE = 64 * 1024
+
+SEND = 1
+RECV = 2
+STATE = 3
+KIND_NAMES = {SEND: "send", RECV: "recv", STATE: "state"}
+
+
+class TraceEvent(NamedTuple):
+    node: str
+    kind: int
+    ts: int
+    wall: float
+    type: str
+    peer: str
+    resource: str
+
+
+def trace_key(shard, resource) -> str:
+    if isinstance(resource, (list, tuple)):
+        resource = ",".join(sorted(str(r) for r in resource))
+    return f"{shard or ''}|{resource if resource is not None else ''}"
+
+
+class TraceRecorder:
+    def __init__(self, node_id: str, path: str):
+        self.node_id = node_id
+        self.path = path
+        self._strings = {"": 0}
+        self._buf = bytearray(MAGIC)
+        self._write_string(node_id.encode("utf-8"))
+        self._file = open(path, "wb")
+        self._lock = threading.Lock()
+
+    def message(self, kind: int, msg: dict, peer: str):
+        self.record(kind, msg.get("ts", 0), msg.get("type"), peer, trace_key(msg.get("shard"), msg.get("resource")))
+
+    def state(self, state: str, ts: int, key: str):
+        self.record(STATE, ts, state, None, key)
+
+    def record(self, kind: int, ts: int, msg_type, peer, key: str):
+        wall = time.time()
+        with self._lock:
+            self._buf += EVENT.pack(kind, ts or 0, wall, self._intern(msg_type), self._intern(peer), self._intern(key))
+            if len(self._buf) >= FLUSH_SIZE:
+                self._flush()
+
+    def for_shard(self, shard: str) -> "ShardTrace":
+        return ShardTrace(self, shard)
+
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            self._flush()
+            self._file.close()
+
+    def _intern(self, value) -> int:
+        if not value:
+            return 0
+        sid = self._strings.get(value)
+        if sid is None:
+            if len(self._strings) > 0xFFFF:
+                return 0
+            sid = self._strings[value] = len(self._strings)
+            self._buf += b"S"
+            self._write_string(str(value).encode("utf-8"), sid)
+        return sid
+
+    def _write_string(self, data: bytes, sid: int = 0):
+        self._buf += STRING.pack(sid, len(data)) + data
+
+    def _flush(self):
+        if self._buf and not self._file.closed:
+            self._file.write(self._buf)
+            self._file.flush()
+        self._buf = bytearray()
+
+
+class ShardTrace:
+    # What an algorithm instance sees: state changes keyed like its shard's messages.
+    def __init__(self, recorder: TraceRecorder, shard: str):
+        self.recorder = recorder
+        self.shard = shard
+
+    def state(self, state: str, ts: int, resource):
+        self.recorder.state(state, ts, trace_key(self.shard, resource))
+
+
+class NullTrace:
+    def message(self, kind, msg, peer):
+        pass
+
+    def for_shard(self, shard):
+        return self
+
+    def state(self, state, ts, resource):
+        pass
+
+    def close(self):
+        pass
+
+
+NO_TRACE = NullTrace()
+
+
+def read_trace(path: str) -> List[TraceEvent]:
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        raise ValueError(f"{path} is not a trace file")
+
+    pos = len(MAGIC)
+    _, length = STRING.unpack_from(data, pos)
+    pos += STRING.size
+    node = data[pos:pos + length].decode("utf-8")
+    pos += length
+
+    strings = {0: ""}
+    events = []
+    while pos < len(data):
+        tag = data[pos:pos + 1]
+        if tag == b"S":
+            sid, length = STRING.unpack_from(data, pos + 1)
+            pos += 1 + STRING.size
+            strings[sid] = data[pos:pos + length].decode("utf-8")
+            pos += length
+        else:
+            if pos + EVENT.size > len(data):
+                break  # Truncated by a crash mid-write.
+            kind, ts, wall, type_id, peer_id, key_id = EVENT.unpack_from(data, pos)
+            pos += EVENT.size
+            events.append(TraceEvent(node, kind, ts, wall, strings[type_id], strings[peer_id], strings[key_id]))
+    return events
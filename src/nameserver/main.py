@@ -1,28 +1,44 @@
 import socket
 import threading
 import logging
+import argparse
+import asyncio
 import sys
-from src.common.protocol import PacketProtocol
+import time
+from concurrent.futures import ThreadPoolExecutor
+from src.common.protocol import PacketProtocol, FrameDecoder, RECV_SIZE
+from src.common.models import MessageType
 from src.nameserver.server import NameServerLogic
+from src.common.metrics import Metrics, MetricsDumper, DUMP_INTERVAL
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("NameServerNode")
 
 HOST = "127.0.0.1"
 PORT = 5000
+SEND_TIMEOUT = 2.0
+DELIVERY_WORKERS = 16
+LEASE_CHECK_INTERVAL = 1.0
 
 class NameServerNode:
-    def __init__(self):
+    def __init__(self, host=HOST, port=PORT):
+        self.host = host
+        self.port = port
         self.logic = NameServerLogic()
+        self.metrics = Metrics()
         self.running = False
+        self._socket = None
+        self._fanout = ThreadPoolExecutor(max_workers=DELIVERY_WORKERS, thread_name_prefix="ns-fanout")
         
     def start(self):
         self.running = True
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
             s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            s.bind((HOST, PORT))
+            s.bind((self.host, self.port))
             s.listen(5)
-            logger.info(f"NameServer running on {HOST}:{PORT}")
+            self._socket = s
+            logger.info(f"NameServer running on {self.host}:{self.port}")
+            threading.Thread(target=self._expiry_loop, daemon=True).start()
             
             while self.running:
                 try:
@@ -31,55 +47,193 @@ class NameServerNode:
                 except KeyboardInterrupt:
                     break
                 except Exception as e:
+                    if not self.running:
+                        break
                     logger.error(f"Accept error: {e}")
 
+    def stop(self):
+        self.running = False
+        if self._socket:
+            try:
+                self._socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._socket.close()
+        self._fanout.shutdown(wait=False, cancel_futures=True)
+
     def _handle_client(self, conn):
+        decoder = FrameDecoder()
         with conn:
             try:
-                chunk = conn.recv(4096)
-                if not chunk: return
-                msg, _ = PacketProtocol.deserialize(chunk)
-                
-                if not msg: return
-                
-                msg_type = msg.get("type")
-                
-                if msg_type == "REGISTER":
-                    node_id = msg.get("node_id")
-                    port = msg.get("listening_port")
-                    host = "127.0.0.1" 
-                    
-                    self.logic.register_peer(node_id, host, port)
-                    
-                    self._broadcast_update()
+                while decoder.recv_into(conn):
+                    for msg in decoder.frames():
+                        self._handle_message(msg)
                     
             except Exception as e:
                 logger.error(f"Handler error: {e}")
 
-    def _broadcast_update(self):
-        peers = self.logic.get_peers()
-        logger.info(f"Broadcasting update to {len(peers)} peers")
+    def _handle_message(self, msg):
+        msg_type = msg.get("type")
+        self.metrics.count("messages_received", msg_type)
         
-        update_msg = {
-            "type": "SYNC",
-            "peers": peers
-        }
+        if msg_type == MessageType.REGISTER:
+            self._register(msg)
+
+        elif msg_type == MessageType.HEARTBEAT:
+            node_id = msg.get("node_id")
+            version = msg.get("directory_version")
+            if not self.logic.renew(node_id, version):
+                logger.info(f"Heartbeat from unknown peer {node_id}, registering it")
+                self._register(msg)
+            elif version is not None and version < self.logic.version:
+                self._deliver(self.logic.sync_messages(MessageType.SYNC, [node_id]))
+
+    def _register(self, msg):
+        node_id = msg.get("node_id")
+        port = msg.get("listening_port")
+        host = "127.0.0.1" 
         
-        for pid, info in peers.items():
-            try:
-                self._send_packet(info['host'], info['port'], update_msg)
-            except Exception as e:
-                logger.warning(f"Failed to update peer {pid}: {e}")
-                
-    def _send_packet(self, host, port, msg):
+        changed = self.logic.register_peer(node_id, host, port, msg.get("codecs"), msg.get("shards"), msg.get("directory_version"))
+
+        if changed:
+            self._broadcast_update()
+        else:
+            self._deliver(self.logic.sync_messages(MessageType.SYNC, [node_id]))
+
+    def _expiry_loop(self):
+        while self.running:
+            time.sleep(LEASE_CHECK_INTERVAL)
+            self._expire_leases()
+
+    def _expire_leases(self):
+        expired = self.logic.expire()
+        if expired:
+            self.metrics.count("lease_expiries", n=len(expired))
+            logger.warning(f"Lease expired for {', '.join(expired)}")
+            self._broadcast_update()
+
+    def _broadcast_update(self):
+        packets = self.logic.sync_messages(MessageType.SYNC)
+        logger.info(f"Broadcasting directory v{self.logic.version} to {len(packets)} peers")
+        self._deliver(packets)
+
+    def _deliver(self, packets):
+        if not packets:
+            return
+        frames = {}
+        fanout = _Fanout(len(packets), self.metrics)
+        for pid, host, port, msg in packets:
+            if id(msg) not in frames:
+                frames[id(msg)] = PacketProtocol.serialize(msg)
+            future = self._fanout.submit(self._send_packet, host, port, frames[id(msg)])
+            future.add_done_callback(lambda f, pid=pid, msg=msg: (self._delivered(pid, msg, f.exception()), fanout.done()))
+
+    def _delivered(self, pid, msg, error):
+        self.metrics.count("syncs_sent" if error is None else "sync_failures")
+        if error is not None:
+            logger.warning(f"Failed to update peer {pid}: {error}")
+        elif "version" in msg:
+            self.logic.acknowledge(pid, msg["version"])
+
+    def _send_packet(self, host, port, data):
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.settimeout(2.0)
+            s.settimeout(SEND_TIMEOUT)
             s.connect((host, port))
-            s.sendall(PacketProtocol.serialize(msg))
+            s.sendall(data)
+
+
+class _Fanout:
+    # Times one SYNC fan-out, from submission until the last delivery settles.
+    def __init__(self, pending, metrics):
+        self.pending = pending
+        self.metrics = metrics
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def done(self):
+        with self._lock:
+            self.pending -= 1
+            finished = self.pending == 0
+        if finished:
+            self.metrics.observe("sync_fanout", time.perf_counter() - self.started)
+
+
+class AsyncNameServerNode(NameServerNode):
+    def start(self):
+        self.running = True
+        asyncio.run(self._serve())
+
+    async def _serve(self):
+        server = await asyncio.start_server(self._handle_connection, self.host, self.port, reuse_address=True)
+        logger.info(f"NameServer running on {self.host}:{self.port} (asyncio)")
+        asyncio.get_running_loop().create_task(self._expiry_task())
+        async with server:
+            await server.serve_forever()
+
+    async def _handle_connection(self, reader, writer):
+        decoder = FrameDecoder()
+        try:
+            while True:
+                chunk = await reader.read(RECV_SIZE)
+                if not chunk:
+                    break
+                decoder.feed(chunk)
+                for msg in decoder.frames():
+                    self._handle_message(msg)
+        except Exception as e:
+            logger.error(f"Handler error: {e}")
+        finally:
+            writer.close()
+
+    async def _expiry_task(self):
+        while self.running:
+            await asyncio.sleep(LEASE_CHECK_INTERVAL)
+            self._expire_leases()
+
+    def _deliver(self, packets):
+        asyncio.get_running_loop().create_task(self._deliver_async(packets))
+
+    async def _deliver_async(self, packets):
+        if not packets:
+            return
+        started = time.perf_counter()
+        frames = {}
+        for _, _, _, msg in packets:
+            if id(msg) not in frames:
+                frames[id(msg)] = PacketProtocol.serialize(msg)
+        await asyncio.gather(*(self._send_packet_async(pid, host, port, msg, frames[id(msg)]) for pid, host, port, msg in packets))
+        self.metrics.observe("sync_fanout", time.perf_counter() - started)
+
+    async def _send_packet_async(self, pid, host, port, msg, data):
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), SEND_TIMEOUT)
+            writer.write(data)
+            await asyncio.wait_for(writer.drain(), SEND_TIMEOUT)
+            writer.close()
+        except Exception as e:
+            self._delivered(pid, msg, e)
+        else:
+            self._delivered(pid, msg, None)
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="DS-Cinema NameServer")
+    parser.add_argument("--transport", choices=["threads", "asyncio"], default="threads")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--stats-file", metavar="PATH", help="periodically dump runtime metrics as JSON to this file")
+    parser.add_argument("--stats-interval", type=float, default=DUMP_INTERVAL, metavar="SECONDS")
+    args = parser.parse_args()
+
+    ns_cls = AsyncNameServerNode if args.transport == "asyncio" else NameServerNode
+    ns = ns_cls(args.host, args.port)
+    dumper = MetricsDumper(ns.metrics, args.stats_file, args.stats_interval, {"role": "nameserver"}) if args.stats_file else None
     try:
-        ns = NameServerNode()
+        if dumper:
+            dumper.start()
         ns.start()
     except KeyboardInterrupt:
-        print("\nShutting down NameServer...")
\ No newline at end of file
+        print("\nShutting down NameServer...")
+    finally:
+        if dumper:
+            dumper.stop()
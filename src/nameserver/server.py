@@ -1,23 +1,122 @@
 import logging
 import threading
+import time
+from collections import deque
+from typing import Optional
+
+HISTORY_SIZE = 256
+LEASE_DURATION = 6.0
 
 class NameServerLogic:
-    def __init__(self):
+    def __init__(self, history_size: int = HISTORY_SIZE, lease_duration: float = LEASE_DURATION, clock=time.monotonic):
         self._peers = {}
         self._lock = threading.Lock()
         self.logger = logging.getLogger("NameServer")
 
-    def register_peer(self, node_id: str, host: str, port: int):
+        self.version = 0
+        self.history_size = history_size
+        # (version, node_id, info) for each join/update; info is None for a leave.
+        self._history = deque()
+        self._horizon = 0
+        # Directory version each peer is known to hold; None = full snapshots only.
+        self._acked = {}
+
+        self.lease_duration = lease_duration
+        self._clock = clock
+        self._leases = {}
+
+    def register_peer(self, node_id: str, host: str, port: int, codecs: list = None, shards: list = None, directory_version: int = None) -> bool:
+        info = {"host": host, "port": port}
+        if codecs:
+            info["codecs"] = list(codecs)
+        if shards:
+            info["shards"] = list(shards)
+
         with self._lock:
-            self._peers[node_id] = {"host": host, "port": port}
+            if directory_version is not None and directory_version > self.version:
+                # The peer synced with an earlier NameServer instance: skip past its versions.
+                self.version = self._horizon = directory_version
+                directory_version = 0
+            self._acked[node_id] = directory_version
+            self._leases[node_id] = self._clock() + self.lease_duration
+            if self._peers.get(node_id) == info:
+                return False
+            self._peers[node_id] = info
+            self._record(node_id, info)
             self.logger.info(f"Registered peer {node_id} at {host}:{port}")
+            return True
 
     def remove_peer(self, node_id: str):
         with self._lock:
-            if node_id in self._peers:
-                del self._peers[node_id]
-                self.logger.info(f"Removed peer {node_id}")
+            self._remove(node_id)
+
+    def renew(self, node_id: str, directory_version: int = None) -> bool:
+        with self._lock:
+            if node_id not in self._peers:
+                return False
+            self._leases[node_id] = self._clock() + self.lease_duration
+            if directory_version is not None and self._acked.get(node_id) is not None:
+                self._acked[node_id] = directory_version
+            return True
+
+    def expire(self) -> list:
+        now = self._clock()
+        with self._lock:
+            expired = [node_id for node_id, deadline in self._leases.items() if deadline <= now]
+            for node_id in expired:
+                self._remove(node_id)
+            return expired
 
     def get_peers(self) -> dict:
         with self._lock:
-            return self._peers.copy()
\ No newline at end of file
+            return self._peers.copy()
+
+    def acknowledge(self, node_id: str, version: int):
+        with self._lock:
+            acked = self._acked.get(node_id)
+            if node_id in self._peers and acked is not None and version > acked:
+                self._acked[node_id] = version
+
+    def sync_messages(self, msg_type: str, targets=None) -> list:
+        with self._lock:
+            packets = []
+            by_base = {}
+            for pid in (self._peers if targets is None else targets):
+                info = self._peers.get(pid)
+                if info is None:
+                    continue
+                base = self._acked.get(pid)
+                if base not in by_base:
+                    by_base[base] = self._sync_from(msg_type, base)
+                packets.append((pid, info["host"], info["port"], by_base[base]))
+            return packets
+
+    def _sync_from(self, msg_type: str, base: Optional[int]) -> dict:
+        if base is None or base < self._horizon or base > self.version:
+            return {"type": msg_type, "version": self.version, "peers": dict(self._peers)}
+
+        joined, left = {}, []
+        changed = {}
+        for version, node_id, info in self._history:
+            if version > base:
+                changed[node_id] = info
+        for node_id, info in changed.items():
+            if info is None:
+                left.append(node_id)
+            else:
+                joined[node_id] = info
+        return {"type": msg_type, "version": self.version, "base": base, "joined": joined, "left": left}
+
+    def _remove(self, node_id: str):
+        self._acked.pop(node_id, None)
+        self._leases.pop(node_id, None)
+        if node_id in self._peers:
+            del self._peers[node_id]
+            self._record(node_id, None)
+            self.logger.info(f"Removed peer {node_id}")
+
+    def _record(self, node_id: str, info: Optional[dict]):
+        self.version += 1
+        self._history.append((self.version, node_id, info))
+        while len(self._history) > self.history_size:
+            self._horizon = self._history.popleft()[0]
@@ -1,7 +1,10 @@
 import threading
 import logging
+from abc import ABC, abstractmethod
 from enum import Enum
 from src.common.models import MessageType
+from src.common.metrics import NO_METRICS
+from src.common.trace import NO_TRACE
 import time
 
 class State(Enum):
@@ -9,116 +12,266 @@ class State(Enum):
     WANTED = 1
     HELD = 2
 
-class RicartAgrawala:
+class Section:
+    def __init__(self, resource=None):
+        self.resource = resource
+        self.keys = resource_keys(resource)
+        self.state = State.RELEASED
+        self.request_ts = 0
+        self.targets = None
+        self.replies = set()
+        self.deferred_queue = []
+        self.callback = None
+        self.wanted_at = time.monotonic()
+        self.held_at = None
+
+def resource_keys(resource) -> frozenset:
+    if isinstance(resource, (list, tuple)):
+        return frozenset(resource)
+    return frozenset([resource])
+
+def section_id(resource):
+    # A batch of resources is one section; the REPLY echoes the list as sent.
+    if isinstance(resource, (list, tuple)):
+        return tuple(sorted(resource))
+    return resource
+
+def run_in_thread(callback):
+    threading.Thread(target=callback).start()
+
+class MutualExclusion(ABC):
+    message_types = ()
+    # How CS-entry callbacks are run; the simulator swaps in its event queue.
+    run_callback = staticmethod(run_in_thread)
+    # Replaced by the node's registry; counters and timings are no-ops otherwise.
+    metrics = NO_METRICS
+    tracer = NO_TRACE
+
+    def state_of(self, resource=None):
+        with self._lock:
+            section = self._sections.get(section_id(resource))
+            return section.state if section else State.RELEASED
+
+    @abstractmethod
+    def request_critical_section(self, callback, resource=None):
+        pass
+
+    @abstractmethod
+    def release_critical_section(self, resource=None):
+        pass
+
+    @abstractmethod
+    def handle_message(self, msg):
+        pass
+
+    @abstractmethod
+    def on_peer_lost(self, peer_id):
+        pass
+
+    def _wanted(self, section):
+        self.tracer.state("WANTED", section.request_ts, section.resource)
+
+    def _entered(self, section):
+        section.held_at = time.monotonic()
+        self.metrics.count("cs_entries")
+        self.metrics.observe("cs_wait", section.held_at - section.wanted_at)
+        self.tracer.state("HELD", section.request_ts, section.resource)
+
+    def _exited(self, section):
+        if section.held_at is not None:
+            self.metrics.observe("cs_hold", time.monotonic() - section.held_at)
+        self.tracer.state("RELEASED", section.request_ts, section.resource)
+
+    def _overlaps(self, resource):
+        keys = resource_keys(resource)
+        return any(s.keys & keys for s in self._sections.values())
+
+    def _message(self, msg_type, ts, resource):
+        msg = {
+            "type": msg_type,
+            "sender": self.node_id,
+            "ts": ts
+        }
+        if resource is not None:
+            msg["resource"] = list(resource) if isinstance(resource, tuple) else resource
+        return msg
+
+    @staticmethod
+    def _label(resource):
+        if resource is None:
+            return "[global]"
+        if isinstance(resource, (list, tuple)):
+            return "[" + ", ".join(str(r) for r in resource) + "]"
+        return f"[{resource}]"
+
+class RicartAgrawala(MutualExclusion):
+    message_types = (MessageType.REQUEST, MessageType.REPLY)
+
     def __init__(self, node_id, clock, peers_list_func, peer_transport):
         self.node_id = node_id
         self.clock = clock
         self.get_peers = peers_list_func
         self.transport = peer_transport 
         
-        self.state = State.RELEASED
-        self.request_ts = 0
-        self.replies_received = 0
-        self.deferred_queue = []
+        self._sections = {}
+        # Roucairol-Carvalho: peers whose permission we still hold, per key.
+        # A REPLY from a peer grants it; replying to that peer gives it back.
+        self._permissions = {}
         
         self._lock = threading.Lock()
-        self._entry_callback = None
         self.logger = logging.getLogger(f"Algo-{node_id}")
 
-    def request_critical_section(self, callback):
+    def request_critical_section(self, callback, resource=None):
+        sid = section_id(resource)
         with self._lock:
-            if self.state != State.RELEASED:
-                self.logger.warning("Attempted to request CS while already WANTED/HELD. Ignoring.")
+            if self._overlaps(resource):
+                self.logger.warning(f"Attempted to request CS {self._label(resource)} while already WANTED/HELD. Ignoring.")
                 return False 
 
-            self.state = State.WANTED
+            section = Section(resource)
+            self._sections[sid] = section
+            section.state = State.WANTED
             self.clock.increment()
-            self.request_ts = self.clock.value
-            self.replies_received = 0
-            self._entry_callback = callback
+            section.request_ts = self.clock.value
+            section.targets = None
+            section.replies = set()
+            section.callback = callback
+            self._wanted(section)
             
-            msg = {
-                "type": MessageType.REQUEST,
-                "sender": self.node_id,
-                "ts": self.request_ts
-            }
-
-        successful_targets = self.transport.broadcast(msg, exclude_self=True)
-        num_others = len(successful_targets)
+            msg = self._message(MessageType.REQUEST, section.request_ts, resource)
+            needed = self._missing_permissions(section.keys)
+            cached = len(set(self.get_peers()) - {self.node_id}) - len(needed)
+
+        if not needed:
+            successful_targets = []
+        elif cached:
+            successful_targets = self.transport.broadcast(msg, exclude_self=True, targets=needed)
+        else:
+            successful_targets = self.transport.broadcast(msg, exclude_self=True)
         
-        self.logger.info(f"REQUEST sent successfully to {num_others} nodes: {successful_targets}")
+        self.logger.debug(f"REQUEST {self._label(resource)} sent successfully to {len(successful_targets)} nodes: {successful_targets} ({cached} permissions cached)")
 
-        if num_others == 0:
-            self._enter_critical_section()
+        with self._lock:
+            section.targets = set(successful_targets)
+            # Permissions given away while the REQUEST was in flight, and
+            # peers that joined meanwhile, must be asked as well.
+            for pid in sorted(self._missing_permissions(section.keys) - section.targets):
+                section.targets.add(pid)
+                self.transport.send_to_node(pid, self._message(MessageType.REQUEST, section.request_ts, resource))
+            self._check_entry_condition(sid)
         
         return True
 
+    def _missing_permissions(self, keys):
+        return {pid for pid in self.get_peers() if pid != self.node_id and not self._holds(pid, keys)}
+
+    def _holds(self, pid, keys):
+        return all(pid in self._permissions.get(key, ()) for key in keys)
+
     def handle_message(self, msg):
         msg_type = msg.get("type")
         sender = msg.get("sender")
         ts = msg.get("ts", 0)
+        resource = msg.get("resource")
         
         self.clock.update(ts)
 
         if msg_type == MessageType.REQUEST:
-            self._handle_request(sender, ts)
+            self._handle_request(sender, ts, resource)
         elif msg_type == MessageType.REPLY:
-            self._handle_reply()
+            self._handle_reply(sender, resource)
 
-    def _handle_request(self, sender, ts):
+    def _handle_request(self, sender, ts, resource):
+        keys = resource_keys(resource)
         with self._lock:
-            my_ts = self.request_ts
-            defer = False
-            
-            if self.state == State.HELD:
-                defer = True
-            elif self.state == State.WANTED:
-                if (my_ts < ts) or (my_ts == ts and self.node_id < sender):
-                    defer = True
-            
-            if defer:
-                self.logger.info(f"Deferred REQUEST from {sender}")
-                self.deferred_queue.append(sender)
-            else:
-                self.logger.info(f"Replying to {sender}")
-                self._send_reply(sender)
-
-    def _handle_reply(self):
+            blocking = self._blocking_section(sender, ts, keys)
+            if blocking is not None:
+                self.logger.debug(f"Deferred REQUEST {self._label(resource)} from {sender}")
+                blocking.deferred_queue.append((sender, ts, resource))
+                self.metrics.gauge("deferred_requests", self._deferred_count())
+                return
+
+            self.logger.debug(f"Replying to {sender} for {self._label(resource)}")
+            self._send_reply(sender, resource)
+            for section in self._sections.values():
+                if (section.keys & keys and section.state == State.WANTED
+                        and section.targets is not None and sender not in section.targets):
+                    # We just gave away a cached permission, or the sender
+                    # joined after our REQUEST went out: ask it now.
+                    section.targets.add(sender)
+                    self.transport.send_to_node(sender, self._message(MessageType.REQUEST, section.request_ts, section.resource))
+
+    def _blocking_section(self, sender, ts, keys):
+        for section in self._sections.values():
+            if not section.keys & keys:
+                continue
+            if section.state == State.HELD:
+                return section
+            if section.state == State.WANTED and (section.request_ts, self.node_id) < (ts, sender):
+                return section
+        return None
+
+    def _handle_reply(self, sender, resource):
+        sid = section_id(resource)
         with self._lock:
-            self.replies_received += 1
-            self._check_entry_condition()
+            for key in resource_keys(resource):
+                self._permissions.setdefault(key, set()).add(sender)
+            section = self._sections.get(sid)
+            if section is None or section.state != State.WANTED:
+                return
+            section.replies.add(sender)
+            self._check_entry_condition(sid)
 
     def on_peer_lost(self, peer_id):
         with self._lock:
             self.logger.info(f"Peer {peer_id} lost. Re-evaluating.")
-            if self.state == State.WANTED:
-                self._check_entry_condition()
-
-    def _check_entry_condition(self):
-        others = [p for p in self.get_peers() if p != self.node_id]
-        others_count = len(others)    
-        self.logger.info(f"Replies: {self.replies_received}/{others_count}")      
-        if self.replies_received >= others_count:
-            self._enter_critical_section()
-
-    def _enter_critical_section(self):
-        self.state = State.HELD
-        self.logger.info(">>> ENTERED CRITICAL SECTION <<<")
-        if self._entry_callback:
-            threading.Thread(target=self._entry_callback).start()
-
-    def release_critical_section(self):
+            for holders in self._permissions.values():
+                holders.discard(peer_id)
+            for sid, section in list(self._sections.items()):
+                section.deferred_queue = [d for d in section.deferred_queue if d[0] != peer_id]
+                if section.state == State.WANTED:
+                    self._check_entry_condition(sid)
+
+    def _check_entry_condition(self, sid):
+        section = self._sections[sid]
+        if section.state != State.WANTED or section.targets is None:
+            return
+        known = set(self.get_peers())
+        waiting = (section.targets & known) - section.replies
+        self.logger.debug(f"Replies {self._label(section.resource)}: {len(section.targets & known) - len(waiting)}/{len(section.targets & known)}")
+        if not waiting:
+            self._enter_critical_section(sid)
+
+    def _enter_critical_section(self, sid):
+        section = self._sections[sid]
+        section.state = State.HELD
+        self._entered(section)
+        self.logger.info(f">>> ENTERED CRITICAL SECTION {self._label(section.resource)} <<<")
+        if section.callback:
+            self.run_callback(section.callback)
+
+    def release_critical_section(self, resource=None):
         with self._lock:
-            self.logger.info("Exiting CS. Replying to deferred.")
-            self.state = State.RELEASED
-            for target in self.deferred_queue:
-                self._send_reply(target)
-            self.deferred_queue.clear()
+            section = self._sections.pop(section_id(resource), None)
+            if section is None:
+                return
+            self.logger.info(f"Exiting CS {self._label(resource)}. Replying to deferred.")
+            section.state = State.RELEASED
+            self._exited(section)
+            for sender, ts, requested in section.deferred_queue:
+                # A batch request may still overlap another section we hold.
+                blocking = self._blocking_section(sender, ts, resource_keys(requested))
+                if blocking is not None:
+                    blocking.deferred_queue.append((sender, ts, requested))
+                else:
+                    self._send_reply(sender, requested)
+            section.deferred_queue.clear()
+            self.metrics.gauge("deferred_requests", self._deferred_count())
 
-    def _send_reply(self, target_id):
-        msg = {
-            "type": MessageType.REPLY,
-            "sender": self.node_id,
-            "ts": self.clock.value
-        }
-        self.transport.send_to_node(target_id, msg)
\ No newline at end of file
+    def _deferred_count(self):
+        return sum(len(s.deferred_queue) for s in self._sections.values())
+
+    def _send_reply(self, target_id, resource=None):
+        for key in resource_keys(resource):
+            self._permissions.get(key, set()).discard(target_id)
+        self.transport.send_to_node(target_id, self._message(MessageType.REPLY, self.clock.value, resource))
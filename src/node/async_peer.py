@@ -0,0 +1,242 @@
+import asyncio
+import select
+import socket
+import threading
+import time
+from typing import Callable, Dict
+from src.common.protocol import PacketProtocol, FrameDecoder, ProtocolError, RECV_SIZE
+from src.common.codec import CODEC_JSON
+from src.common.metrics import Metrics, NO_METRICS
+from src.node.peer import Peer, SEND_TIMEOUT, IDLE_TIMEOUT, MAINTENANCE_INTERVAL, BROADCAST_DEADLINE
+
+
+class AsyncConnectionPool:
+    def __init__(self, loop: asyncio.AbstractEventLoop, connect_timeout: float = 2.0, idle_timeout: float = 30.0, metrics: Metrics = NO_METRICS):
+        self._loop = loop
+        self.connect_timeout = connect_timeout
+        self.idle_timeout = idle_timeout
+        self.metrics = metrics
+        self._writers: Dict[tuple, asyncio.StreamWriter] = {}
+        self._last_used: Dict[tuple, float] = {}
+        # Frames queued while a connection is being opened, kept in FIFO order.
+        self._pending: Dict[tuple, list] = {}
+
+    async def send(self, host: str, port: int, data: bytes) -> bool:
+        result = self._loop.create_future()
+        self._enqueue((host, port), data, result)
+        return await result
+
+    def send_nowait(self, host: str, port: int, data: bytes):
+        self._enqueue((host, port), data, None)
+
+    async def send_many(self, targets: list, deadline: float) -> Dict[str, bool]:
+        async def send_one(host, port, data):
+            try:
+                return await asyncio.wait_for(self.send(host, port, data), deadline)
+            except asyncio.TimeoutError:
+                return False
+
+        results = await asyncio.gather(*(send_one(host, port, data) for _, host, port, data in targets))
+        return {target[0]: ok for target, ok in zip(targets, results)}
+
+    def discard(self, host: str, port: int):
+        self._loop.call_soon_threadsafe(self._drop, (host, port))
+
+    def retain(self, addresses):
+        keep = set(addresses)
+        self._loop.call_soon_threadsafe(self._retain, keep)
+
+    def evict_idle(self) -> int:
+        now = time.monotonic()
+        idle = [k for k, t in self._last_used.items() if now - t > self.idle_timeout and k not in self._pending]
+        for key in idle:
+            self._drop(key)
+        return len(idle)
+
+    def close_all(self):
+        for key in list(self._writers):
+            self._drop(key)
+
+    def _enqueue(self, key, data: bytes, result):
+        writer = self._writers.get(key)
+        if writer is not None and key not in self._pending and self._is_stale(writer):
+            self._drop(key)
+            writer = None
+        if key not in self._pending and writer is not None:
+            writer.write(data)
+            self.metrics.count("bytes_sent", n=len(data))
+            self._last_used[key] = time.monotonic()
+            if result is not None:
+                result.set_result(True)
+            return
+
+        if key in self._pending:
+            self._pending[key].append((data, result))
+            return
+
+        self._pending[key] = [(data, result)]
+        self._loop.create_task(self._connect_and_flush(key))
+
+    async def _connect_and_flush(self, key):
+        writer = await self._open(key)
+        queued = self._pending.pop(key, [])
+        for data, result in queued:
+            ok = writer is not None and not writer.is_closing()
+            if ok:
+                writer.write(data)
+                self.metrics.count("bytes_sent", n=len(data))
+            if result is not None and not result.done():
+                result.set_result(ok)
+        if writer is not None:
+            self._last_used[key] = time.monotonic()
+
+    async def _open(self, key):
+        self._drop(key)
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(*key), self.connect_timeout)
+        except (OSError, asyncio.TimeoutError):
+            self.metrics.count("connect_failures")
+            return None
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._writers[key] = writer
+        self._loop.create_task(self._watch(key, reader, writer))
+        return writer
+
+    async def _watch(self, key, reader, writer):
+        # Outbound connections are write-only, so EOF here means the peer went away.
+        try:
+            while await reader.read(4096):
+                pass
+        except (OSError, ConnectionError):
+            pass
+        if self._writers.get(key) is writer:
+            self._drop(key)
+
+    def _is_stale(self, writer) -> bool:
+        if writer.is_closing():
+            return True
+        # The watcher may not have run yet for a FIN/RST that already arrived.
+        sock = writer.get_extra_info("socket")
+        try:
+            readable, _, _ = select.select([sock], [], [], 0)
+        except (OSError, ValueError, TypeError):
+            return True
+        return bool(readable)
+
+    def _retain(self, keep: set):
+        for key in list(self._writers):
+            if key not in keep:
+                self._drop(key)
+
+    def _drop(self, key):
+        writer = self._writers.pop(key, None)
+        self._last_used.pop(key, None)
+        if writer is not None:
+            writer.close()
+
+
+class AsyncPeer(Peer):
+    def __init__(self, node_id: str, host: str, port: int, on_message_received: Callable[[dict, str], None], on_peer_disconnect: Callable[[str], None] = None, metrics: Metrics = None):
+        super().__init__(node_id, host, port, on_message_received, on_peer_disconnect, metrics)
+        self._loop = None
+        self._loop_thread = None
+        self._server = None
+        self._inbound_writers = set()
+
+    def start(self):
+        self.running = True
+        self._loop = asyncio.new_event_loop()
+        self._pool = AsyncConnectionPool(self._loop, connect_timeout=SEND_TIMEOUT, idle_timeout=IDLE_TIMEOUT, metrics=self.metrics)
+        self._loop_thread = threading.Thread(target=self._run_loop, daemon=True)
+        self._loop_thread.start()
+
+        asyncio.run_coroutine_threadsafe(self._start_server(), self._loop).result()
+        self.logger.info(f"Peer started on {self.host}:{self.port} (asyncio)")
+
+    def stop(self):
+        self.running = False
+        if self._loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout=SEND_TIMEOUT)
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._fanout.shutdown(wait=False, cancel_futures=True)
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def _on_loop_thread(self) -> bool:
+        return self._loop_thread is not None and threading.get_ident() == self._loop_thread.ident
+
+    async def _start_server(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port, reuse_address=True)
+        self._loop.create_task(self._maintenance())
+
+    async def _shutdown(self):
+        if self._server:
+            self._server.close()
+        for writer in list(self._inbound_writers):
+            writer.close()
+        self._pool.close_all()
+
+    async def _maintenance(self):
+        while self.running:
+            await asyncio.sleep(MAINTENANCE_INTERVAL)
+            evicted = self._pool.evict_idle()
+            if evicted:
+                self.logger.debug(f"Evicted {evicted} idle connections")
+
+    def _fan_out(self, targets: list) -> Dict[str, bool]:
+        if self._on_loop_thread():
+            # Blocking here would stall the loop; writes are queued in order instead.
+            for pid, data, frame in targets:
+                self._pool.send_nowait(data["host"], data["port"], frame)
+            return {pid: True for pid, _, _ in targets}
+
+        addresses = [(pid, data["host"], data["port"], frame) for pid, data, frame in targets]
+        future = asyncio.run_coroutine_threadsafe(self._pool.send_many(addresses, BROADCAST_DEADLINE), self._loop)
+        try:
+            return future.result(timeout=BROADCAST_DEADLINE + 1.0)
+        except Exception:
+            return {}
+
+    def _post(self, target: Dict, frame: bytes):
+        if self._on_loop_thread():
+            self._pool.send_nowait(target["host"], target["port"], frame)
+        else:
+            self._loop.call_soon_threadsafe(self._pool.send_nowait, target["host"], target["port"], frame)
+
+    def _send_direct(self, host: str, port: int, message: dict, codec: int = CODEC_JSON, batch: bool = False) -> bool:
+        try:
+            data = PacketProtocol.serialize(message, codec)
+        except Exception:
+            return False
+        if self._on_loop_thread():
+            self._pool.send_nowait(host, port, data)
+        else:
+            self._loop.call_soon_threadsafe(self._pool.send_nowait, host, port, data)
+        return True
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._inbound_writers.add(writer)
+        decoder = FrameDecoder()
+        try:
+            while True:
+                chunk = await reader.read(RECV_SIZE)
+                if not chunk:
+                    break
+                self.metrics.count("bytes_received", n=len(chunk))
+                decoder.feed(chunk)
+                self._dispatch_frames(decoder)
+        except ProtocolError as e:
+            self.logger.warning(f"Closing connection: {e}")
+        except Exception as e:
+            self.logger.debug(f"Inbound connection closed: {e}")
+        finally:
+            self._inbound_writers.discard(writer)
+            writer.close()
@@ -0,0 +1,129 @@
+import threading
+import logging
+import time
+
+
+class Operation:
+    def __init__(self, seat_ids, reserve: bool, on_done=None):
+        self.seat_ids = sorted(set(seat_ids))
+        self.reserve = reserve
+        self.on_done = on_done
+        self.applied = False
+
+    def finish(self):
+        if self.on_done:
+            self.on_done(self.applied)
+
+
+class _Round:
+    def __init__(self, ops):
+        self.ops = list(ops)
+        self.keys = set().union(*(op.seat_ids for op in self.ops))
+        self.seats = sorted(self.keys)
+        # Once entered, the operations to apply are fixed.
+        self.entered = False
+
+
+class BookingQueue:
+    def __init__(self, node_id, algo, resource_for, apply_ops, on_rejected=None, hold_time=0.0):
+        self.algo = algo
+        self.resource_for = resource_for
+        self.apply_ops = apply_ops
+        self.on_rejected = on_rejected
+        self.hold_time = hold_time
+
+        # Rounds on disjoint seats run side by side; an operation that
+        # overlaps a round in flight waits for it in _pending.
+        self._rounds = []
+        self._pending = []
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(f"Booking-{node_id}")
+
+    def pending_seats(self) -> set:
+        with self._lock:
+            seats = set().union(*(r.keys for r in self._rounds))
+            for op in self._pending:
+                seats.update(op.seat_ids)
+            return seats
+
+    def submit(self, seat_ids, reserve: bool, on_done=None):
+        op = Operation(seat_ids, reserve, on_done)
+        with self._lock:
+            if self._ride_along(op):
+                self.logger.debug(f"Seats {op.seat_ids} already requested, joining that round")
+                return
+            self._pending.append(op)
+            rounds = self._take_ready()
+            if not rounds:
+                self.logger.debug(f"Seats {op.seat_ids} in flight, queued {len(self._pending)} operation(s)")
+        self._launch(rounds)
+
+    def _ride_along(self, op):
+        # An operation on seats a round has asked for but not yet entered is
+        # applied in that round, unless an earlier one on them is still queued.
+        keys = set(op.seat_ids)
+        if any(keys.intersection(queued.seat_ids) for queued in self._pending):
+            return False
+        for r in self._rounds:
+            if not r.entered and keys <= r.keys:
+                r.ops.append(op)
+                return True
+        return False
+
+    def _take_ready(self):
+        # Queued operations clear of every round in flight start new rounds,
+        # overlapping ones together; the rest keep their order in the queue.
+        blocked = set().union(*(r.keys for r in self._rounds))
+        groups, waiting = [], []
+        for op in self._pending:
+            keys = set(op.seat_ids)
+            if keys & blocked:
+                waiting.append(op)
+                blocked |= keys
+                continue
+            overlapping = [g for g in groups if any(keys.intersection(other.seat_ids) for other in g)]
+            group = [other for g in overlapping for other in g] + [op]
+            groups = [g for g in groups if g not in overlapping]
+            groups.append(group)
+        self._pending = waiting
+        rounds = [_Round(group) for group in groups]
+        self._rounds.extend(rounds)
+        return rounds
+
+    def _launch(self, rounds):
+        for r in rounds:
+            threading.Thread(target=self._start_round, args=(r,)).start()
+
+    def _start_round(self, r):
+        resource = self.resource_for(r.seats)
+        success = self.algo.request_critical_section(lambda: self._on_enter(r), resource)
+        if success:
+            return
+
+        with self._lock:
+            r.entered = True
+            self._rounds.remove(r)
+            ready = self._take_ready()
+        if self.on_rejected:
+            self.on_rejected(r.ops)
+        for op in r.ops:
+            op.finish()
+        self._launch(ready)
+
+    def _on_enter(self, r):
+        with self._lock:
+            r.entered = True
+            batch = list(r.ops)
+
+        try:
+            self.apply_ops(batch)
+            time.sleep(self.hold_time)
+        finally:
+            self.algo.release_critical_section(self.resource_for(r.seats))
+            with self._lock:
+                self._rounds.remove(r)
+                ready = self._take_ready()
+            # Only now, so a caller can follow up on the same seats right away.
+            for op in batch:
+                op.finish()
+            self._launch(ready)
@@ -0,0 +1,46 @@
+from collections import deque
+from typing import Dict, List, Optional
+
+DEFAULT_CAPACITY = 1024
+
+
+class SeatChangeLog:
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._entries = deque()
+        # Highest Lamport timestamp applied from each origin node.
+        self.watermarks: Dict[str, int] = {}
+        # Highest timestamp per origin that has been evicted from the log.
+        self._horizon: Dict[str, int] = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def append(self, ts: int, origin: str, seat_ids: List[int], owner: Optional[str]):
+        self._entries.append((ts, origin, list(seat_ids), owner))
+        self.observe(ts, origin)
+        while len(self._entries) > self.capacity:
+            old_ts, old_origin, _, _ = self._entries.popleft()
+            if old_ts > self._horizon.get(old_origin, 0):
+                self._horizon[old_origin] = old_ts
+
+    def observe(self, ts: int, origin: str):
+        if ts > self.watermarks.get(origin, 0):
+            self.watermarks[origin] = ts
+
+    def mark_compacted(self, watermarks: Dict[str, int]):
+        # Changes up to these watermarks live only in a snapshot now.
+        for origin, ts in watermarks.items():
+            if ts > self._horizon.get(origin, 0):
+                self._horizon[origin] = ts
+        self.merge_watermarks(watermarks)
+
+    def merge_watermarks(self, watermarks: Dict[str, int]):
+        for origin, ts in watermarks.items():
+            self.observe(ts, origin)
+
+    def since(self, watermarks: Dict[str, int]) -> Optional[list]:
+        for origin, ts in self._horizon.items():
+            if watermarks.get(origin, 0) < ts:
+                return None
+        return [list(e) for e in self._entries if e[0] > watermarks.get(e[1], 0)]
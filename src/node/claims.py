@@ -0,0 +1,48 @@
+from typing import Dict, Optional, Set, Tuple
+from src.node.booking import Operation
+
+# How long a claimer listens for competing claims before it settles its own.
+# It should exceed the one-way delay between nodes: a competing claim that
+# arrives later still wins everywhere, but the booking was already reported.
+CLAIM_WINDOW = 0.02
+
+Version = Tuple[int, str]
+
+
+class Claim(Operation):
+    def __init__(self, seat_ids, on_done=None):
+        super().__init__(seat_ids, reserve=True, on_done=on_done)
+        self.version = None
+
+
+class ClaimTable:
+    # Two claims compete when they were made against the same base version of
+    # a seat, i.e. both claimers saw it free at that point. The lowest
+    # (ts, node_id) wins, the same order Ricart-Agrawala uses for REQUESTs, so
+    # every node picks the same winner whatever order the claims arrive in.
+    def __init__(self):
+        self._winners: Dict[int, Tuple[Version, Version]] = {}
+        # Seats on which competing claims were seen; they go through the mutex.
+        self.contended: Set[int] = set()
+
+    def resolve(self, seat_id: int, base: Version, version: Version, current: Version) -> bool:
+        if current == base:
+            self._winners[seat_id] = (base, version)
+            return True
+
+        winner = self._winners.get(seat_id)
+        if winner is None or winner[0] != base or winner[1] != current or winner[1] == version:
+            # Stale: the seat has moved on since the claimer looked at it.
+            return False
+        self.contended.add(seat_id)
+        if version < winner[1]:
+            self._winners[seat_id] = (base, version)
+            return True
+        return False
+
+    def base_of(self, seat_id: int, version: Version) -> Optional[Version]:
+        # The base a seat's current version was claimed against, if it is a claim.
+        winner = self._winners.get(seat_id)
+        if winner is not None and winner[1] == version:
+            return winner[0]
+        return None
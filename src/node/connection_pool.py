@@ -0,0 +1,129 @@
+import socket
+import select
+import threading
+import time
+from typing import Dict, Tuple
+from src.common.metrics import Metrics, NO_METRICS
+
+
+class PooledConnection:
+    def __init__(self):
+        self.sock = None
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+        self.closed = False
+
+    def is_stale(self) -> bool:
+        # Outbound sockets are write-only: anything readable means the remote
+        # side sent FIN/RST and the next write would be lost.
+        try:
+            readable, _, _ = select.select([self.sock], [], [], 0)
+        except (OSError, ValueError):
+            return True
+        return bool(readable)
+
+    def close_socket(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+
+
+class ConnectionPool:
+    def __init__(self, connect_timeout: float = 2.0, idle_timeout: float = 30.0, metrics: Metrics = NO_METRICS):
+        self.connect_timeout = connect_timeout
+        self.idle_timeout = idle_timeout
+        self.metrics = metrics
+        self._connections: Dict[Tuple[str, int], PooledConnection] = {}
+        self._lock = threading.Lock()
+
+    def send(self, host: str, port: int, data: bytes) -> bool:
+        key = (host, port)
+        for _ in range(2):
+            conn = self._get_or_create(key)
+            with conn.lock:
+                if conn.closed:
+                    continue
+                if conn.sock is not None and conn.is_stale():
+                    conn.close_socket()
+                if conn.sock is None:
+                    try:
+                        conn.sock = self._connect(key)
+                    except OSError:
+                        self.metrics.count("connect_failures")
+                        self._discard(key, conn)
+                        return False
+                try:
+                    conn.sock.sendall(data)
+                    conn.last_used = time.monotonic()
+                    self.metrics.count("bytes_sent", n=len(data))
+                    return True
+                except OSError:
+                    self._discard(key, conn)
+        return False
+
+    def discard(self, host: str, port: int):
+        key = (host, port)
+        with self._lock:
+            conn = self._connections.get(key)
+        if conn:
+            with conn.lock:
+                self._discard(key, conn)
+
+    def retain(self, addresses):
+        keep = set(addresses)
+        with self._lock:
+            stale = [(k, c) for k, c in self._connections.items() if k not in keep]
+        for key, conn in stale:
+            with conn.lock:
+                self._discard(key, conn)
+
+    def evict_idle(self) -> int:
+        now = time.monotonic()
+        with self._lock:
+            candidates = list(self._connections.items())
+        evicted = 0
+        for key, conn in candidates:
+            if not conn.lock.acquire(blocking=False):
+                continue
+            try:
+                if not conn.closed and now - conn.last_used > self.idle_timeout:
+                    self._discard(key, conn)
+                    evicted += 1
+            finally:
+                conn.lock.release()
+        return evicted
+
+    def close_all(self):
+        with self._lock:
+            items = list(self._connections.items())
+        for key, conn in items:
+            with conn.lock:
+                self._discard(key, conn)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._connections)
+
+    def _get_or_create(self, key) -> PooledConnection:
+        with self._lock:
+            conn = self._connections.get(key)
+            if conn is None:
+                conn = PooledConnection()
+                self._connections[key] = conn
+            return conn
+
+    def _connect(self, key) -> socket.socket:
+        sock = socket.create_connection(key, timeout=self.connect_timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    def _discard(self, key, conn: PooledConnection):
+        # Caller must hold conn.lock.
+        conn.closed = True
+        conn.close_socket()
+        with self._lock:
+            if self._connections.get(key) is conn:
+                del self._connections[key]
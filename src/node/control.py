@@ -0,0 +1,94 @@
+import json
+import socket
+import threading
+import logging
+
+CONTROL_HOST = "127.0.0.1"
+
+
+class CommandServer:
+    # One JSON object per line in, one per line out, e.g.
+    #   {"cmd": "reserve", "seats": [3, 4], "shard": "sala1:21h"}
+    #   {"ok": true}
+    def __init__(self, node, port: int = 0, host: str = CONTROL_HOST):
+        self.node = node
+        self.host = host
+        self.port = port
+        self.running = False
+        self._socket = None
+        self.logger = logging.getLogger(f"Control-{node.node_id}")
+
+    def start(self):
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((self.host, self.port))
+        self._socket.listen(5)
+        self.port = self._socket.getsockname()[1]
+        self.running = True
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        self.logger.info(f"Command socket listening on {self.host}:{self.port}")
+
+    def stop(self):
+        self.running = False
+        if self._socket:
+            try:
+                self._socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._socket.close()
+
+    def _accept_loop(self):
+        while self.running:
+            try:
+                conn, _ = self._socket.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        with conn, conn.makefile("r", encoding="utf-8") as lines:
+            for line in lines:
+                if not line.strip():
+                    continue
+                reply = self.execute(line)
+                try:
+                    conn.sendall((json.dumps(reply) + "\n").encode("utf-8"))
+                except OSError:
+                    break
+
+    def execute(self, line: str) -> dict:
+        try:
+            command = json.loads(line)
+            name = command["cmd"]
+        except (ValueError, TypeError, KeyError):
+            return {"ok": False, "error": "expected a JSON object with a 'cmd' field"}
+
+        handler = getattr(self, f"_cmd_{name}", None)
+        if handler is None:
+            return {"ok": False, "error": f"unknown command {name!r}"}
+        try:
+            return handler(command)
+        except KeyError as e:
+            return {"ok": False, "error": f"missing or unknown {e}"}
+        except (TimeoutError, ValueError, TypeError) as e:
+            return {"ok": False, "error": str(e)}
+
+    def _cmd_reserve(self, command):
+        return {"ok": self.node.reserve(self._seat_ids(command), command.get("shard"))}
+
+    def _cmd_release(self, command):
+        return {"ok": self.node.release(self._seat_ids(command), command.get("shard"))}
+
+    def _cmd_query(self, command):
+        return dict(self.node.query(command.get("shard")), ok=True)
+
+    def _cmd_stats(self, command):
+        return dict(self.node.stats(), ok=True)
+
+    def _cmd_peers(self, command):
+        return {"ok": True, "peers": sorted(self.node.peer.get_known_peers())}
+
+    @staticmethod
+    def _seat_ids(command):
+        seats = command["seats"]
+        return [int(s) for s in (seats if isinstance(seats, list) else [seats])]
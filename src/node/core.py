@@ -0,0 +1,210 @@
+import os
+import threading
+import logging
+import time
+import socket
+from src.node.peer import Peer
+from src.node.async_peer import AsyncPeer
+from src.node.screening import Screening, DEFAULT_SHARD, DEFAULT_SEATS, parse_shard
+from src.node.mutex import DEFAULT_ALGORITHM
+from src.common.models import LamportClock, MessageType
+from src.common.protocol import PacketProtocol
+from src.common.metrics import Metrics
+from src.common.trace import TraceRecorder, NO_TRACE
+from src.node.claims import CLAIM_WINDOW
+from src.node.journal import SeatJournal
+from src.node.gossip import ANTI_ENTROPY_INTERVAL
+
+logger = logging.getLogger("Main")
+
+NAMESERVER_HOST = "127.0.0.1"
+NAMESERVER_PORT = 5000
+CS_HOLD_TIME = 0.5
+HEARTBEAT_INTERVAL = 2.0
+OPERATION_TIMEOUT = 10.0
+TOTAL_SEATS = DEFAULT_SEATS
+
+
+class CinemaNode:
+    def __init__(self, node_id, port, transport="threads", codec="binary", shards=None, algorithm=DEFAULT_ALGORITHM,
+                 nameserver=(NAMESERVER_HOST, NAMESERVER_PORT), hold_time=CS_HOLD_TIME, trace_dir=None,
+                 optimistic=False, claim_window=CLAIM_WINDOW, data_dir=None, gossip_fanout=None):
+        self.node_id = node_id
+        self.port = port
+        self.nameserver = nameserver
+        self.gossip_fanout = gossip_fanout
+
+        self.clock = LamportClock()
+        self.metrics = Metrics()
+        self.tracer = TraceRecorder(node_id, os.path.join(trace_dir, f"{node_id}.trace")) if trace_dir else NO_TRACE
+
+        peer_cls = AsyncPeer if transport == "asyncio" else Peer
+        self.peer = peer_cls(
+            node_id,
+            "127.0.0.1",
+            port,
+            self.on_network_message,
+            on_peer_disconnect=self.on_peer_lost,
+            metrics=self.metrics
+        )
+        self.peer.tracer = self.tracer
+
+        if codec == "json":
+            self.peer.codecs = ["json"]
+
+        # Optional front-end (GUI) notified of log lines and seat changes.
+        self.frontend = None
+
+        self.shards = {}
+        for spec in shards or [DEFAULT_SHARD]:
+            key, total_seats = parse_shard(spec, TOTAL_SEATS)
+            journal = SeatJournal(os.path.join(data_dir, f"{node_id}-{key.replace(':', '_')}")) if data_dir else None
+            self.shards[key] = Screening(self, key, total_seats, hold_time=hold_time, algorithm=algorithm,
+                                         optimistic=optimistic, claim_window=claim_window, journal=journal,
+                                         gossip_fanout=gossip_fanout)
+        self.default_shard = next(iter(self.shards))
+
+    def screening(self, shard=None):
+        return self.shards[shard or self.default_shard]
+
+    @property
+    def seats(self):
+        return self.screening().seats
+
+    def start(self):
+        self.peer.start()
+        self.register_to_nameserver()
+        threading.Thread(target=self._heartbeat_loop, daemon=True).start()
+        if self.gossip_fanout:
+            threading.Thread(target=self._anti_entropy_loop, daemon=True).start()
+        self.log(f"Node started on port {self.port}")
+
+    def stop(self):
+        self.peer.stop()
+        self.tracer.close()
+        for screening in self.shards.values():
+            screening.journal.close()
+
+    def register_to_nameserver(self):
+        if self._send_to_nameserver(self._membership(MessageType.REGISTER)):
+            logger.info("Registered to NameServer")
+        else:
+            self.log("ERROR: NameServer unreachable!")
+
+    def _membership(self, msg_type):
+        return {
+            "type": msg_type,
+            "node_id": self.node_id,
+            "listening_port": self.port,
+            "codecs": self.peer.codecs,
+            "shards": list(self.shards),
+            "directory_version": self.peer.directory_version
+        }
+
+    def _send_to_nameserver(self, msg):
+        try:
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+                s.settimeout(HEARTBEAT_INTERVAL)
+                s.connect(self.nameserver)
+                s.sendall(PacketProtocol.serialize(msg))
+            return True
+        except Exception as e:
+            logger.error(f"Could not connect to NameServer: {e}")
+            return False
+
+    def _heartbeat_loop(self):
+        while self.peer.running:
+            time.sleep(HEARTBEAT_INTERVAL)
+            if self.peer.running:
+                self._send_to_nameserver(self._membership(MessageType.HEARTBEAT))
+
+    def _anti_entropy_loop(self):
+        # Repairs the few nodes a gossip wave misses.
+        while self.peer.running:
+            time.sleep(ANTI_ENTROPY_INTERVAL)
+            if self.peer.running:
+                for screening in self.shards.values():
+                    screening.anti_entropy()
+
+    def on_network_message(self, msg, sender_ip=None):
+        m_type = msg.get("type")
+
+        if m_type == MessageType.SYNC:
+            in_sync = self.peer.update_directory(
+                msg.get("peers"), msg.get("version"), msg.get("base"), msg.get("joined"), msg.get("left", ())
+            )
+            if not in_sync:
+                self.register_to_nameserver()
+                return
+            for screening in self.shards.values():
+                screening.on_directory_update()
+            return
+
+        screening = self.shards.get(msg.get("shard", DEFAULT_SHARD))
+        if screening is None:
+            logger.debug(f"Ignoring {m_type} for unserved shard {msg.get('shard')}")
+            return
+        screening.handle_message(msg)
+
+    def on_peer_lost(self, peer_id):
+        for screening in self.shards.values():
+            screening.algo.on_peer_lost(peer_id)
+
+    def log(self, message, shard=None):
+        if len(self.shards) > 1 and shard is not None:
+            message = f"[{shard}] {message}"
+        if self.frontend:
+            self.frontend.log(message)
+        else:
+            logger.info(message)
+
+    def show_seats(self, shard, seat_ids):
+        if self.frontend:
+            self.frontend.show_seats(shard, seat_ids)
+
+    def show_pending(self, shard, seat_ids):
+        if self.frontend:
+            self.frontend.show_pending(shard, seat_ids)
+
+    def show_overturned(self, shard, seat_ids, winner):
+        if self.frontend:
+            self.frontend.show_overturned(shard, seat_ids, winner)
+
+    def reserve_seats(self, seat_ids, shard=None, on_done=None):
+        return self.screening(shard).reserve_seats(seat_ids, on_done)
+
+    def release_seats(self, seat_ids, shard=None, on_done=None):
+        return self.screening(shard).release_seats(seat_ids, on_done)
+
+    def reserve(self, seat_ids, shard=None, timeout=OPERATION_TIMEOUT) -> bool:
+        return self._wait_for(self.reserve_seats, seat_ids, shard, timeout)
+
+    def release(self, seat_ids, shard=None, timeout=OPERATION_TIMEOUT) -> bool:
+        return self._wait_for(self.release_seats, seat_ids, shard, timeout)
+
+    def query(self, shard=None) -> dict:
+        screening = self.screening(shard)
+        return {
+            "shard": screening.key,
+            "seats": list(screening.seats),
+            "free": screening.seats.free_count(),
+            "pending": sorted(screening.pending_seats()),
+            "overturned": sorted(screening.overturned_seats()),
+        }
+
+    def stats(self) -> dict:
+        return dict(self.metrics.snapshot(), node_id=self.node_id, peers=len(self.peer.get_known_peers()))
+
+    def _wait_for(self, operation, seat_ids, shard, timeout):
+        done = threading.Event()
+        result = []
+
+        def on_done(applied):
+            result.append(applied)
+            done.set()
+
+        if not operation(seat_ids, shard, on_done):
+            return False
+        if not done.wait(timeout):
+            raise TimeoutError(f"Operation on seats {sorted(seat_ids)} did not complete in {timeout}s")
+        return result[0]
@@ -1,16 +1,21 @@
+import math
 import tkinter as tk
 from tkinter import messagebox
 from functools import partial
 
 class CinemaGUI:
-    def __init__(self, node_id, total_seats=25, on_seat_click=None):
+    def __init__(self, node_id, total_seats=25, on_seat_click=None, on_batch=None, shards=None, on_shard_change=None):
         self.node_id = node_id
         self.total_seats = total_seats
         self.on_seat_click = on_seat_click
+        self.on_batch = on_batch
+        self.shards = shards or []
+        self.on_shard_change = on_shard_change
+        self.selected = set()
         
         self.root = tk.Tk()
         self.root.title(f"DS-Cinema Node: {node_id}")
-        self.root.geometry("400x500")
+        self.root.geometry("400x560")
         
         self.buttons = {}
         self._setup_ui()
@@ -20,35 +25,79 @@ class CinemaGUI:
         main_frame.pack(expand=True, fill="both")
         
         tk.Label(main_frame, text=f"Node: {self.node_id}", font=("Arial", 14, "bold")).pack(pady=10)
+        self.free_label = tk.Label(main_frame, text=f"Free: {self.total_seats}/{self.total_seats}")
+        self.free_label.pack()
         
-        grid_frame = tk.Frame(main_frame)
-        grid_frame.pack()
-        
-        rows = 5
-        cols = 5
+        if len(self.shards) > 1:
+            self.shard_var = tk.StringVar(value=self.shards[0])
+            tk.OptionMenu(main_frame, self.shard_var, *self.shards, command=self._handle_shard_change).pack()
+
+        self.grid_frame = tk.Frame(main_frame)
+        self.grid_frame.pack()
+        self._build_grid()
+
+        batch_frame = tk.Frame(main_frame)
+        batch_frame.pack(pady=5)
+        tk.Button(batch_frame, text="Book selected", command=partial(self._submit_batch, True)).pack(side="left", padx=5)
+        tk.Button(batch_frame, text="Release selected", command=partial(self._submit_batch, False)).pack(side="left", padx=5)
+
+        self.log_text = tk.Text(main_frame, height=8, state='disabled')
+        self.log_text.pack(pady=20, fill="x")
+
+    def _build_grid(self):
+        for btn in self.buttons.values():
+            btn.destroy()
+        self.buttons = {}
+        self.selected.clear()
+
+        cols = max(1, math.ceil(math.sqrt(self.total_seats)))
         
         for i in range(self.total_seats):
             r = i // cols
             c = i % cols
             
             btn = tk.Button(
-                grid_frame,
+                self.grid_frame,
                 text=f"S{i}",
                 width=6,
                 height=3,
                 bg="#90EE90",
                 command=partial(self._handle_click, i)
             )
+            btn.bind("<Button-3>", partial(self._toggle_selection, i))
             btn.grid(row=r, column=c, padx=2, pady=2)
             self.buttons[i] = btn
 
-        self.log_text = tk.Text(main_frame, height=8, state='disabled')
-        self.log_text.pack(pady=20, fill="x")
+    def _handle_shard_change(self, shard):
+        if self.on_shard_change:
+            self.on_shard_change(shard)
+
+    def show_shard(self, shard, total_seats):
+        def rebuild():
+            self.total_seats = total_seats
+            self._build_grid()
+        self.root.after(0, rebuild)
 
     def _handle_click(self, seat_id):
         if self.on_seat_click:
             self.on_seat_click(seat_id)
 
+    def _toggle_selection(self, seat_id, event=None):
+        if seat_id in self.selected:
+            self.selected.discard(seat_id)
+            self.buttons[seat_id].configure(relief="raised")
+        else:
+            self.selected.add(seat_id)
+            self.buttons[seat_id].configure(relief="sunken")
+
+    def _submit_batch(self, reserve):
+        seat_ids = sorted(self.selected)
+        for seat_id in seat_ids:
+            self.buttons[seat_id].configure(relief="raised")
+        self.selected.clear()
+        if seat_ids and self.on_batch:
+            self.on_batch(seat_ids, reserve)
+
     def update_seat_color(self, seat_id, color):
         self.root.after(0, lambda: self._update_seat_color_safe(seat_id, color))
 
@@ -56,6 +105,9 @@ class CinemaGUI:
         if seat_id in self.buttons:
             self.buttons[seat_id].configure(bg=color)
 
+    def update_free_count(self, free, total):
+        self.root.after(0, lambda: self.free_label.configure(text=f"Free: {free}/{total}"))
+
     def log(self, message):
         self.root.after(0, lambda: self._log_safe(message))
 
@@ -64,5 +116,79 @@ class CinemaGUI:
         self.log_text.insert("1.0", message + "\n")
         self.log_text.configure(state='disabled')
 
+    def warn(self, title, message):
+        self.root.after(0, lambda: messagebox.showwarning(title, message))
+
+    def start(self):
+        self.root.mainloop()
+
+class GuiFrontend:
+    def __init__(self, node):
+        self.node = node
+        self.active_shard = node.default_shard
+        self.gui = CinemaGUI(
+            node.node_id,
+            total_seats=len(node.screening(self.active_shard).seats),
+            on_seat_click=self.handle_click,
+            on_batch=self.handle_batch,
+            shards=list(node.shards),
+            on_shard_change=self.handle_shard
+        )
+        node.frontend = self
+
     def start(self):
-        self.root.mainloop()
\ No newline at end of file
+        self.gui.start()
+
+    def log(self, message):
+        self.gui.log(message)
+
+    def show_seats(self, shard, seat_ids):
+        if shard != self.active_shard:
+            return
+        seats = self.node.screening(shard).seats
+        for seat_id in seat_ids:
+            owner = seats[seat_id]
+            if owner is None:
+                self.gui.update_seat_color(seat_id, "#90EE90")
+            elif owner == self.node.node_id:
+                self.gui.update_seat_color(seat_id, "#32CD32")
+            else:
+                self.gui.update_seat_color(seat_id, "#FF6347")
+        self.gui.update_free_count(seats.free_count(), len(seats))
+
+    def show_pending(self, shard, seat_ids):
+        if shard != self.active_shard:
+            return
+        for seat_id in seat_ids:
+            self.gui.update_seat_color(seat_id, "#FFD700")
+
+    def show_overturned(self, shard, seat_ids, winner):
+        seats = ", ".join(str(s) for s in sorted(seat_ids))
+        self.gui.warn("Booking overturned", f"[{shard}] Seats {seats} were booked but went to an earlier claim by {winner}.")
+
+    def handle_click(self, seat_id):
+        current_owner = self.node.screening(self.active_shard).seats[seat_id]
+
+        if current_owner is not None and current_owner != self.node.node_id:
+            self.gui.log(f"Seat {seat_id} is owned by {current_owner}!")
+            return
+
+        if current_owner == self.node.node_id:
+            self.node.release_seats([seat_id], self.active_shard)
+            return
+
+        self.node.reserve_seats([seat_id], self.active_shard)
+
+    def handle_batch(self, seat_ids, reserve):
+        if reserve:
+            self.node.reserve_seats(seat_ids, self.active_shard)
+        else:
+            self.node.release_seats(seat_ids, self.active_shard)
+
+    def handle_shard(self, shard):
+        if shard not in self.node.shards:
+            return
+        self.active_shard = shard
+        seats = self.node.screening(shard).seats
+        self.gui.show_shard(shard, len(seats))
+        self.show_seats(shard, range(len(seats)))
@@ -0,0 +1,152 @@
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+# <prefix>.wal holds seat changes since the last snapshot, <prefix>.snap the
+# compacted seat map. Records are length + CRC32 framed so that a write torn
+# by a crash is detected and dropped on replay.
+SNAPSHOT_MAGIC = b"DSSN\x01"
+RECORD = struct.Struct(">II")
+WATERMARKS = struct.Struct(">I")
+SYNC_INTERVAL = 0.05
+SNAPSHOT_EVERY = 1024
+
+logger = logging.getLogger("Journal")
+
+
+class SeatJournal:
+    def __init__(self, prefix: str, sync_interval: float = SYNC_INTERVAL, snapshot_every: int = SNAPSHOT_EVERY):
+        self.wal_path = f"{prefix}.wal"
+        self.snapshot_path = f"{prefix}.snap"
+        self.sync_interval = sync_interval
+        self.snapshot_every = snapshot_every
+        self.since_snapshot = 0
+
+        directory = os.path.dirname(self.wal_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = None
+        self._dirty = threading.Event()
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def load(self) -> Tuple[Optional[Tuple[bytes, Dict[str, int]]], List[list]]:
+        snapshot = None
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "rb") as f:
+                data = f.read()
+            if data.startswith(SNAPSHOT_MAGIC):
+                offset = len(SNAPSHOT_MAGIC)
+                (length,) = WATERMARKS.unpack_from(data, offset)
+                offset += WATERMARKS.size
+                watermarks = json.loads(data[offset:offset + length])
+                snapshot = (data[offset + length:], watermarks)
+            else:
+                logger.warning(f"Ignoring {self.snapshot_path}: not a snapshot")
+
+        events = []
+        valid = 0
+        if os.path.exists(self.wal_path):
+            with open(self.wal_path, "rb") as f:
+                data = f.read()
+            while valid + RECORD.size <= len(data):
+                length, crc = RECORD.unpack_from(data, valid)
+                body = data[valid + RECORD.size:valid + RECORD.size + length]
+                if len(body) < length or zlib.crc32(body) != crc:
+                    break
+                events.append(json.loads(body))
+                valid += RECORD.size + length
+            if valid < len(data):
+                logger.warning(f"Dropped {len(data) - valid} torn bytes at the end of {self.wal_path}")
+
+        with self._lock:
+            self._file = open(self.wal_path, "r+b" if os.path.exists(self.wal_path) else "wb")
+            # Appends go after the last good record, over any torn tail.
+            self._file.truncate(valid)
+            self._file.seek(valid)
+        self.since_snapshot = len(events)
+        threading.Thread(target=self._sync_loop, daemon=True).start()
+        return snapshot, events
+
+    def append(self, ts: int, origin: str, seat_ids, owner: Optional[str]):
+        body = json.dumps([ts, origin, list(seat_ids), owner], separators=(",", ":")).encode("utf-8")
+        with self._lock:
+            if self._file is None or self._closed:
+                return
+            self._file.write(RECORD.pack(len(body), zlib.crc32(body)) + body)
+            self.since_snapshot += 1
+        self._dirty.set()
+
+    def snapshot_due(self) -> bool:
+        return self.since_snapshot >= self.snapshot_every
+
+    def snapshot(self, seat_map: bytes, watermarks: Dict[str, int]):
+        # The snapshot replaces everything logged so far, so callers must hold
+        # off appends (the screening's state lock) while it is taken.
+        raw = json.dumps(watermarks).encode("utf-8")
+        tmp = f"{self.snapshot_path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(SNAPSHOT_MAGIC + WATERMARKS.pack(len(raw)) + raw + seat_map)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.snapshot_path)
+        with self._lock:
+            if self._file is not None and not self._closed:
+                self._file.seek(0)
+                self._file.truncate()
+                self._sync()
+            self.since_snapshot = 0
+
+    def close(self):
+        with self._lock:
+            if self._file is None or self._closed:
+                return
+            self._closed = True
+            self._sync()
+            self._file.close()
+        self._dirty.set()
+
+    def _sync_loop(self):
+        # Group commit: one fsync covers every append made during the interval.
+        while True:
+            self._dirty.wait()
+            if self._closed:
+                return
+            self._dirty.clear()
+            time.sleep(self.sync_interval)
+            with self._lock:
+                if self._closed:
+                    return
+                self._sync()
+
+    def _sync(self):
+        try:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except OSError as e:
+            logger.error(f"Could not sync {self.wal_path}: {e}")
+
+
+class NullJournal:
+    def load(self):
+        return None, []
+
+    def append(self, ts, origin, seat_ids, owner):
+        pass
+
+    def snapshot_due(self):
+        return False
+
+    def snapshot(self, seat_map, watermarks):
+        pass
+
+    def close(self):
+        pass
+
+
+NO_JOURNAL = NullJournal()
@@ -0,0 +1,270 @@
+import bisect
+import math
+import threading
+import logging
+from src.common.models import MessageType
+from src.node.algorithm import MutualExclusion, Section, State, resource_keys, section_id
+
+
+def grid_quorum(node_id, members) -> set:
+    # Row plus column of a ceil(sqrt(N)) grid. Two quorums always share the
+    # cell at (row_a, col_b) or (row_b, col_a); at most one of those can fall
+    # in the missing part of an incomplete last row.
+    members = sorted(set(members) | {node_id})
+    width = math.ceil(math.sqrt(len(members)))
+    row, col = divmod(members.index(node_id), width)
+    return {m for i, m in enumerate(members) if i // width == row or i % width == col}
+
+
+class QuorumSection(Section):
+    def __init__(self, resource=None):
+        super().__init__(resource)
+        self.asked = set()
+        self.failed = False
+        self.inquiries = set()
+
+
+class Vote:
+    def __init__(self, resource):
+        self.resource = resource
+        self.keys = resource_keys(resource)
+        self.inquired = False
+
+
+class Maekawa(MutualExclusion):
+    message_types = (
+        MessageType.REQUEST, MessageType.REPLY, MessageType.RELEASE,
+        MessageType.INQUIRE, MessageType.YIELD, MessageType.FAILED
+    )
+
+    def __init__(self, node_id, clock, peers_list_func, peer_transport):
+        self.node_id = node_id
+        self.clock = clock
+        self.get_peers = peers_list_func
+        self.transport = peer_transport
+
+        # Requester side: our own sections, keyed like RicartAgrawala.
+        self._sections = {}
+        # Voter side: votes granted per (ts, requester) and requests queued
+        # behind them in (ts, requester) priority order.
+        self._votes = {}
+        self._waiting = []
+        self._failed_sent = set()
+
+        # Messages to ourselves are handled inline, under the same lock.
+        self._lock = threading.RLock()
+        self.logger = logging.getLogger(f"Maekawa-{node_id}")
+
+    def quorum(self) -> set:
+        return grid_quorum(self.node_id, self.get_peers())
+
+    def request_critical_section(self, callback, resource=None):
+        sid = section_id(resource)
+        with self._lock:
+            if self._overlaps(resource):
+                self.logger.warning(f"Attempted to request CS {self._label(resource)} while already WANTED/HELD. Ignoring.")
+                return False
+
+            section = QuorumSection(resource)
+            self._sections[sid] = section
+            section.state = State.WANTED
+            section.request_ts = self.clock.increment()
+            section.callback = callback
+            section.targets = self.quorum()
+            self._wanted(section)
+
+            self.logger.debug(f"REQUEST {self._label(resource)} to quorum {sorted(section.targets)}")
+            self._ask(section, section.targets)
+            self._check_entry_condition(sid)
+        return True
+
+    def release_critical_section(self, resource=None):
+        with self._lock:
+            section = self._sections.pop(section_id(resource), None)
+            if section is None:
+                return
+            self.logger.info(f"Exiting CS {self._label(resource)}. Releasing {len(section.asked)} votes.")
+            section.state = State.RELEASED
+            self._exited(section)
+            for voter in sorted(section.asked):
+                self._send(voter, self._message(MessageType.RELEASE, section.request_ts, section.resource))
+
+    def handle_message(self, msg):
+        ts = msg.get("ts", 0)
+        self.clock.update(ts)
+        with self._lock:
+            self._dispatch(msg.get("type"), msg.get("sender"), ts, msg.get("resource"))
+
+    def on_peer_lost(self, peer_id):
+        with self._lock:
+            self.logger.info(f"Peer {peer_id} lost. Re-evaluating.")
+            for key in [k for k in self._votes if k[1] == peer_id]:
+                del self._votes[key]
+            self._waiting = [w for w in self._waiting if w[1] != peer_id]
+            self._grant_waiting()
+
+            for sid, section in list(self._sections.items()):
+                if section.state != State.WANTED:
+                    continue
+                section.inquiries.discard(peer_id)
+                # A voter is gone: the grid is rebuilt without it and any new
+                # quorum members are asked for their vote.
+                section.targets = self.quorum()
+                self._ask(section, section.targets - section.asked)
+                self._check_entry_condition(sid)
+
+    def _dispatch(self, msg_type, sender, ts, resource):
+        if msg_type == MessageType.REQUEST:
+            self._on_request(sender, ts, resource)
+        elif msg_type == MessageType.RELEASE:
+            self._on_release(sender, ts)
+        elif msg_type == MessageType.YIELD:
+            self._on_yield(sender, ts, resource)
+        elif msg_type == MessageType.REPLY:
+            self._on_vote(sender, ts, resource)
+        elif msg_type == MessageType.INQUIRE:
+            self._on_inquire(sender, ts, resource)
+        elif msg_type == MessageType.FAILED:
+            self._on_failed(sender, ts, resource)
+
+    # Voter side
+
+    def _on_request(self, sender, ts, resource):
+        request = (ts, sender)
+        keys = resource_keys(resource)
+        conflicts = [(key, vote) for key, vote in self._votes.items() if vote.keys & keys]
+        ahead = [w for w in self._waiting if w[:2] < request and resource_keys(w[2]) & keys]
+
+        if not conflicts and not ahead:
+            self._grant(ts, sender, resource)
+            return
+
+        bisect.insort(self._waiting, (ts, sender, resource), key=lambda w: w[:2])
+        self.metrics.gauge("deferred_requests", len(self._waiting))
+        self.logger.debug(f"Queued REQUEST {self._label(resource)} from {sender}")
+
+        if ahead or any(key < request for key, _ in conflicts):
+            self._fail(ts, sender, resource)
+        for key, vote in conflicts:
+            if request < key and not vote.inquired:
+                vote.inquired = True
+                self._send(key[1], self._message(MessageType.INQUIRE, key[0], vote.resource))
+        self._fail_behind(request, keys)
+
+    def _on_release(self, sender, ts):
+        self._votes.pop((ts, sender), None)
+        self._waiting = [w for w in self._waiting if w[:2] != (ts, sender)]
+        self._failed_sent.discard((ts, sender))
+        self._grant_waiting()
+
+    def _on_yield(self, sender, ts, resource):
+        vote = self._votes.pop((ts, sender), None)
+        if vote is None:
+            return
+        self.logger.debug(f"{sender} yielded {self._label(resource)}")
+        bisect.insort(self._waiting, (ts, sender, vote.resource), key=lambda w: w[:2])
+        self._grant_waiting()
+
+    def _grant_waiting(self):
+        # Grant in priority order; a request never overtakes an earlier,
+        # overlapping one that is still waiting.
+        claimed = set().union(*(vote.keys for vote in self._votes.values()))
+        still_waiting = []
+        for ts, sender, resource in self._waiting:
+            keys = resource_keys(resource)
+            if keys & claimed:
+                still_waiting.append((ts, sender, resource))
+            else:
+                self._grant(ts, sender, resource)
+            claimed |= keys
+        self._waiting = still_waiting
+        self.metrics.gauge("deferred_requests", len(self._waiting))
+
+    def _grant(self, ts, sender, resource):
+        vote = self._votes[(ts, sender)] = Vote(resource)
+        self._failed_sent.discard((ts, sender))
+        self._send(sender, self._message(MessageType.REPLY, ts, resource))
+        self._fail_behind((ts, sender), vote.keys)
+
+    def _fail_behind(self, request, keys):
+        # Lower-priority requests now queued behind this one must hear so, or
+        # they would keep votes that an earlier request needs.
+        for w in list(self._waiting):
+            if request < w[:2] and resource_keys(w[2]) & keys:
+                self._fail(*w)
+
+    def _fail(self, ts, sender, resource):
+        if (ts, sender) in self._failed_sent:
+            return
+        self._failed_sent.add((ts, sender))
+        self._send(sender, self._message(MessageType.FAILED, ts, resource))
+
+    # Requester side
+
+    def _own_section(self, ts, resource):
+        section = self._sections.get(section_id(resource))
+        if section is None or section.request_ts != ts:
+            return None
+        return section
+
+    def _on_vote(self, voter, ts, resource):
+        section = self._own_section(ts, resource)
+        if section is None:
+            # A vote for a request we no longer have would block the voter forever.
+            self._send(voter, self._message(MessageType.RELEASE, ts, resource))
+            return
+        if section.state != State.WANTED:
+            return
+        section.replies.add(voter)
+        section.inquiries.discard(voter)
+        self._check_entry_condition(section_id(resource))
+
+    def _on_inquire(self, voter, ts, resource):
+        section = self._own_section(ts, resource)
+        if section is None or section.state != State.WANTED or voter not in section.replies:
+            return
+        if section.failed:
+            self._yield(section, voter)
+        else:
+            section.inquiries.add(voter)
+
+    def _on_failed(self, voter, ts, resource):
+        section = self._own_section(ts, resource)
+        if section is None or section.state != State.WANTED:
+            return
+        section.failed = True
+        for inquirer in sorted(section.inquiries):
+            self._yield(section, inquirer)
+
+    def _yield(self, section, voter):
+        section.inquiries.discard(voter)
+        section.replies.discard(voter)
+        self.logger.debug(f"Yielding vote of {voter} for {self._label(section.resource)}")
+        self._send(voter, self._message(MessageType.YIELD, section.request_ts, section.resource))
+
+    def _ask(self, section, voters):
+        section.asked |= voters
+        msg = self._message(MessageType.REQUEST, section.request_ts, section.resource)
+        for voter in sorted(voters):
+            self._send(voter, dict(msg))
+
+    def _check_entry_condition(self, sid):
+        section = self._sections[sid]
+        if section.state != State.WANTED:
+            return
+        alive = set(self.get_peers()) | {self.node_id}
+        waiting = (section.targets & alive) - section.replies
+        self.logger.debug(f"Votes {self._label(section.resource)}: {len(section.targets & alive) - len(waiting)}/{len(section.targets & alive)}")
+        if not waiting:
+            section.state = State.HELD
+            section.inquiries.clear()
+            self._entered(section)
+            self.logger.info(f">>> ENTERED CRITICAL SECTION {self._label(section.resource)} <<<")
+            if section.callback:
+                self.run_callback(section.callback)
+
+    def _send(self, target_id, msg):
+        if target_id == self.node_id:
+            self._dispatch(msg["type"], self.node_id, msg["ts"], msg.get("resource"))
+        else:
+            self.transport.send_to_node(target_id, msg)
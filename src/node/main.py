@@ -1,216 +1,62 @@
-import sys
-import threading
-import time
+import argparse
 import logging
-from src.node.gui import CinemaGUI
-from src.node.peer import Peer
-from src.node.algorithm import RicartAgrawala
-from src.common.models import LamportClock, MessageType
-from src.common.protocol import PacketProtocol
+import threading
+from src.node.core import CinemaNode, NAMESERVER_HOST, NAMESERVER_PORT
+from src.node.control import CommandServer
+from src.common.metrics import MetricsDumper, DUMP_INTERVAL
+from src.node.mutex import ALGORITHMS, DEFAULT_ALGORITHM
+from src.node.claims import CLAIM_WINDOW
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s', datefmt='%H:%M:%S')
-logger = logging.getLogger("Main")
-
-NAMESERVER_HOST = "127.0.0.1"
-NAMESERVER_PORT = 5000
-
-class CinemaNode:
-    def __init__(self, node_id, port):
-        self.node_id = node_id
-        self.port = port
-
-        self.seats = [None] * 25 
-        
-        self.clock = LamportClock()
-
-        self.algo = RicartAgrawala(
-            node_id=node_id,
-            clock=self.clock,
-            peers_list_func=lambda: self.peer.get_known_peers(),
-            peer_transport=None 
-        )
-        
-        self.peer = Peer(
-            node_id, 
-            "127.0.0.1", 
-            port, 
-            self.on_network_message,
-            on_peer_disconnect=self.algo.on_peer_lost
-        )
-        
-        self.algo.transport = self.peer
-
-        self.gui = CinemaGUI(node_id, total_seats=25, on_seat_click=self.handle_gui_click)
-
-    def start(self):
-        self.peer.start()
-        self.register_to_nameserver()
-        self.gui.log(f"Node started on port {self.port}")
-        self.gui.start()
-
-    def stop(self):
-        self.peer.stop()
-
-    def register_to_nameserver(self):
-        msg = {
-            "type": "REGISTER",
-            "node_id": self.node_id,
-            "listening_port": self.port
-        }
-        try:
-            import socket
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.connect((NAMESERVER_HOST, NAMESERVER_PORT))
-                s.sendall(PacketProtocol.serialize(msg))
-            logger.info("Registered to NameServer")
-        except Exception as e:
-            logger.error(f"Could not connect to NameServer: {e}")
-            self.gui.log("ERROR: NameServer unreachable!")
-
-    def on_network_message(self, msg, sender_ip=None):
-        m_type = msg.get("type")
-        sender = msg.get("sender")
-
-        if m_type == "SYNC":
-            peers = msg.get("peers", {})
-            old_peers_count = len(self.peer.get_known_peers())
-            self.peer.update_directory(peers)
-            
-            known = self.peer.get_known_peers()
-            if old_peers_count == 0 and len(known) > 0:
-                others = [pid for pid in known if pid != self.node_id]
-                if others:
-                    target = others[0]
-                    self.gui.log(f"Syncing state from {target}...")
-                    self._request_state_from_peer(target)
-            return
-
-        if m_type == MessageType.STATE_REQUEST:
-            response = {
-                "type": MessageType.STATE_REPLY,
-                "seats": self.seats, 
-                "sender": self.node_id
-            }
-            self.peer.send_to_node(sender, response)
-            return
-
-        if m_type == MessageType.STATE_REPLY:
-            new_seats = msg.get("seats")
-            self.seats = new_seats
-            self._refresh_gui()
-            self.gui.log(f"State synced from {sender}!")
-            return
-
-        if m_type == "SEAT_TAKEN":
-            seat_id = msg.get("seat_id")
-            owner = msg.get("seat_owner") 
-            self.seats[seat_id] = owner
-            self._update_single_seat(seat_id)
-            self.gui.log(f"Seat {seat_id} taken by {owner}")
-            self.clock.update(msg.get("ts", 0))
-            return
-
-        if m_type == "SEAT_FREED":
-            seat_id = msg.get("seat_id")
-            prev_owner = msg.get("sender")
-            self.seats[seat_id] = None
-            self._update_single_seat(seat_id)
-            self.gui.log(f"Seat {seat_id} freed by {prev_owner}")
-            self.clock.update(msg.get("ts", 0))
-            return
-
-        if m_type in [MessageType.REQUEST, MessageType.REPLY]:
-            self.algo.handle_message(msg)
-
-    def _refresh_gui(self):
-        for i in range(25):
-            self._update_single_seat(i)
-
-    def _update_single_seat(self, seat_id):
-        owner = self.seats[seat_id]
-        if owner is None:
-            self.gui.update_seat_color(seat_id, "#90EE90")
-        elif owner == self.node_id:
-            self.gui.update_seat_color(seat_id, "#32CD32")
-        else:
-            self.gui.update_seat_color(seat_id, "#FF6347") 
-
-    def _request_state_from_peer(self, target_id):
-        msg = {"type": MessageType.STATE_REQUEST, "sender": self.node_id}
-        self.peer.send_to_node(target_id, msg)
-
-    def handle_gui_click(self, seat_id):
-        current_owner = self.seats[seat_id]
-
-        if current_owner is not None and current_owner != self.node_id:
-            self.gui.log(f"Seat {seat_id} is owned by {current_owner}!")
-            return
-
-        if current_owner == self.node_id:
-            self.gui.log(f"Releasing seat {seat_id}...")
-            self.gui.update_seat_color(seat_id, "#FFD700") 
-            
-            threading.Thread(target=self._async_release, args=(seat_id,)).start()
-            return
-
-        self.gui.log(f"Requesting seat {seat_id} (Current T={self.clock.value})...")
-        self.gui.update_seat_color(seat_id, "#FFD700") 
-        
-        threading.Thread(target=self._async_request, args=(seat_id,)).start()
-
-    def _async_request(self, seat_id):
-        success = self.algo.request_critical_section(lambda: self._on_acquire_cs(seat_id))
-        if not success:
-            self.gui.log("System busy.")
-            self._update_single_seat(seat_id)
-
-    def _async_release(self, seat_id):
-        success = self.algo.request_critical_section(lambda: self._on_release_cs(seat_id))
-        if not success:
-            self.gui.log("System busy. Keep clicking.")
-            self._update_single_seat(seat_id)
-
-    def _on_acquire_cs(self, seat_id):
-        if self.seats[seat_id] is None:
-            self.seats[seat_id] = self.node_id
-            self._update_single_seat(seat_id)
-            self.gui.log(f"SUCCESS: Booked seat {seat_id} @ Time {self.clock.value}")
-            
-            self.peer.broadcast({
-                "type": "SEAT_TAKEN",
-                "seat_id": seat_id,
-                "seat_owner": self.node_id,
-                "ts": self.clock.value
-            })
-        else:
-            self.gui.log(f"FAIL: Seat {seat_id} taken by {self.seats[seat_id]}!")
-            self._update_single_seat(seat_id)
-
-        time.sleep(0.5) 
-        self.algo.release_critical_section()
-
-    def _on_release_cs(self, seat_id):
-        if self.seats[seat_id] == self.node_id:
-            self.seats[seat_id] = None
-            self._update_single_seat(seat_id)
-            self.gui.log(f"RELEASED: Seat {seat_id} is now free.")
-            
-            self.peer.broadcast({
-                "type": "SEAT_FREED",
-                "seat_id": seat_id,
-                "sender": self.node_id,
-                "ts": self.clock.value
-            })
-        
-        time.sleep(0.5)
-        self.algo.release_critical_section()
 
 if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        print("Usage: python -m src.node.main <node_id> <port>")
-    else:
-        node = CinemaNode(sys.argv[1], int(sys.argv[2]))
-        try:
-            node.start()
-        except KeyboardInterrupt:
-            node.stop()
\ No newline at end of file
+    parser = argparse.ArgumentParser(prog="python -m src.node.main", description="DS-Cinema node")
+    parser.add_argument("node_id")
+    parser.add_argument("port", type=int)
+    parser.add_argument("--transport", choices=["threads", "asyncio"], default="threads")
+    parser.add_argument("--codec", choices=["json", "binary"], default="binary", help="binary is used only with peers that also advertise it")
+    parser.add_argument("--algorithm", choices=sorted(ALGORITHMS), default=DEFAULT_ALGORITHM, help="mutual exclusion algorithm; must match the other nodes")
+    parser.add_argument("--optimistic", action="store_true", help="book uncontended seats with a single claim broadcast; must match the other nodes. A reported booking is only final once every node has seen the claim: an earlier claim arriving after --claim-window overturns it, and the seats are then listed as overturned by query")
+    parser.add_argument("--claim-window", type=float, default=CLAIM_WINDOW, metavar="SECONDS", help="how long an optimistic claim waits for competing claims")
+    parser.add_argument("--gossip-fanout", type=int, metavar="N", help="spread seat updates by gossip to N random peers per hop instead of to every peer")
+    parser.add_argument("--shard", action="append", dest="shards", metavar="HALL:SCREENING[:SEATS]", help="screening served by this node (repeatable)")
+    parser.add_argument("--nameserver", default=f"{NAMESERVER_HOST}:{NAMESERVER_PORT}", metavar="HOST:PORT")
+    parser.add_argument("--headless", action="store_true", help="run without the Tkinter GUI")
+    parser.add_argument("--control-port", type=int, metavar="PORT", help="serve line-delimited JSON commands on this local port")
+    parser.add_argument("--stats-file", metavar="PATH", help="periodically dump runtime metrics as JSON to this file")
+    parser.add_argument("--stats-interval", type=float, default=DUMP_INTERVAL, metavar="SECONDS")
+    parser.add_argument("--data-dir", metavar="DIR", help="keep a write-ahead log and snapshots of the seat state in DIR")
+    parser.add_argument("--trace-dir", metavar="DIR", help="record a binary message trace to DIR/<node_id>.trace")
+    args = parser.parse_args()
+
+    ns_host, ns_port = args.nameserver.rsplit(":", 1)
+    node = CinemaNode(args.node_id, args.port, transport=args.transport, codec=args.codec, shards=args.shards, algorithm=args.algorithm,
+                      nameserver=(ns_host, int(ns_port)), trace_dir=args.trace_dir,
+                      optimistic=args.optimistic, claim_window=args.claim_window,
+                      data_dir=args.data_dir, gossip_fanout=args.gossip_fanout)
+
+    frontend = None
+    if not args.headless:
+        from src.node.gui import GuiFrontend
+        frontend = GuiFrontend(node)
+
+    control = CommandServer(node, args.control_port) if args.control_port is not None else None
+    dumper = MetricsDumper(node.metrics, args.stats_file, args.stats_interval, {"node_id": node.node_id}) if args.stats_file else None
+    try:
+        node.start()
+        if control:
+            control.start()
+        if dumper:
+            dumper.start()
+        if frontend:
+            frontend.start()
+        else:
+            threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if control:
+            control.stop()
+        if dumper:
+            dumper.stop()
+        node.stop()
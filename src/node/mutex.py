@@ -0,0 +1,11 @@
+from src.node.algorithm import RicartAgrawala
+from src.node.maekawa import Maekawa
+from src.node.suzuki_kasami import SuzukiKasami
+
+# Every node serving a screening must run the same algorithm.
+ALGORITHMS = {
+    "ricart-agrawala": RicartAgrawala,
+    "maekawa": Maekawa,
+    "suzuki-kasami": SuzukiKasami,
+}
+DEFAULT_ALGORITHM = "ricart-agrawala"
@@ -0,0 +1,68 @@
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Tuple
+from src.common.protocol import PacketProtocol
+
+
+class _Destination:
+    def __init__(self):
+        self.items = []
+        # Set while a drain runs for this destination; frames submitted
+        # meanwhile wait for it and leave together in its next write.
+        self.busy = False
+        self.lock = threading.Lock()
+
+
+class Outbox:
+    def __init__(self, send: Callable[[str, int, bytes], bool], executor):
+        self._send = send
+        self._executor = executor
+        self._destinations: Dict[Tuple[str, int], _Destination] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, host: str, port: int, frame: bytes, batch: bool = False) -> Future:
+        future = Future()
+        key = (host, port)
+        with self._lock:
+            dest = self._destinations.get(key)
+            if dest is None:
+                dest = self._destinations[key] = _Destination()
+        with dest.lock:
+            dest.items.append((frame, future))
+            if dest.busy:
+                return future
+            dest.busy = True
+
+        try:
+            self._executor.submit(self._drain, key, dest, batch)
+        except RuntimeError:
+            with dest.lock:
+                items, dest.items = dest.items, []
+                dest.busy = False
+            for _, pending in items:
+                pending.set_result(False)
+        return future
+
+    def retain(self, addresses):
+        keep = set(addresses)
+        with self._lock:
+            for key in [k for k in self._destinations if k not in keep]:
+                del self._destinations[key]
+
+    def _drain(self, key, dest: _Destination, batch: bool):
+        # One drain per destination at a time keeps its frames in FIFO order.
+        while True:
+            with dest.lock:
+                items, dest.items = dest.items, []
+                if not items:
+                    dest.busy = False
+                    return
+            frames = [frame for frame, _ in items]
+            # Peers that cannot unpack batch frames still get all frames in one write.
+            data = b"".join(PacketProtocol.batch(frames) if batch else frames)
+            try:
+                ok = self._send(key[0], key[1], data)
+            except Exception:
+                ok = False
+            for _, future in items:
+                future.set_result(ok)
@@ -1,16 +1,33 @@
 import socket
 import threading
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from typing import Callable, Dict, Tuple
-from src.common.protocol import PacketProtocol
+from src.common.protocol import PacketProtocol, FrameDecoder, ProtocolError, MalformedFrame
+from src.common.codec import CODEC_JSON, CODEC_BINARY
+from src.common.metrics import Metrics
+from src.common.trace import NO_TRACE, SEND, RECV
+from src.node.connection_pool import ConnectionPool
+from src.node.outbox import Outbox
+
+SEND_TIMEOUT = 2.0
+IDLE_TIMEOUT = 30.0
+MAINTENANCE_INTERVAL = 5.0
+BROADCAST_WORKERS = 16
+BROADCAST_DEADLINE = SEND_TIMEOUT + 0.5
+PENDING_ADDRESS_TTL = 5.0
 
 class Peer:
-    def __init__(self, node_id: str, host: str, port: int, on_message_received: Callable[[dict, str], None], on_peer_disconnect: Callable[[str], None] = None):
+    def __init__(self, node_id: str, host: str, port: int, on_message_received: Callable[[dict, str], None], on_peer_disconnect: Callable[[str], None] = None, metrics: Metrics = None):
         self.node_id = node_id
         self.host = host
         self.port = port
         self.on_message_received = on_message_received
         self.on_peer_disconnect = on_peer_disconnect
+        self.codecs = ["json", "binary", "batch"]
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.tracer = NO_TRACE
         
         self.running = False
         self._server_socket = None
@@ -18,62 +35,174 @@ class Peer:
         
         self._peers_directory: Dict[str, Dict] = {}
         self._directory_lock = threading.RLock()
+        self.directory_version = 0
+        # State transfer for nodes we have heard from before our directory
+        # learned their address, e.g. a joiner's STATE_REQUEST racing its SYNC.
+        self._awaiting_address: Dict[str, list] = {}
+
+        self._pool = ConnectionPool(connect_timeout=SEND_TIMEOUT, idle_timeout=IDLE_TIMEOUT, metrics=self.metrics)
+        self._maintenance_thread = None
+        self._fanout = ThreadPoolExecutor(max_workers=BROADCAST_WORKERS, thread_name_prefix=f"fanout-{node_id}")
+        self._outbox = Outbox(lambda host, port, data: self._pool.send(host, port, data), self._fanout)
+        self._inbound = set()
+        self._inbound_lock = threading.Lock()
         
         self.logger = logging.getLogger(f"Node-{node_id}")
 
     def start(self):
         self.running = True
         self._server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self._server_socket.bind((self.host, self.port))
         self._server_socket.listen(10)
         
         self._server_thread = threading.Thread(target=self._listen_loop, daemon=True)
         self._server_thread.start()
+
+        self._maintenance_thread = threading.Thread(target=self._maintenance_loop, daemon=True)
+        self._maintenance_thread.start()
         self.logger.info(f"Peer started on {self.host}:{self.port}")
 
     def stop(self):
         self.running = False
         if self._server_socket:
+            try:
+                self._server_socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
             try:
                 self._server_socket.close()
             except:
                 pass
+        self._pool.close_all()
+        self._fanout.shutdown(wait=False, cancel_futures=True)
+        with self._inbound_lock:
+            inbound = list(self._inbound)
+        for conn in inbound:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
 
-    def update_directory(self, new_directory: Dict):
+    def update_directory(self, new_directory: Dict = None, version: int = None, base: int = None, joined: Dict = None, left: list = ()) -> bool:
         with self._directory_lock:
-            self._peers_directory = new_directory
+            if version is not None and version <= self.directory_version:
+                return True
+            before = set(self._peers_directory)
+            if new_directory is not None:
+                self._peers_directory = dict(new_directory)
+            elif base is not None and base > self.directory_version:
+                self.logger.info(f"Directory gap: have v{self.directory_version}, delta starts at v{base}")
+                return False
+            else:
+                self._peers_directory.update(joined or {})
+                for node_id in left:
+                    self._peers_directory.pop(node_id, None)
+                    self._awaiting_address.pop(node_id, None)
+            if version is not None:
+                self.directory_version = version
+            addresses = [(d["host"], d["port"]) for d in self._peers_directory.values()]
+            removed = before - set(self._peers_directory)
+            deliverable = self._take_awaiting()
+        self._pool.retain(addresses)
+        self._outbox.retain(addresses)
+        for node_id, target, message in deliverable:
+            self.metrics.count("messages_sent", message.get("type"))
+            self.tracer.message(SEND, message, node_id)
+            self._send_direct(target["host"], target["port"], message, self._codec_for(target), self._batches(target))
+        for node_id in removed:
+            self._peer_lost(node_id)
+        return True
+
+    def _peer_lost(self, node_id: str):
+        with self._directory_lock:
+            self._awaiting_address.pop(node_id, None)
+        if self.on_peer_disconnect:
+            self.on_peer_disconnect(node_id)
 
     def get_known_peers(self):
         with self._directory_lock:
             return list(self._peers_directory.keys())
 
+    def get_directory(self) -> Dict[str, Dict]:
+        with self._directory_lock:
+            return dict(self._peers_directory)
+
     def send_to_node(self, target_node_id: str, message: dict):
         target = None
+        message["sender"] = self.node_id
         with self._directory_lock:
             target = self._peers_directory.get(target_node_id)
+            # Only state transfer may wait: a held grant or token could reach
+            # a later run of a node that restarted under the same id.
+            held = not target and str(message.get("type", "")).startswith("STATE_")
+            if held:
+                self._awaiting_address.setdefault(target_node_id, []).append((time.monotonic() + PENDING_ADDRESS_TTL, message))
         
         if target:
-            message["sender"] = self.node_id
-            self._send_direct(target["host"], target["port"], message)
+            self.metrics.count("messages_sent", message.get("type"))
+            self.tracer.message(SEND, message, target_node_id)
+            self._send_direct(target["host"], target["port"], message, self._codec_for(target), self._batches(target))
+        elif held:
+            self.logger.info(f"Holding message for {target_node_id} until its address is known")
         else:
-            self.logger.warning(f"Cannot send to {target_node_id}: unknown address")
+            self.logger.warning(f"Node {target_node_id} not found in directory, dropping {message.get('type')}")
+
+    def _take_awaiting(self):
+        now = time.monotonic()
+        deliverable = []
+        for node_id, queued in list(self._awaiting_address.items()):
+            target = self._peers_directory.get(node_id)
+            if target:
+                deliverable.extend((node_id, target, message) for deadline, message in queued if deadline > now)
+                del self._awaiting_address[node_id]
+            else:
+                queued[:] = [entry for entry in queued if entry[0] > now]
+                if not queued:
+                    del self._awaiting_address[node_id]
+        return deliverable
 
-    def broadcast(self, message: dict, exclude_self=True) -> list:
+    def broadcast(self, message: dict, exclude_self=True, targets=None, wait=True) -> list:
         successful_recipients = []
         dead_nodes = []
 
         with self._directory_lock:
-            targets = list(self._peers_directory.items())
+            if targets is None:
+                targets = list(self._peers_directory.items())
+            else:
+                targets = [(pid, self._peers_directory[pid]) for pid in targets if pid in self._peers_directory]
 
         message["sender"] = self.node_id
-        
-        for pid, data in targets:
-            if exclude_self and pid == self.node_id:
-                continue
-            
-            success = self._send_direct(data["host"], data["port"], message)
-            
-            if success:
+        targets = [(pid, data) for pid, data in targets if not (exclude_self and pid == self.node_id)]
+        if not targets:
+            return successful_recipients
+        self.metrics.count("messages_sent", message.get("type"), len(targets))
+        for pid, _ in targets:
+            self.tracer.message(SEND, message, pid)
+
+        frames = {}
+        try:
+            for pid, data in targets:
+                codec = self._codec_for(data)
+                if codec not in frames:
+                    frames[codec] = PacketProtocol.serialize(message, codec)
+        except Exception as e:
+            self.logger.error(f"Cannot serialize broadcast: {e}")
+            return successful_recipients
+
+        if not wait:
+            # Fire-and-forget: queued behind earlier messages to each node, failures
+            # are left to lease expiry.
+            for pid, data in targets:
+                self._post(data, frames[self._codec_for(data)])
+            return [pid for pid, _ in targets]
+
+        started = time.perf_counter()
+        results = self._fan_out([(pid, data, frames[self._codec_for(data)]) for pid, data in targets])
+        self.metrics.observe("broadcast_fanout", time.perf_counter() - started)
+
+        for pid, _ in targets:
+            if results.get(pid):
                 successful_recipients.append(pid)
             else:
                 self.logger.warning(f"Detected crash of node {pid}. Removing from directory.")
@@ -82,22 +211,48 @@ class Peer:
         if dead_nodes:
             with self._directory_lock:
                 for dead_id in dead_nodes:
-                    self._peers_directory.pop(dead_id, None)
-                    if self.on_peer_disconnect:
-                        self.on_peer_disconnect(dead_id)
+                    dead = self._peers_directory.pop(dead_id, None)
+                    if dead:
+                        self._pool.discard(dead["host"], dead["port"])
+                # Our directory no longer matches any NameServer version: the
+                # next SYNC or heartbeat brings a full copy, which puts the
+                # peer back if it was only slow and still holds its lease.
+                self.directory_version = 0
+            for dead_id in dead_nodes:
+                self._peer_lost(dead_id)
 
         return successful_recipients
 
-    def _send_direct(self, host: str, port: int, message: dict) -> bool:
+    def _codec_for(self, target: Dict) -> int:
+        if "binary" in self.codecs and "binary" in target.get("codecs", ()):
+            return CODEC_BINARY
+        return CODEC_JSON
+
+    def _batches(self, target: Dict) -> bool:
+        return "batch" in self.codecs and "batch" in target.get("codecs", ())
+
+    def _post(self, target: Dict, frame: bytes):
+        return self._outbox.submit(target["host"], target["port"], frame, self._batches(target))
+
+    def _fan_out(self, targets: list) -> Dict[str, bool]:
+        futures = {self._post(data, frame): pid for pid, data, frame in targets}
+        done, _ = wait(futures, timeout=BROADCAST_DEADLINE)
+        return {pid: future in done and future.result() for future, pid in futures.items()}
+
+    def _send_direct(self, host: str, port: int, message: dict, codec: int = CODEC_JSON, batch: bool = False) -> bool:
         try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.settimeout(2.0)
-                s.connect((host, port))
-                data = PacketProtocol.serialize(message)
-                s.sendall(data)
-            return True
+            data = PacketProtocol.serialize(message, codec)
         except Exception:
             return False
+        self._outbox.submit(host, port, data, batch)
+        return True
+
+    def _maintenance_loop(self):
+        while self.running:
+            time.sleep(MAINTENANCE_INTERVAL)
+            evicted = self._pool.evict_idle()
+            if evicted:
+                self.logger.debug(f"Evicted {evicted} idle connections")
 
     def _listen_loop(self):
         while self.running:
@@ -112,20 +267,40 @@ class Peer:
                 break
 
     def _handle_client(self, conn: socket.socket, addr):
+        with self._inbound_lock:
+            self._inbound.add(conn)
+        try:
+            self._read_frames(conn)
+        finally:
+            with self._inbound_lock:
+                self._inbound.discard(conn)
+
+    def _read_frames(self, conn: socket.socket):
+        decoder = FrameDecoder()
         with conn:
-            buffer = b""
             while True:
                 try:
-                    chunk = conn.recv(4096)
-                    if not chunk: break
-                    buffer += chunk
-                    
-                    while True:
-                        msg, remainder = PacketProtocol.deserialize(buffer)
-                        if msg:
-                            self.on_message_received(msg)
-                            buffer = remainder
-                        else:
-                            break
+                    received = decoder.recv_into(conn)
+                    if not received: break
+                    self.metrics.count("bytes_received", n=received)
+                    self._dispatch_frames(decoder)
+                except ProtocolError as e:
+                    self.logger.warning(f"Closing connection: {e}")
+                    break
                 except Exception:
-                    break
\ No newline at end of file
+                    break
+
+    def _dispatch_frames(self, decoder: FrameDecoder):
+        while True:
+            try:
+                for msg in decoder.frames():
+                    self.metrics.count("messages_received", msg.get("type"))
+                    self.tracer.message(RECV, msg, msg.get("sender"))
+                    try:
+                        self.on_message_received(msg)
+                    except Exception as e:
+                        # One bad message must not cost the frames queued behind it.
+                        self.logger.error(f"Handler error on {msg.get('type')} from {msg.get('sender')}: {e!r}")
+                return
+            except MalformedFrame as e:
+                self.logger.warning(f"Dropped malformed frame: {e}")
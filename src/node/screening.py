@@ -0,0 +1,602 @@
+import base64
+import threading
+import time
+import zlib
+from src.common.models import MessageType
+from src.common.seatmap import SeatMap, NO_VERSION
+from src.node.mutex import ALGORITHMS, DEFAULT_ALGORITHM
+from src.node.booking import BookingQueue
+from src.node.claims import Claim, ClaimTable, CLAIM_WINDOW
+from src.node.journal import NO_JOURNAL
+from src.node.gossip import Gossip, GOSSIP_FANOUT
+from src.node.changelog import SeatChangeLog
+
+DEFAULT_SHARD = "main:default"
+DEFAULT_SEATS = 25
+
+
+def parse_shard(spec: str, default_seats: int = DEFAULT_SEATS):
+    parts = spec.split(":")
+    if len(parts) == 3:
+        return f"{parts[0]}:{parts[1]}", int(parts[2])
+    if len(parts) == 2:
+        return spec, default_seats
+    raise ValueError(f"Shard must be hall:screening[:seats], got {spec!r}")
+
+
+def serves(peer_info: dict, shard: str) -> bool:
+    return shard in peer_info.get("shards", [DEFAULT_SHARD])
+
+
+# Messages that hand a mutex permission (or the token) to another node.
+GRANTS = (MessageType.REPLY, MessageType.RELEASE, MessageType.TOKEN)
+
+
+class ShardTransport:
+    def __init__(self, peer, shard: str):
+        self.peer = peer
+        self.shard = shard
+        # Called with (target_id, resource) before a grant goes out.
+        self.before_grant = None
+
+    def subscribers(self):
+        return [pid for pid, info in self.peer.get_directory().items() if serves(info, self.shard)]
+
+    def broadcast(self, msg, exclude_self=True, targets=None, wait=True):
+        msg = dict(msg, shard=self.shard)
+        subscribers = self.subscribers()
+        if targets is not None:
+            subscribers = [pid for pid in subscribers if pid in targets]
+        return self.peer.broadcast(msg, exclude_self=exclude_self, targets=subscribers, wait=wait)
+
+    def send_to_node(self, target_id, msg):
+        if self.before_grant and msg.get("type") in GRANTS:
+            self.before_grant(target_id, msg.get("resource"))
+        self.peer.send_to_node(target_id, dict(msg, shard=self.shard))
+
+
+class Screening:
+    def __init__(self, node, key: str, total_seats: int, hold_time: float = 0.0, algorithm: str = DEFAULT_ALGORITHM,
+                 optimistic: bool = False, claim_window: float = CLAIM_WINDOW, journal=None, gossip_fanout: int = None):
+        self.node = node
+        self.key = key
+        self.node_id = node.node_id
+        self.clock = node.clock
+        self.optimistic = optimistic
+        self.claim_window = claim_window
+        self.claims = ClaimTable()
+        self._pending_claims = {}
+        # Seats whose booking was reported to our client and then lost to an
+        # earlier claim that arrived after the claim window.
+        self._overturned = set()
+
+        self.seats = SeatMap(total_seats)
+        self.changelog = SeatChangeLog()
+        self._state_lock = threading.RLock()
+        self.synced = False
+        self.journal = journal or NO_JOURNAL
+        self._restore()
+
+        self.transport = ShardTransport(node.peer, key)
+        self.algo = ALGORITHMS[algorithm](
+            node_id=self.node_id,
+            clock=self.clock,
+            peers_list_func=self.transport.subscribers,
+            peer_transport=self.transport
+        )
+        self.algo.metrics = node.metrics
+        # Seat updates go to every subscriber unless a gossip fan-out is set;
+        # GOSSIP from other nodes is relayed either way.
+        self.gossip_fanout = gossip_fanout
+        self.gossip = Gossip(self.node_id, self.transport, self._on_gossip, fanout=gossip_fanout or GOSSIP_FANOUT,
+                             metrics=node.metrics)
+        # Latest update per seat and the nodes known to have it.
+        self._recent = {}
+        if gossip_fanout:
+            self.transport.before_grant = self._send_recent
+        self.algo.tracer = node.tracer.for_shard(key)
+        self.bookings = BookingQueue(
+            f"{self.node_id}/{key}",
+            self.algo,
+            resource_for=self._seats_resource,
+            apply_ops=self._apply_operations,
+            on_rejected=self._on_batch_rejected,
+            hold_time=hold_time
+        )
+
+    def log(self, message):
+        self.node.log(message, self.key)
+
+    def _restore(self):
+        start = time.perf_counter()
+        snapshot, events = self.journal.load()
+        if snapshot is None and not events:
+            return
+        with self._state_lock:
+            if snapshot is not None:
+                seat_map, watermarks = snapshot
+                saved = SeatMap.from_bytes(seat_map)
+                for seat_id in range(min(len(saved), len(self.seats))):
+                    self.seats.set(seat_id, saved[seat_id], saved.version(seat_id))
+                self.changelog.mark_compacted(watermarks)
+            # Replayed as logged, not last-writer-wins: claim resolution can
+            # lower a seat's version.
+            for ts, origin, seat_ids, owner in events:
+                for seat_id in seat_ids:
+                    if seat_id < len(self.seats):
+                        self.seats.set(seat_id, owner, (ts, origin))
+                self.changelog.append(ts, origin, seat_ids, owner)
+            self.clock.update(max(self.changelog.watermarks.values(), default=0))
+        self.log(f"Restored {len(self.seats) - self.seats.free_count()} booked seats and {len(events)} logged changes "
+                 f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    def _log_change(self, ts, origin, seat_ids, owner):
+        self.changelog.append(ts, origin, seat_ids, owner)
+        self.journal.append(ts, origin, seat_ids, owner)
+        if self.journal.snapshot_due():
+            self._compact()
+
+    def _compact(self):
+        with self._state_lock:
+            self.journal.snapshot(self.seats.to_bytes(), dict(self.changelog.watermarks))
+
+    def on_directory_update(self):
+        if self.synced:
+            return
+        others = [pid for pid in self.transport.subscribers() if pid != self.node_id]
+        if others:
+            self.synced = True
+            target = others[0]
+            self.log(f"Syncing state from {target}...")
+            self.request_state(target)
+
+    def handle_message(self, msg):
+        m_type = msg.get("type")
+        sender = msg.get("sender")
+
+        if m_type == MessageType.STATE_REQUEST:
+            self._answer_state_request(sender, msg.get("since"))
+            return
+
+        if m_type == MessageType.GOSSIP:
+            self.gossip.handle(msg)
+            return
+
+        if m_type == MessageType.STATE_DIGEST:
+            self._on_digest(sender, msg.get("digest"))
+            return
+
+        if m_type == MessageType.STATE_REPAIR:
+            self._on_repair(sender, msg)
+            return
+
+        if m_type == MessageType.STATE_DELTA:
+            changed = set()
+            with self._state_lock:
+                for ts, origin, seat_ids, owner in msg.get("events", []):
+                    changed.update(self.record_change(ts, origin, seat_ids, owner))
+                self.changelog.merge_watermarks(msg.get("watermarks", {}))
+            self._show(sorted(changed))
+            self.log(f"Applied {len(msg.get('events', []))} changes from {sender}")
+            return
+
+        if m_type == MessageType.STATE_REPLY:
+            self._apply_snapshot(msg)
+            self._compact()
+            self._show(range(len(self.seats)))
+            self.log(f"State synced from {sender}!")
+            return
+
+        if m_type == MessageType.SEAT_TAKEN:
+            seat_ids = self._seat_ids_of(msg)
+            owner = msg.get("seat_owner") 
+            with self._state_lock:
+                changed = self.record_change(msg.get("ts", 0), sender, seat_ids, owner)
+            self._show(changed)
+            self.log(f"{self._seats_label(seat_ids).capitalize()} taken by {owner}")
+            self.clock.update(msg.get("ts", 0))
+            return
+
+        if m_type == MessageType.SEAT_CLAIMED:
+            self._on_claim(sender, msg.get("ts", 0), self._seat_ids_of(msg), msg.get("bases", []))
+            return
+
+        if m_type == MessageType.SEAT_FREED:
+            seat_ids = self._seat_ids_of(msg)
+            with self._state_lock:
+                changed = self.record_change(msg.get("ts", 0), sender, seat_ids, None)
+            self._show(changed)
+            self.log(f"{self._seats_label(seat_ids).capitalize()} freed by {sender}")
+            self.clock.update(msg.get("ts", 0))
+            return
+
+        if m_type in self.algo.message_types:
+            self.algo.handle_message(msg)
+
+    def request_state(self, target_id):
+        with self._state_lock:
+            since = dict(self.changelog.watermarks)
+        msg = {"type": MessageType.STATE_REQUEST, "sender": self.node_id, "since": since}
+        self.transport.send_to_node(target_id, msg)
+
+    def anti_entropy(self):
+        others = [pid for pid in self.transport.subscribers() if pid != self.node_id]
+        if others:
+            target = self.gossip.rng.choice(others)
+            self.transport.send_to_node(target, {"type": MessageType.STATE_DIGEST, "sender": self.node_id, "digest": self._digest()})
+
+    def _on_digest(self, sender, digest):
+        if digest == self._digest():
+            return
+        # Push-pull: each side merges the other's seats by the rules it applies
+        # to live updates, so both converge whatever order gossip delivered
+        # them in. Unlike a state transfer, nothing is compacted.
+        self.log(f"State differs from {sender}, exchanging seat maps")
+        self._send_repair(sender, reply=True)
+
+    def _send_repair(self, target_id, reply):
+        with self._state_lock:
+            seats = []
+            for seat_id, owner in enumerate(self.seats):
+                version = self.seats.version(seat_id)
+                if version != NO_VERSION:
+                    base = self.claims.base_of(seat_id, version)
+                    seats.append([seat_id, owner, version[0], version[1], list(base) if base else None])
+        self.transport.send_to_node(target_id, {"type": MessageType.STATE_REPAIR, "sender": self.node_id,
+                                                "seats": seats, "reply": reply})
+
+    def _on_repair(self, sender, msg):
+        changed, lost = [], {}
+        with self._state_lock:
+            for seat_id, owner, ts, origin, base in msg.get("seats", []):
+                if not 0 <= seat_id < len(self.seats):
+                    continue
+                version = (ts, origin)
+                current = self.seats.version(seat_id)
+                if version == current:
+                    continue
+                # A claim is resolved as if it had just arrived: the lowest
+                # (ts, node_id) on a base wins, even below the current version.
+                if not (self.claims.resolve(seat_id, tuple(base), version, current) if base else version > current):
+                    continue
+                previous = self.seats[seat_id]
+                self.seats.set(seat_id, owner, version)
+                self._log_change(ts, origin, [seat_id], owner)
+                self.clock.update(ts)
+                changed.append(seat_id)
+                if owner == self.node_id:
+                    self._overturned.discard(seat_id)
+                elif previous == self.node_id and seat_id not in self._pending_claims:
+                    lost.setdefault(owner or origin, []).append(seat_id)
+            for seat_ids in lost.values():
+                self._overturned.update(seat_ids)
+
+        for winner, seat_ids in lost.items():
+            self._report_overturned(seat_ids, winner)
+        if changed:
+            self._show(changed)
+            self.log(f"Repaired {self._seats_label(changed)} from {sender}")
+        if msg.get("reply"):
+            self._send_repair(sender, reply=False)
+
+    def _digest(self):
+        with self._state_lock:
+            state = [(owner, self.seats.version(seat_id)) for seat_id, owner in enumerate(self.seats)]
+        return zlib.crc32(repr(state).encode("utf-8"))
+
+    def _answer_state_request(self, target_id, since):
+        with self._state_lock:
+            events = self.changelog.since(since) if since is not None else None
+            if events is not None:
+                response = {
+                    "type": MessageType.STATE_DELTA,
+                    "events": events,
+                    "watermarks": dict(self.changelog.watermarks),
+                    "sender": self.node_id
+                }
+            else:
+                response = {
+                    "type": MessageType.STATE_REPLY,
+                    "seatmap": base64.b64encode(self.seats.to_bytes()).decode("ascii"),
+                    "watermarks": dict(self.changelog.watermarks),
+                    "sender": self.node_id
+                }
+        self.transport.send_to_node(target_id, response)
+
+    def _apply_snapshot(self, msg):
+        with self._state_lock:
+            if "seatmap" in msg:
+                remote = SeatMap.from_bytes(base64.b64decode(msg["seatmap"]))
+                for seat_id in range(min(len(remote), len(self.seats))):
+                    version = remote.version(seat_id)
+                    if version > self.seats.version(seat_id):
+                        self.seats.set(seat_id, remote[seat_id], version)
+            else:
+                # Legacy snapshot without versions: only fill seats we know nothing about.
+                for seat_id, owner in enumerate(msg.get("seats", [])[:len(self.seats)]):
+                    if self.seats.version(seat_id) == NO_VERSION:
+                        self.seats[seat_id] = owner
+            # Nothing the snapshot covers is in our log, so it can't be served as a delta.
+            self.changelog.mark_compacted(msg.get("watermarks", {}))
+
+    def record_change(self, ts, origin, seat_ids, owner):
+        # Last-writer-wins on (ts, origin): seat changes are serialized by the
+        # mutex, so a later holder always stamps a higher Lamport timestamp.
+        version = (ts, origin)
+        changed = []
+        for seat_id in seat_ids:
+            if version > self.seats.version(seat_id):
+                self.seats.set(seat_id, owner, version)
+                changed.append(seat_id)
+        if changed:
+            self._log_change(ts, origin, changed, owner)
+            if owner == self.node_id:
+                self._overturned.difference_update(changed)
+        else:
+            self.changelog.observe(ts, origin)
+        return changed
+
+    def reserve_seats(self, seat_ids, on_done=None):
+        seat_ids = sorted(set(seat_ids))
+        if not self._check_valid(seat_ids) or not self._check_not_claimed(seat_ids):
+            return False
+        # Seats with a booking in flight are checked again when it is applied.
+        queued = self.bookings.pending_seats()
+        unavailable = [s for s in seat_ids if self.seats[s] is not None and s not in queued]
+        if unavailable:
+            self.log(f"Seats {unavailable} are not free!")
+            return False
+
+        self.node.show_pending(self.key, seat_ids)
+        if self.optimistic and self.claims.contended.isdisjoint(seat_ids) and queued.isdisjoint(seat_ids):
+            self._claim(seat_ids, on_done)
+            return True
+
+        self.log(f"Requesting {self._seats_label(seat_ids)} (Current T={self.clock.value})...")
+        self.bookings.submit(seat_ids, reserve=True, on_done=on_done)
+        return True
+
+    def release_seats(self, seat_ids, on_done=None):
+        seat_ids = sorted(set(seat_ids))
+        if not self._check_valid(seat_ids) or not self._check_not_claimed(seat_ids):
+            return False
+        queued = self.bookings.pending_seats()
+        foreign = [s for s in seat_ids if self.seats[s] != self.node_id and s not in queued]
+        if foreign:
+            self.log(f"Seats {foreign} are not yours!")
+            return False
+
+        self.log(f"Releasing {self._seats_label(seat_ids)}...")
+        self.node.show_pending(self.key, seat_ids)
+        self.bookings.submit(seat_ids, reserve=False, on_done=on_done)
+        return True
+
+    def _check_valid(self, seat_ids):
+        invalid = [s for s in seat_ids if not 0 <= s < len(self.seats)]
+        if invalid:
+            self.log(f"Seats {invalid} do not exist!")
+            return False
+        return bool(seat_ids)
+
+    def pending_seats(self) -> set:
+        with self._state_lock:
+            claimed = set(self._pending_claims)
+        return claimed | self.bookings.pending_seats()
+
+    def overturned_seats(self) -> set:
+        with self._state_lock:
+            return set(self._overturned)
+
+    def _check_not_claimed(self, seat_ids):
+        with self._state_lock:
+            pending = sorted(set(self._pending_claims).intersection(seat_ids))
+        if pending:
+            self.log(f"{self._seats_label(pending).capitalize()} already pending.")
+            return False
+        return True
+
+    def _seat_resource(self, seat_id):
+        return f"seat:{seat_id}"
+
+    def _seats_resource(self, seat_ids):
+        if len(seat_ids) == 1:
+            return self._seat_resource(seat_ids[0])
+        return [self._seat_resource(s) for s in seat_ids]
+
+    @staticmethod
+    def _seats_label(seat_ids):
+        if len(seat_ids) == 1:
+            return f"seat {seat_ids[0]}"
+        return f"seats {seat_ids}"
+
+    def _show(self, seat_ids):
+        self.node.show_seats(self.key, seat_ids)
+
+    def _on_batch_rejected(self, operations):
+        self.log("System busy. Keep clicking.")
+        for op in operations:
+            self._show(op.seat_ids)
+
+    def _apply_operations(self, operations):
+        taken, freed = [], []
+        for op in operations:
+            op.applied = self._apply_reserve(op.seat_ids) if op.reserve else self._apply_release(op.seat_ids)
+            if op.applied:
+                (taken if op.reserve else freed).extend(op.seat_ids)
+
+        if taken and self.optimistic:
+            # Claimers that have not seen these seats contended do not take
+            # the mutex, so even a holder's booking must win as a claim.
+            self._publish(self._commit_claim(sorted(taken)))
+        elif taken:
+            self._publish(self._commit_update(MessageType.SEAT_TAKEN, sorted(taken), self.node_id))
+        if freed:
+            self._publish(self._commit_update(MessageType.SEAT_FREED, sorted(freed), None))
+
+    def _publish(self, update):
+        if self.gossip_fanout:
+            self._remember(update, ())
+            self.gossip.publish(update)
+        else:
+            self.transport.broadcast(update, wait=False)
+
+    def _on_gossip(self, update, relay):
+        self._remember(update, (relay, update.get("sender")))
+        self.handle_message(update)
+
+    def _remember(self, update, holders):
+        version = (update.get("ts", 0), update.get("sender"))
+        with self._state_lock:
+            for seat_id in self._seat_ids_of(update):
+                entry = self._recent.get(seat_id)
+                if entry is None or version > entry[0]:
+                    self._recent[seat_id] = entry = (version, update, {self.node_id})
+                if version == entry[0]:
+                    entry[2].update(holders)
+
+    def _send_recent(self, target_id, resource):
+        # Mutex safety relies on a holder's seat update reaching the next
+        # holder before the permission does. Gossip gives no such order, so
+        # the update goes ahead directly, on the same FIFO connection.
+        seats = self._seats_in(resource)
+        updates = {}
+        with self._state_lock:
+            for seat_id, (version, update, holders) in self._recent.items():
+                if (seats is None or seat_id in seats) and target_id not in holders:
+                    holders.add(target_id)
+                    updates[version] = update
+        for update in updates.values():
+            self.gossip.send_direct(target_id, update)
+
+    @staticmethod
+    def _seats_in(resource):
+        if resource is None:
+            return None
+        names = resource if isinstance(resource, (list, tuple)) else [resource]
+        return {int(name[5:]) for name in names if isinstance(name, str) and name.startswith("seat:")}
+
+    def _commit_update(self, m_type, seat_ids, owner):
+        with self._state_lock:
+            ts = self.clock.increment()
+            self.record_change(ts, self.node_id, seat_ids, owner)
+        self._show(seat_ids)
+        return self._seat_update(m_type, seat_ids, ts)
+
+    def _commit_claim(self, seat_ids):
+        with self._state_lock:
+            ts = self.clock.increment()
+            version = (ts, self.node_id)
+            bases = [self.seats.version(s) for s in seat_ids]
+            for seat_id, base in zip(seat_ids, bases):
+                self.claims.resolve(seat_id, base, version, base)
+            self.record_change(ts, self.node_id, seat_ids, self.node_id)
+        self._show(seat_ids)
+        msg = self._seat_update(MessageType.SEAT_CLAIMED, seat_ids, ts)
+        msg["bases"] = [list(base) for base in bases]
+        return msg
+
+    def _claim(self, seat_ids, on_done):
+        claim = Claim(seat_ids, on_done)
+        with self._state_lock:
+            for seat_id in seat_ids:
+                self._pending_claims[seat_id] = claim
+        msg = self._commit_claim(seat_ids)
+        claim.version = (msg["ts"], self.node_id)
+        self.log(f"Claiming {self._seats_label(seat_ids)} @ Time {claim.version[0]}...")
+        self._publish(msg)
+        timer = threading.Timer(self.claim_window, self._settle_claim, args=(claim,))
+        timer.daemon = True
+        timer.start()
+
+    def _settle_claim(self, claim):
+        with self._state_lock:
+            for seat_id in claim.seat_ids:
+                self._pending_claims.pop(seat_id, None)
+            lost = {s: self.seats[s] for s in claim.seat_ids if self.seats.version(s) != claim.version}
+            self.claims.contended.update(lost)
+            claim.applied = not lost
+
+        if claim.applied:
+            self.node.metrics.count("claims", "won")
+            self.log(f"SUCCESS: Booked {self._seats_label(claim.seat_ids)} @ Time {claim.version[0]}")
+        else:
+            self.node.metrics.count("claims", "lost")
+            winners = sorted({owner for owner in lost.values() if owner is not None})
+            self.log(f"FAIL: {self._seats_label(sorted(lost))} claimed first by {winners}!")
+            # All or nothing: hand back the seats of the batch we did win.
+            kept = [s for s in claim.seat_ids if s not in lost]
+            if kept:
+                self._publish(self._commit_update(MessageType.SEAT_FREED, kept, None))
+            self._show(claim.seat_ids)
+        claim.finish()
+
+    def _on_claim(self, sender, ts, seat_ids, bases):
+        version = (ts, sender)
+        with self._state_lock:
+            self.clock.update(ts)
+            won, overturned = [], []
+            for seat_id, base in zip(seat_ids, bases):
+                previous = self.seats[seat_id]
+                if self.claims.resolve(seat_id, tuple(base), version, self.seats.version(seat_id)):
+                    # Set directly: an earlier competing claim lowers the version.
+                    self.seats.set(seat_id, sender, version)
+                    won.append(seat_id)
+                    if previous == self.node_id and seat_id not in self._pending_claims:
+                        overturned.append(seat_id)
+            if won:
+                self._log_change(ts, sender, won, sender)
+            else:
+                self.changelog.observe(ts, sender)
+            self._overturned.update(overturned)
+
+        if overturned:
+            self._report_overturned(overturned, sender)
+        if won:
+            self._show(won)
+            self.log(f"{self._seats_label(won).capitalize()} claimed by {sender}")
+
+    def _report_overturned(self, seat_ids, winner):
+        self.node.metrics.count("claims", "overturned")
+        self.log(f"WARNING: {self._seats_label(seat_ids)} lost to {winner}!")
+        self.node.show_overturned(self.key, seat_ids, winner)
+
+    def _apply_reserve(self, seat_ids):
+        taken = {s: self.seats[s] for s in seat_ids if self.seats[s] is not None}
+        if taken:
+            self.log(f"FAIL: {self._seats_label(sorted(taken))} taken by {sorted(set(taken.values()))}!")
+            self._show(seat_ids)
+            return False
+
+        with self._state_lock:
+            for seat_id in seat_ids:
+                self.seats[seat_id] = self.node_id
+        self.log(f"SUCCESS: Booked {self._seats_label(seat_ids)} @ Time {self.clock.value}")
+        return True
+
+    def _apply_release(self, seat_ids):
+        if any(self.seats[s] != self.node_id for s in seat_ids):
+            self.log(f"FAIL: {self._seats_label(seat_ids)} no longer owned by {self.node_id}!")
+            self._show(seat_ids)
+            return False
+
+        with self._state_lock:
+            for seat_id in seat_ids:
+                self.seats[seat_id] = None
+        self.log(f"RELEASED: {self._seats_label(seat_ids)} now free.")
+        return True
+
+    def _seat_update(self, m_type, seat_ids, ts):
+        msg = {"type": m_type, "sender": self.node_id, "ts": ts}
+        if len(seat_ids) == 1:
+            msg["seat_id"] = seat_ids[0]
+        else:
+            msg["seat_ids"] = list(seat_ids)
+        if m_type == MessageType.SEAT_TAKEN:
+            msg["seat_owner"] = self.node_id
+        return msg
+
+    @staticmethod
+    def _seat_ids_of(msg):
+        if "seat_ids" in msg:
+            return msg["seat_ids"]
+        return [msg.get("seat_id")]
@@ -0,0 +1,227 @@
+import threading
+import logging
+from src.common.models import MessageType
+from src.node.algorithm import MutualExclusion, Section, State, section_id
+
+
+class SuzukiKasami(MutualExclusion):
+    message_types = (
+        MessageType.REQUEST, MessageType.TOKEN,
+        MessageType.TOKEN_PROBE, MessageType.TOKEN_STATUS
+    )
+
+    def __init__(self, node_id, clock, peers_list_func, peer_transport):
+        self.node_id = node_id
+        self.clock = clock
+        self.get_peers = peers_list_func
+        self.transport = peer_transport
+
+        # One privilege token per instance: local sections on different
+        # resources may run together while this node holds it.
+        self._sections = {}
+        self._rn = {}
+        self._token = None
+        self._requested = False
+        # Latest (epoch, hops, holder) this node has seen for the token;
+        # probes use it to tell a lost token from one in transit.
+        self._seen = None
+        self._probe = None
+        self._probe_seq = 0
+
+        self._outbox = []
+        self._lock = threading.RLock()
+        self.logger = logging.getLogger(f"Token-{node_id}")
+
+    def has_token(self) -> bool:
+        with self._lock:
+            return self._token is not None
+
+    def request_critical_section(self, callback, resource=None):
+        with self._lock:
+            if self._overlaps(resource):
+                self.logger.warning(f"Attempted to request CS {self._label(resource)} while already WANTED/HELD. Ignoring.")
+                return False
+
+            section = Section(resource)
+            section.state = State.WANTED
+            section.request_ts = self.clock.increment()
+            section.callback = callback
+            self._sections[section_id(resource)] = section
+            self._wanted(section)
+
+            if self._token is None:
+                self._request_token()
+            elif not self._holding():
+                self._release_token()
+            else:
+                # Others may be queued behind sections we hold: wait our turn.
+                self.logger.info(f"Token busy, {self._label(resource)} waits for the next round")
+        self._flush()
+        return True
+
+    def release_critical_section(self, resource=None):
+        with self._lock:
+            section = self._sections.pop(section_id(resource), None)
+            if section is None:
+                return
+            self.logger.info(f"Exiting CS {self._label(resource)}")
+            section.state = State.RELEASED
+            self._exited(section)
+            if self._token is not None and not self._holding():
+                self._release_token()
+        self._flush()
+
+    def handle_message(self, msg):
+        msg_type = msg.get("type")
+        sender = msg.get("sender")
+        self.clock.update(msg.get("ts", 0))
+
+        with self._lock:
+            if msg_type == MessageType.REQUEST:
+                self._on_request(sender, msg.get("sn", 0))
+            elif msg_type == MessageType.TOKEN:
+                self._receive_token(msg.get("token"))
+            elif msg_type == MessageType.TOKEN_PROBE:
+                self._send(sender, MessageType.TOKEN_STATUS, probe=msg.get("probe"), **self._status())
+            elif msg_type == MessageType.TOKEN_STATUS:
+                if self._probe and self._probe["id"] == msg.get("probe"):
+                    self._probe["replies"][sender] = msg
+                    self._check_probe()
+        self._flush()
+
+    def on_peer_lost(self, peer_id):
+        with self._lock:
+            self.logger.info(f"Peer {peer_id} lost. Re-evaluating.")
+            if self._token is not None and peer_id in self._token["queue"]:
+                self._token["queue"].remove(peer_id)
+            if self._is_coordinator():
+                self._start_probe()
+        self._flush()
+
+    def _holding(self):
+        return any(s.state == State.HELD for s in self._sections.values())
+
+    def _request_token(self):
+        if self._requested:
+            return
+        self._requested = True
+        sn = self._rn.get(self.node_id, 0) + 1
+        self._rn[self.node_id] = sn
+        self.logger.debug(f"REQUEST token (sn={sn})")
+        self._outbox.append((None, self._message(MessageType.REQUEST, self.clock.value, None) | {"sn": sn}))
+        if self._seen is None and self._is_coordinator():
+            self._start_probe()
+
+    def _on_request(self, sender, sn):
+        if sn <= self._rn.get(sender, 0):
+            return
+        self._rn[sender] = sn
+        if self._token is not None and not self._holding():
+            self._release_token()
+        elif self._token is None and self._seen is None and self._is_coordinator():
+            self._start_probe()
+
+    def _receive_token(self, token):
+        if token is None or (self._seen and token["epoch"] < self._seen[0]):
+            return
+        self._token = token
+        self._requested = False
+        self._seen = (token["epoch"], token["hops"], self.node_id)
+        self._enter_wanted()
+        if not self._holding():
+            self._release_token()
+
+    def _enter_wanted(self):
+        for section in self._sections.values():
+            if section.state == State.WANTED:
+                section.state = State.HELD
+                self._entered(section)
+                self.logger.info(f">>> ENTERED CRITICAL SECTION {self._label(section.resource)} <<<")
+                if section.callback:
+                    self.run_callback(section.callback)
+
+    def _release_token(self):
+        token = self._token
+        ln, queue = token["ln"], token["queue"]
+        ln[self.node_id] = self._rn.get(self.node_id, 0)
+        for node_id, sn in sorted(self._rn.items()):
+            if node_id != self.node_id and node_id not in queue and sn == ln.get(node_id, 0) + 1:
+                queue.append(node_id)
+        self.metrics.gauge("deferred_requests", len(queue))
+
+        alive = set(self.get_peers())
+        while queue:
+            target = queue.pop(0)
+            if target in alive:
+                self._pass_token(target)
+                break
+
+        if any(s.state == State.WANTED for s in self._sections.values()):
+            if self._token is None:
+                self._request_token()
+            else:
+                self._enter_wanted()
+
+    def _pass_token(self, target):
+        token = self._token
+        token["hops"] += 1
+        self._token = None
+        self._seen = (token["epoch"], token["hops"], target)
+        self.logger.debug(f"Passing token to {target}")
+        self._send(target, MessageType.TOKEN, token=token)
+
+    def _is_coordinator(self):
+        return self.node_id == min(set(self.get_peers()) | {self.node_id})
+
+    def _status(self):
+        return {
+            "has_token": self._token is not None,
+            "seen": list(self._seen) if self._seen else None,
+            "sn": self._rn.get(self.node_id, 0),
+            "waiting": self._requested
+        }
+
+    def _start_probe(self):
+        self._probe_seq += 1
+        self._probe = {"id": self._probe_seq, "replies": {self.node_id: self._status()}}
+        self._outbox.append((None, self._message(MessageType.TOKEN_PROBE, self.clock.value, None) | {"probe": self._probe_seq}))
+        self._check_probe()
+
+    def _check_probe(self):
+        alive = set(self.get_peers()) | {self.node_id}
+        replies = self._probe["replies"]
+        if not alive <= set(replies):
+            return
+        self._probe = None
+        statuses = [replies[node_id] for node_id in alive]
+        if any(s["has_token"] for s in statuses):
+            return
+        seen = max((tuple(s["seen"]) for s in statuses if s["seen"]), default=None)
+        if seen and seen[2] in alive:
+            # Still in transit to a live node.
+            self._seen = self._seen or seen
+            return
+
+        epoch = (seen[0] if seen else 0) + 1
+        ln = {}
+        for node_id in sorted(alive):
+            status = replies[node_id]
+            self._rn[node_id] = max(self._rn.get(node_id, 0), status["sn"])
+            ln[node_id] = status["sn"] - (1 if status["waiting"] else 0)
+        if seen:
+            self.logger.warning(f"Token lost with {seen[2]}; regenerating epoch {epoch}")
+        else:
+            self.logger.info(f"No token in the group yet; creating epoch {epoch}")
+        self._receive_token({"epoch": epoch, "hops": 0, "ln": ln, "queue": []})
+
+    def _send(self, target_id, msg_type, **fields):
+        self._outbox.append((target_id, self._message(msg_type, self.clock.value, None) | fields))
+
+    def _flush(self):
+        with self._lock:
+            outbox, self._outbox = self._outbox, []
+        for target_id, msg in outbox:
+            if target_id is None:
+                self.transport.broadcast(msg, exclude_self=True)
+            else:
+                self.transport.send_to_node(target_id, msg)
@@ -0,0 +1,182 @@
+import heapq
+import random
+from typing import Callable, Dict, List, Optional
+from src.common.models import LamportClock
+
+
+def _wire_copy(value):
+    # What a JSON round trip would hand the receiver (tuples become lists, keys
+    # strings, no shared references), without paying for encoding.
+    kind = type(value)
+    if kind is dict:
+        return {str(k): _wire_copy(v) for k, v in value.items()}
+    if kind is list or kind is tuple:
+        return [_wire_copy(v) for v in value]
+    return value
+
+
+class FixedLatency:
+    def __init__(self, delay: float = 0.001):
+        self.delay = delay
+
+    def sample(self, rng: random.Random, src: str, dst: str) -> float:
+        return self.delay
+
+
+class UniformLatency:
+    def __init__(self, low: float = 0.0005, high: float = 0.005):
+        self.low = low
+        self.high = high
+
+    def sample(self, rng: random.Random, src: str, dst: str) -> float:
+        return rng.uniform(self.low, self.high)
+
+
+class ExponentialLatency:
+    def __init__(self, base: float = 0.0002, mean: float = 0.002):
+        self.base = base
+        self.mean = mean
+
+    def sample(self, rng: random.Random, src: str, dst: str) -> float:
+        return self.base + rng.expovariate(1.0 / self.mean)
+
+
+class MessageLoss:
+    # Drops whole messages, as a connection reset would; the algorithms assume
+    # reliable channels, so any loss is expected to show up as liveness failures.
+    def __init__(self, rate: float = 0.0):
+        self.rate = rate
+
+    def dropped(self, rng: random.Random, src: str, dst: str, msg: dict) -> bool:
+        return self.rate > 0 and rng.random() < self.rate
+
+
+class CrashModel:
+    # Each node crashes with the given probability at a uniform time in
+    # [0, horizon); survivors learn about it after detection_delay, like a
+    # NameServer lease expiry.
+    def __init__(self, probability: float = 0.0, horizon: float = 1.0, detection_delay: float = 0.05, max_crashes: int = 1):
+        self.probability = probability
+        self.horizon = horizon
+        self.detection_delay = detection_delay
+        self.max_crashes = max_crashes
+
+    def plan(self, rng: random.Random, node_ids: List[str]) -> Dict[str, float]:
+        crashes = {}
+        for node_id in node_ids:
+            if len(crashes) < self.max_crashes and rng.random() < self.probability:
+                crashes[node_id] = rng.uniform(0, self.horizon)
+        return crashes
+
+
+class SimTransport:
+    def __init__(self, sim: "Simulator", node_id: str):
+        self.sim = sim
+        self.node_id = node_id
+
+    def broadcast(self, msg, exclude_self=True, targets=None, wait=True):
+        recipients = []
+        for pid in self.sim.view(self.node_id):
+            if exclude_self and pid == self.node_id:
+                continue
+            if targets is not None and pid not in targets:
+                continue
+            if self.sim.send(self.node_id, pid, msg):
+                recipients.append(pid)
+        return recipients
+
+    def send_to_node(self, target_id, msg):
+        self.sim.send(self.node_id, target_id, msg)
+
+
+class Simulator:
+    def __init__(self, seed: int = 0, latency=None, loss=None, detection_delay: float = 0.05):
+        self.rng = random.Random(seed)
+        self.latency = latency or UniformLatency()
+        self.loss = loss or MessageLoss()
+        self.detection_delay = detection_delay
+        self.now = 0.0
+
+        self.nodes = {}
+        self.crashed = set()
+        self._views = {}
+        self._queue = []
+        self._seq = 0
+        # Channels are FIFO, like the TCP connections between real peers.
+        self._channel_tail = {}
+
+        self.sent = 0
+        self.dropped = 0
+        self.events = 0
+        self.trace: Optional[list] = None
+
+    def add_node(self, node_id: str, factory: Callable):
+        algo = factory(node_id, LamportClock(), lambda: self.view(node_id), SimTransport(self, node_id))
+        algo.run_callback = lambda callback: self.schedule(0.0, callback)
+        algo.logger.disabled = True
+        self.nodes[node_id] = algo
+        for pid, view in self._views.items():
+            self._views[pid] = sorted(view + [node_id])
+        self._views[node_id] = sorted(self.nodes)
+        return algo
+
+    def view(self, node_id: str) -> list:
+        return list(self._views.get(node_id, ()))
+
+    def schedule(self, delay: float, fn: Callable, *args):
+        self._seq += 1
+        heapq.heappush(self._queue, (self.now + delay, self._seq, fn, args))
+
+    def send(self, src: str, dst: str, msg: dict) -> bool:
+        if src in self.crashed or dst in self.crashed or dst not in self.nodes:
+            return False
+        self.sent += 1
+        if self.loss.dropped(self.rng, src, dst, msg):
+            self.dropped += 1
+            return True
+        at = max(self.now + self.latency.sample(self.rng, src, dst), self._channel_tail.get((src, dst), 0.0))
+        self._channel_tail[(src, dst)] = at
+        self._seq += 1
+        heapq.heappush(self._queue, (at, self._seq, self._deliver, (src, dst, _wire_copy(msg))))
+        return True
+
+    def crash(self, node_id: str, at: float = None):
+        self.schedule(max(0.0, (at if at is not None else self.now) - self.now), self._crash, node_id)
+
+    def _crash(self, node_id: str):
+        if node_id in self.crashed:
+            return
+        self.crashed.add(node_id)
+        self._record("crash", node_id)
+        self.schedule(self.detection_delay, self._detect, node_id)
+
+    def _detect(self, node_id: str):
+        for pid, algo in self.nodes.items():
+            if pid in self.crashed:
+                continue
+            self._views[pid] = [p for p in self._views[pid] if p != node_id]
+            algo.on_peer_lost(node_id)
+
+    def _deliver(self, src: str, dst: str, msg: dict):
+        if dst in self.crashed:
+            return
+        self._record("deliver", src, dst, msg.get("type"))
+        self.nodes[dst].handle_message(msg)
+
+    def _record(self, *event):
+        if self.trace is not None:
+            self.trace.append((round(self.now, 9),) + event)
+
+    def run(self, until: float = None, max_events: int = None) -> bool:
+        # Returns True when the queue drained (the system went quiescent).
+        while self._queue:
+            at, _, fn, args = self._queue[0]
+            if until is not None and at > until:
+                return False
+            if max_events is not None and self.events >= max_events:
+                return False
+            heapq.heappop(self._queue)
+            self.now = at
+            self.events += 1
+            fn(*args)
+        return True
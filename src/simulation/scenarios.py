@@ -0,0 +1,163 @@
+import argparse
+import time
+from src.node.algorithm import resource_keys
+from src.node.mutex import ALGORITHMS, DEFAULT_ALGORITHM
+from src.simulation.network import Simulator, UniformLatency, MessageLoss, CrashModel
+
+
+class Outcome:
+    def __init__(self, algorithm, seed):
+        self.algorithm = algorithm
+        self.seed = seed
+        self.entries = 0
+        self.messages = 0
+        self.events = 0
+        self.virtual_time = 0.0
+        self.violations = []
+        self.stuck = []
+        self.crashed = []
+        self.waits = []
+
+    @property
+    def safe(self) -> bool:
+        return not self.violations
+
+    @property
+    def live(self) -> bool:
+        return not self.stuck
+
+    def __repr__(self):
+        return (f"Outcome({self.algorithm}, seed={self.seed}, entries={self.entries}, messages={self.messages}, "
+                f"violations={len(self.violations)}, stuck={self.stuck}, crashed={self.crashed})")
+
+
+class ContentionScenario:
+    def __init__(self, algorithm=DEFAULT_ALGORITHM, nodes=5, seats=3, requests_per_node=4, batch_probability=0.2,
+                 hold=0.002, think=0.003, latency=None, loss=None, crashes=None, time_limit=60.0):
+        self.algorithm = algorithm
+        self.factory = ALGORITHMS[algorithm]
+        self.node_ids = [f"n{i:03}" for i in range(nodes)]
+        self.seats = seats
+        self.requests_per_node = requests_per_node
+        self.batch_probability = batch_probability
+        self.hold = hold
+        self.think = think
+        self.latency = latency or UniformLatency()
+        self.loss = loss or MessageLoss()
+        self.crashes = crashes or CrashModel()
+        self.time_limit = time_limit
+
+    def run(self, seed: int, trace: bool = False) -> Outcome:
+        sim = Simulator(seed, self.latency, self.loss, self.crashes.detection_delay)
+        if trace:
+            sim.trace = []
+        outcome = Outcome(self.algorithm, seed)
+        state = _Run(self, sim, outcome)
+
+        for node_id in self.node_ids:
+            sim.add_node(node_id, self.factory)
+        for node_id in self.node_ids:
+            sim.schedule(sim.rng.uniform(0, self.think), state.next_request, node_id)
+        for node_id, at in self.crashes.plan(sim.rng, self.node_ids).items():
+            sim.crash(node_id, at)
+
+        sim.run(until=self.time_limit)
+
+        outcome.messages = sim.sent
+        outcome.events = sim.events
+        outcome.virtual_time = sim.now
+        outcome.crashed = sorted(sim.crashed)
+        outcome.stuck = sorted((n, str(r)) for n, (r, _) in state.pending.items() if n not in sim.crashed)
+        outcome.stuck += sorted((n, "not started") for n, left in state.remaining.items() if left and n not in sim.crashed and n not in state.pending)
+        outcome.trace = sim.trace
+        return outcome
+
+
+class _Run:
+    def __init__(self, scenario: ContentionScenario, sim: Simulator, outcome: Outcome):
+        self.scenario = scenario
+        self.sim = sim
+        self.outcome = outcome
+        self.remaining = {n: scenario.requests_per_node for n in scenario.node_ids}
+        self.pending = {}
+        self.holders = {}
+
+    def next_request(self, node_id):
+        sim = self.sim
+        if node_id in sim.crashed or not self.remaining[node_id]:
+            return
+        self.remaining[node_id] -= 1
+        rng = sim.rng
+        if self.scenario.seats > 1 and rng.random() < self.scenario.batch_probability:
+            resource = [f"seat:{s}" for s in sorted(rng.sample(range(self.scenario.seats), 2))]
+        else:
+            resource = f"seat:{rng.randrange(self.scenario.seats)}"
+        self.pending[node_id] = (resource, sim.now)
+        sim.nodes[node_id].request_critical_section(lambda: self.enter(node_id, resource), resource)
+
+    def enter(self, node_id, resource):
+        sim = self.sim
+        if node_id in sim.crashed:
+            return
+        for key in resource_keys(resource):
+            holder = self.holders.get(key)
+            # A crashed holder's section ends with it, as its lease would.
+            if holder is not None and holder not in sim.crashed:
+                self.outcome.violations.append((sim.now, key, holder, node_id))
+            self.holders[key] = node_id
+        self.outcome.entries += 1
+        self.outcome.waits.append(sim.now - self.pending[node_id][1])
+        sim.schedule(self.scenario.hold, self.exit, node_id, resource)
+
+    def exit(self, node_id, resource):
+        sim = self.sim
+        if node_id in sim.crashed:
+            return
+        for key in resource_keys(resource):
+            if self.holders.get(key) == node_id:
+                del self.holders[key]
+        del self.pending[node_id]
+        sim.nodes[node_id].release_critical_section(resource)
+        sim.schedule(sim.rng.uniform(0, self.scenario.think), self.next_request, node_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m src.simulation.scenarios", description="Seeded contention scenarios in virtual time")
+    parser.add_argument("--algorithm", choices=sorted(ALGORITHMS), default=DEFAULT_ALGORITHM)
+    parser.add_argument("--scenarios", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0, help="first seed; scenario i uses seed + i")
+    parser.add_argument("--nodes", type=int, default=5)
+    parser.add_argument("--seats", type=int, default=3)
+    parser.add_argument("--requests", type=int, default=4, help="requests per node")
+    parser.add_argument("--batch", type=float, default=0.2, help="probability of a two-seat request")
+    parser.add_argument("--latency", type=float, nargs=2, default=(0.0005, 0.005), metavar=("MIN", "MAX"))
+    parser.add_argument("--loss", type=float, default=0.0)
+    parser.add_argument("--crash", type=float, default=0.0, help="per-node crash probability")
+    args = parser.parse_args()
+
+    scenario = ContentionScenario(
+        args.algorithm, nodes=args.nodes, seats=args.seats, requests_per_node=args.requests,
+        batch_probability=args.batch, latency=UniformLatency(*args.latency), loss=MessageLoss(args.loss),
+        crashes=CrashModel(args.crash, horizon=0.05)
+    )
+
+    unsafe, stuck, entries, messages = [], [], 0, 0
+    start = time.perf_counter()
+    for i in range(args.scenarios):
+        outcome = scenario.run(args.seed + i)
+        entries += outcome.entries
+        messages += outcome.messages
+        if not outcome.safe:
+            unsafe.append(outcome.seed)
+        if not outcome.live:
+            stuck.append(outcome.seed)
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.scenarios} scenarios of {args.algorithm} in {elapsed:.2f}s ({args.scenarios / elapsed:.0f}/s)")
+    print(f"entries {entries}, messages/entry {messages / max(entries, 1):.2f}")
+    print(f"safety violations: {len(unsafe)} {unsafe[:10]}")
+    print(f"liveness failures: {len(stuck)} {stuck[:10]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import queue
+import threading
+import pytest
+from src.common.models import LamportClock
+
+
+class FifoBus:
+    # In-memory network with one FIFO channel and delivery thread per node.
+    def __init__(self):
+        self.nodes = {}
+        self.inboxes = {}
+        self.sent = 0
+        self.down = set()
+
+    def add(self, node_id, algo):
+        self.nodes[node_id] = algo
+        self.inboxes[node_id] = queue.Queue()
+        threading.Thread(target=self._deliver, args=(node_id,), daemon=True).start()
+
+    def alive(self):
+        return [pid for pid in self.nodes if pid not in self.down]
+
+    def _deliver(self, node_id):
+        while True:
+            msg = self.inboxes[node_id].get()
+            if node_id not in self.down:
+                self.nodes[node_id].handle_message(msg)
+
+
+class BusTransport:
+    def __init__(self, my_id, bus):
+        self.my_id = my_id
+        self.bus = bus
+
+    def broadcast(self, msg, exclude_self=True):
+        targets = [pid for pid in self.bus.alive() if pid != self.my_id]
+        for pid in targets:
+            self.send_to_node(pid, msg)
+        return targets
+
+    def send_to_node(self, target_id, msg):
+        self.bus.sent += 1
+        self.bus.inboxes[target_id].put(dict(msg))
+
+
+@pytest.fixture
+def fifo_cluster():
+    def make(algorithm, ids):
+        bus = FifoBus()
+        for node_id in ids:
+            bus.add(node_id, algorithm(node_id, LamportClock(), bus.alive, BusTransport(node_id, bus)))
+        return bus
+    return make
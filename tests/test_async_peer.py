@@ -0,0 +1,64 @@
+import socket
+import threading
+from src.node.async_peer import AsyncPeer
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class Inbox:
+    def __init__(self):
+        self.messages = []
+        self.event = threading.Semaphore(0)
+
+    def __call__(self, msg):
+        self.messages.append(msg)
+        self.event.release()
+
+    def wait(self, count):
+        return all(self.event.acquire(timeout=2) for _ in range(count))
+
+
+def make_pair():
+    inbox_a, inbox_b = Inbox(), Inbox()
+    a = AsyncPeer("A", "127.0.0.1", free_port(), inbox_a)
+    b = AsyncPeer("B", "127.0.0.1", free_port(), inbox_b)
+    directory = {
+        "A": {"host": "127.0.0.1", "port": a.port},
+        "B": {"host": "127.0.0.1", "port": b.port},
+    }
+    for peer in (a, b):
+        peer.start()
+        peer.update_directory(dict(directory))
+    return a, b, inbox_a, inbox_b
+
+
+def test_send_preserves_order():
+    """I messaggi verso lo stesso nodo arrivano nell'ordine di invio"""
+    a, b, _, inbox_b = make_pair()
+    for i in range(20):
+        a.send_to_node("B", {"type": "TEST", "i": i})
+
+    assert inbox_b.wait(20)
+    assert [m["i"] for m in inbox_b.messages] == list(range(20))
+    a.stop()
+    b.stop()
+
+
+def test_broadcast_detects_crash():
+    """Con il trasporto asyncio un nodo terminato viene rimosso dalla directory"""
+    lost = []
+    a, b, _, inbox_b = make_pair()
+    a.on_peer_disconnect = lost.append
+
+    assert a.broadcast({"type": "TEST"}) == ["B"]
+    assert inbox_b.wait(1)
+
+    b.stop()
+    assert a.broadcast({"type": "TEST"}) == []
+    assert lost == ["B"]
+    assert a.get_known_peers() == ["A"]
+    a.stop()
@@ -0,0 +1,103 @@
+import threading
+from src.node.booking import BookingQueue
+
+
+class ManualAlgo:
+    def __init__(self):
+        self.requests = []
+        self.released = []
+        self.requested = threading.Semaphore(0)
+
+    def request_critical_section(self, callback, resource=None):
+        self.requests.append((resource, callback))
+        self.requested.release()
+        return True
+
+    def release_critical_section(self, resource=None):
+        self.released.append(resource)
+
+    def enter(self, index):
+        self.requests[index][1]()
+
+
+def make_queue():
+    algo = ManualAlgo()
+    applied = []
+    queue = BookingQueue(
+        "A",
+        algo,
+        resource_for=lambda seats: list(seats),
+        apply_ops=lambda ops: applied.append([(op.seat_ids, op.reserve) for op in ops]),
+    )
+    return algo, queue, applied
+
+
+def test_clicks_on_disjoint_seats_run_in_parallel():
+    """Un click su un posto non coinvolto nel round in corso parte subito con un proprio round"""
+    algo, queue, applied = make_queue()
+
+    queue.submit([1], reserve=True)
+    assert algo.requested.acquire(timeout=2)
+    queue.submit([2], reserve=True)
+    assert algo.requested.acquire(timeout=2)
+    assert sorted(resource for resource, _ in algo.requests) == [[1], [2]]
+    assert queue.pending_seats() == {1, 2}
+
+    for i in range(2):
+        algo.enter(i)
+    assert sorted(applied) == [[([1], True)], [([2], True)]]
+    assert queue.pending_seats() == set()
+
+
+def test_covered_operations_ride_along():
+    """Un'operazione sui posti già richiesti viene applicata nello stesso ingresso"""
+    algo, queue, applied = make_queue()
+
+    queue.submit([1, 2], reserve=True)
+    assert algo.requested.acquire(timeout=2)
+    queue.submit([2], reserve=False)
+
+    algo.enter(0)
+    assert applied == [[([1, 2], True), ([2], False)]]
+    assert len(algo.requests) == 1
+
+
+def test_overlapping_clicks_are_coalesced():
+    """I click che si sovrappongono al round in corso senza esserne coperti vengono uniti nel round successivo"""
+    algo, queue, applied = make_queue()
+
+    queue.submit([1], reserve=True)
+    assert algo.requested.acquire(timeout=2)
+    queue.submit([1, 2], reserve=False)
+    # Queued behind [1, 2], though the round in flight does not hold seat 2.
+    queue.submit([2], reserve=True)
+    assert queue.pending_seats() == {1, 2}
+    assert len(algo.requests) == 1
+
+    algo.enter(0)
+    assert algo.requested.acquire(timeout=2)
+    assert algo.requests[1][0] == [1, 2]
+
+    algo.enter(1)
+    assert applied == [[([1], True)], [([1, 2], False), ([2], True)]]
+    assert algo.released == [[1], [1, 2]]
+    assert queue.pending_seats() == set()
+
+
+def test_operations_report_completion_after_release():
+    """on_done riceve l'esito dell'operazione quando il round è chiuso e i posti non sono più pending"""
+    algo = ManualAlgo()
+    results = []
+
+    def apply_ops(ops):
+        for op in ops:
+            op.applied = op.reserve
+
+    queue = BookingQueue("A", algo, resource_for=lambda seats: list(seats), apply_ops=apply_ops)
+    queue.submit([1], reserve=True, on_done=lambda ok: results.append((ok, queue.pending_seats())))
+    assert algo.requested.acquire(timeout=2)
+    queue.submit([1], reserve=False, on_done=lambda ok: results.append((ok, queue.pending_seats())))
+
+    algo.enter(0)
+    assert results == [(True, set()), (False, set())]
+    assert algo.released == [[1]]
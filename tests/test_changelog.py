@@ -0,0 +1,25 @@
+from src.node.changelog import SeatChangeLog
+
+
+def test_since_returns_only_missing_events():
+    """Vengono restituiti solo gli eventi successivi al watermark di ogni origine"""
+    log = SeatChangeLog()
+    log.append(1, "A", [0], "A")
+    log.append(2, "B", [1], "B")
+    log.append(3, "A", [0], None)
+
+    assert log.since({"A": 1, "B": 2}) == [[3, "A", [0], None]]
+    assert log.since({}) == [[1, "A", [0], "A"], [2, "B", [1], "B"], [3, "A", [0], None]]
+    assert log.watermarks == {"A": 3, "B": 2}
+
+
+def test_truncated_log_requires_snapshot():
+    """Se gli eventi richiesti sono stati scartati serve uno snapshot completo"""
+    log = SeatChangeLog(capacity=2)
+    log.append(1, "A", [0], "A")
+    log.append(2, "A", [1], "A")
+    log.append(3, "B", [2], "B")
+
+    assert log.since({}) is None
+    assert log.since({"A": 0, "B": 0}) is None
+    assert log.since({"A": 1}) == [[2, "A", [1], "A"], [3, "B", [2], "B"]]
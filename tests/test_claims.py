@@ -0,0 +1,109 @@
+import threading
+from src.common.seatmap import NO_VERSION
+from src.node.claims import ClaimTable
+from src.node.core import CinemaNode
+
+
+def make_node(node_id):
+    node = CinemaNode(node_id, 0, shards=["sala1:21h:10"], hold_time=0.0, optimistic=True, claim_window=0.2)
+    screening = node.screening()
+    screening.outbox = []
+    screening.transport.broadcast = lambda msg, **kwargs: screening.outbox.append(dict(msg, shard=screening.key)) or []
+    return node
+
+
+def claim(node, seat_ids):
+    done = threading.Event()
+    result = []
+    assert node.reserve_seats(seat_ids, on_done=lambda applied: (result.append(applied), done.set()))
+    return done, result
+
+
+def test_competing_claims_resolve_in_any_order():
+    """Fra claim concorrenti sulla stessa versione vince il (ts, node_id) minore, in qualunque ordine arrivino"""
+    for order in ([(5, "B"), (5, "A")], [(5, "A"), (5, "B")]):
+        table = ClaimTable()
+        results = [table.resolve(3, NO_VERSION, version, current) for version, current in
+                   zip(order, [NO_VERSION, order[0]])]
+        assert results == [True, order[1] < order[0]]
+        assert table.contended == {3}
+
+    stale = ClaimTable()
+    assert stale.resolve(3, NO_VERSION, (2, "A"), NO_VERSION)
+    assert not stale.resolve(3, NO_VERSION, (1, "B"), (9, "A"))
+    assert stale.contended == set()
+
+
+def test_uncontended_claim_needs_one_broadcast():
+    """Un posto libero si prenota con un solo SEAT_CLAIMED, senza REQUEST/REPLY"""
+    a, b = make_node("A"), make_node("B")
+    done, result = claim(a, [4])
+    assert [m["type"] for m in a.screening().outbox] == ["SEAT_CLAIMED"]
+
+    b.on_network_message(a.screening().outbox[0])
+    assert b.seats[4] == "A"
+    assert done.wait(2) and result == [True]
+    assert a.query()["pending"] == []
+
+
+def test_concurrent_claims_pick_one_winner_and_fall_back_to_mutex():
+    """Due nodi che reclamano lo stesso posto convergono sullo stesso vincitore e poi usano la mutua esclusione"""
+    a, b = make_node("A"), make_node("B")
+    done_a, result_a = claim(a, [2, 3])
+    done_b, result_b = claim(b, [3])
+    b.on_network_message(a.screening().outbox[0])
+    a.on_network_message(b.screening().outbox[0])
+
+    assert done_a.wait(2) and done_b.wait(2)
+    # Both claimed at ts 1: the tie goes to the lower node id, as in Ricart-Agrawala.
+    assert result_a == [True] and result_b == [False]
+    assert a.seats[3] == b.seats[3] == "A"
+    assert a.screening().claims.contended == b.screening().claims.contended == {3}
+
+    assert a.release([3])
+    b.on_network_message(a.screening().outbox[-1])
+    submitted = []
+    b.screening().bookings.submit = lambda seat_ids, reserve, on_done=None: submitted.append(seat_ids)
+    assert b.reserve_seats([3]) and submitted == [[3]]
+
+
+def test_lost_batch_hands_back_the_seats_it_won():
+    """Un claim di più posti perso anche su uno solo libera gli altri"""
+    a, b = make_node("A"), make_node("B")
+    done_b, result_b = claim(b, [5, 6])
+    claim(a, [6])
+    b.on_network_message(a.screening().outbox[0])
+
+    assert done_b.wait(2) and result_b == [False]
+    assert b.seats[5] is None and b.seats[6] == "A"
+    assert b.screening().outbox[-1]["type"] == "SEAT_FREED"
+
+
+def test_late_earlier_claim_overturns_a_reported_booking():
+    """Un claim precedente arrivato dopo la finestra ribalta una prenotazione già confermata e il client lo vede"""
+    a, b = make_node("A"), make_node("B")
+    overturned = []
+
+    class Frontend:
+        def log(self, message):
+            pass
+
+        def show_seats(self, shard, seat_ids):
+            pass
+
+        def show_pending(self, shard, seat_ids):
+            pass
+
+        def show_overturned(self, shard, seat_ids, winner):
+            overturned.append((seat_ids, winner))
+
+    a.frontend = Frontend()
+    a.clock.update(5)
+    done, result = claim(a, [4])
+    claim(b, [4])
+    assert done.wait(2) and result == [True]
+
+    a.on_network_message(b.screening().outbox[0])
+    assert a.seats[4] == "B"
+    assert overturned == [([4], "B")]
+    assert a.query()["overturned"] == [4]
@@ -0,0 +1,80 @@
+import socket
+import threading
+from src.common.protocol import PacketProtocol
+from src.node.connection_pool import ConnectionPool
+
+
+class FrameServer:
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen(5)
+        self.port = self.sock.getsockname()[1]
+        self.accepted = 0
+        self.messages = []
+        self.received = threading.Semaphore(0)
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            self.accepted += 1
+            threading.Thread(target=self._read, args=(conn,), daemon=True).start()
+
+    def _read(self, conn):
+        buffer = b""
+        with conn:
+            while True:
+                chunk = conn.recv(4096)
+                if not chunk:
+                    return
+                buffer += chunk
+                while True:
+                    msg, buffer = PacketProtocol.deserialize(buffer)
+                    if msg is None:
+                        break
+                    self.messages.append(msg)
+                    self.received.release()
+
+    def close(self):
+        self.sock.close()
+
+
+def test_reuses_connection():
+    """Più messaggi verso lo stesso peer viaggiano sulla stessa connessione"""
+    server = FrameServer()
+    pool = ConnectionPool()
+    for i in range(5):
+        assert pool.send("127.0.0.1", server.port, PacketProtocol.serialize({"id": i}))
+    for _ in range(5):
+        assert server.received.acquire(timeout=2)
+
+    assert server.accepted == 1
+    assert [m["id"] for m in server.messages] == [0, 1, 2, 3, 4]
+    pool.close_all()
+    server.close()
+
+
+def test_send_to_dead_peer_fails():
+    """Se il peer non è raggiungibile send restituisce False e non resta in pool"""
+    probe = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    probe.bind(("127.0.0.1", 0))
+    port = probe.getsockname()[1]
+    probe.close()
+
+    pool = ConnectionPool(connect_timeout=0.5)
+    assert not pool.send("127.0.0.1", port, PacketProtocol.serialize({"id": 1}))
+    assert len(pool) == 0
+
+
+def test_idle_eviction():
+    """Le connessioni inattive oltre idle_timeout vengono chiuse"""
+    server = FrameServer()
+    pool = ConnectionPool(idle_timeout=0)
+    assert pool.send("127.0.0.1", server.port, PacketProtocol.serialize({"id": 1}))
+    assert pool.evict_idle() == 1
+    assert len(pool) == 0
+    server.close()
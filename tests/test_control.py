@@ -0,0 +1,55 @@
+import json
+import socket
+import subprocess
+import sys
+from src.node.core import CinemaNode
+from src.node.control import CommandServer
+
+
+def make_node():
+    # Never started: with no peers the mutex is granted locally.
+    return CinemaNode("A", 0, shards=["sala1:21h:10"], hold_time=0.0)
+
+
+def test_python_api_reserve_release_query():
+    """L'API Python prenota, rilascia e interroga i posti senza GUI"""
+    node = make_node()
+
+    assert node.reserve([2, 3])
+    assert not node.reserve([3])
+    state = node.query()
+    assert state["shard"] == "sala1:21h"
+    assert state["seats"][2] == "A" and state["seats"][3] == "A"
+    assert state["free"] == 8
+
+    assert node.release([2, 3])
+    assert node.query()["free"] == 10
+
+
+def test_command_socket():
+    """Il socket di comando accetta una richiesta JSON per riga e risponde con una riga"""
+    node = make_node()
+    server = CommandServer(node)
+    server.start()
+    try:
+        with socket.create_connection((server.host, server.port), timeout=5) as conn:
+            replies = conn.makefile("r")
+
+            def call(line):
+                conn.sendall((line + "\n").encode())
+                return json.loads(replies.readline())
+
+            assert call(json.dumps({"cmd": "reserve", "seats": [1, 4]})) == {"ok": True}
+            assert call(json.dumps({"cmd": "query", "shard": "sala1:21h"}))["seats"][:5] == [None, "A", None, None, "A"]
+            assert call(json.dumps({"cmd": "release", "seats": 4})) == {"ok": True}
+            assert call(json.dumps({"cmd": "query", "shard": "altro:x"}))["ok"] is False
+            assert "unknown command" in call(json.dumps({"cmd": "dance"}))["error"]
+            assert call("not json")["ok"] is False
+    finally:
+        server.stop()
+
+
+def test_core_does_not_import_tkinter():
+    """Il nodo headless non importa Tkinter"""
+    code = "import sys, src.node.core, src.node.control; sys.exit('tkinter' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code]).returncode == 0
@@ -0,0 +1,123 @@
+import random
+import threading
+from collections import Counter, deque
+from src.common.models import MessageType
+from src.node.core import CinemaNode
+from src.node.gossip import Gossip
+
+
+class Mesh:
+    # Synchronous in-memory network: messages are delivered by pump().
+    def __init__(self, node_ids):
+        self.node_ids = list(node_ids)
+        self.queue = deque()
+        self.sent = Counter()
+
+    def transport(self, node_id):
+        mesh = self
+
+        class Transport:
+            def subscribers(self):
+                return mesh.node_ids
+
+            def broadcast(self, msg, targets=None, **kwargs):
+                for target in targets:
+                    self.send_to_node(target, msg)
+                return list(targets)
+
+            def send_to_node(self, target_id, msg):
+                mesh.sent[node_id] += 1
+                mesh.queue.append((target_id, dict(msg, sender=node_id)))
+
+        return Transport()
+
+    def pump(self, deliver):
+        while self.queue:
+            target, msg = self.queue.popleft()
+            deliver(target, msg)
+
+
+def test_gossip_reaches_everyone_with_constant_fanout():
+    """Un aggiornamento raggiunge quasi tutti i nodi, ognuno lo consegna una volta e invia al massimo fanout messaggi"""
+    mesh = Mesh(f"n{i}" for i in range(200))
+    delivered = Counter()
+    nodes = {}
+    for i, node_id in enumerate(mesh.node_ids):
+        nodes[node_id] = Gossip(node_id, mesh.transport(node_id), lambda update, relay, node_id=node_id: delivered.update([node_id]),
+                                fanout=5, rng=random.Random(i))
+
+    nodes["n0"].publish({"type": MessageType.SEAT_TAKEN, "sender": "n0", "ts": 1, "seat_id": 3})
+    mesh.pump(lambda target, msg: nodes[target].handle(msg))
+
+    assert len(delivered) >= 0.97 * 199 and max(delivered.values()) == 1
+    assert max(mesh.sent.values()) <= 5
+
+
+def make_cluster(node_ids, **options):
+    mesh = Mesh(node_ids)
+    nodes = {}
+    for node_id in node_ids:
+        node = CinemaNode(node_id, 0, hold_time=0.0, gossip_fanout=2, **options)
+        node.peer.get_directory = lambda: {pid: {} for pid in mesh.node_ids}
+        transport = mesh.transport(node_id)
+        node.peer.send_to_node = transport.send_to_node
+        node.peer.broadcast = lambda msg, targets=None, transport=transport, **kwargs: transport.broadcast(msg, targets)
+        nodes[node_id] = node
+    return mesh, nodes
+
+
+def test_update_precedes_the_permission_it_protects():
+    """Con il gossip, chi riceve un REPLY per un posto riceve prima l'ultimo aggiornamento di quel posto"""
+    mesh, nodes = make_cluster(["A", "B", "C", "D", "E"])
+    screening = nodes["A"].screening()
+    screening._publish(screening._commit_update(MessageType.SEAT_TAKEN, [3], "A"))
+    mesh.queue.clear()
+
+    screening.transport.send_to_node("E", {"type": MessageType.REPLY, "sender": "A", "ts": 9, "resource": "seat:3"})
+    screening.transport.send_to_node("E", {"type": MessageType.REPLY, "sender": "A", "ts": 10, "resource": "seat:4"})
+    sent = [msg for target, msg in mesh.queue]
+    assert [m["type"] for m in sent] == [MessageType.GOSSIP, MessageType.REPLY, MessageType.REPLY]
+    assert sent[0]["update"]["seat_id"] == 3 and sent[0]["direct"]
+
+    mesh.queue.clear()
+    screening.transport.send_to_node("E", {"type": MessageType.REPLY, "sender": "A", "ts": 11, "resource": "seat:3"})
+    assert [m["type"] for _, m in mesh.queue] == [MessageType.REPLY]
+
+
+def test_anti_entropy_repairs_missed_updates():
+    """Lo scambio di digest fa convergere due nodi che hanno perso aggiornamenti diversi"""
+    mesh, nodes = make_cluster(["A", "B"])
+    a, b = nodes["A"].screening(), nodes["B"].screening()
+    with a._state_lock:
+        a.record_change(5, "A", [1], "A")
+    with b._state_lock:
+        b.record_change(7, "B", [2], "B")
+    assert a._digest() != b._digest()
+
+    a.anti_entropy()
+    mesh.pump(lambda target, msg: nodes[target].on_network_message(msg))
+    assert a._digest() == b._digest()
+    assert list(nodes["A"].seats)[:3] == list(nodes["B"].seats)[:3] == [None, "A", "B"]
+
+
+def test_anti_entropy_keeps_the_earliest_claim():
+    """Se il gossip perde un claim, l'anti-entropy fa vincere comunque il claim minore e avvisa chi perde il posto"""
+    mesh, nodes = make_cluster(["A", "B"], optimistic=True, claim_window=0.05)
+    done = {node_id: threading.Event() for node_id in nodes}
+    nodes["A"].clock.update(5)
+    for node_id in ("A", "B"):
+        assert nodes[node_id].reserve_seats([4], on_done=lambda applied, node_id=node_id: done[node_id].set())
+    # B's claim at (1, B) never reaches A; A's claim at (6, A) reaches B.
+    mesh.queue = type(mesh.queue)((target, msg) for target, msg in mesh.queue if msg["sender"] == "A")
+    mesh.pump(lambda target, msg: nodes[target].on_network_message(msg))
+    assert done["A"].wait(2) and done["B"].wait(2)
+    assert nodes["A"].seats[4] == "A" and nodes["B"].seats[4] == "B"
+
+    nodes["A"].screening().anti_entropy()
+    sent = []
+    mesh.pump(lambda target, msg: (sent.append(msg["type"]), nodes[target].on_network_message(msg)))
+    assert nodes["A"].seats[4] == nodes["B"].seats[4] == "B"
+    assert nodes["A"].query()["overturned"] == [4] and nodes["B"].query()["overturned"] == []
+    # A repair is not a state transfer: the change logs can still serve deltas.
+    assert MessageType.STATE_REPLY not in sent
+    assert nodes["A"].screening().changelog.since({}) is not None
@@ -0,0 +1,63 @@
+import threading
+from src.node.maekawa import Maekawa, grid_quorum
+
+
+def test_grid_quorums_intersect():
+    """Due quorum qualsiasi della griglia hanno almeno un nodo in comune"""
+    for n in range(1, 30):
+        members = [f"n{i:02}" for i in range(n)]
+        quorums = {m: grid_quorum(m, members) for m in members}
+        for a in members:
+            assert len(quorums[a]) <= 2 * (n ** 0.5 + 1)
+            for b in members:
+                assert quorums[a] & quorums[b]
+
+
+def test_contended_seat_is_mutually_exclusive(fifo_cluster):
+    """Sotto contesa un solo nodo alla volta tiene il posto e tutti entrano"""
+    ids = [f"n{i}" for i in range(9)]
+    bus = fifo_cluster(Maekawa, ids)
+    holders = []
+    violations = []
+    done = threading.Semaphore(0)
+    lock = threading.Lock()
+
+    def run(node_id, resource, rounds):
+        for _ in range(rounds):
+            entered = threading.Event()
+            bus.nodes[node_id].request_critical_section(entered.set, resource)
+            assert entered.wait(10)
+            with lock:
+                keys = set(resource) if isinstance(resource, list) else {resource}
+                if any(keys & held for held in holders):
+                    violations.append(node_id)
+                holders.append(keys)
+            threading.Event().wait(0.005)
+            with lock:
+                holders.remove(keys)
+            bus.nodes[node_id].release_critical_section(resource)
+        done.release()
+
+    workers = [(node_id, "seat:1") for node_id in ids[:6]]
+    workers += [("n6", ["seat:1", "seat:2"]), ("n7", "seat:2"), ("n8", ["seat:2", "seat:3"])]
+    for node_id, resource in workers:
+        threading.Thread(target=run, args=(node_id, resource, 3), daemon=True).start()
+
+    for _ in workers:
+        assert done.acquire(timeout=30)
+    assert not violations
+
+
+def test_uncontended_entry_uses_quorum_messages(fifo_cluster):
+    """Un ingresso senza contesa scambia messaggi solo con il proprio quorum"""
+    ids = [f"n{i:02}" for i in range(16)]
+    bus = fifo_cluster(Maekawa, ids)
+    entered = threading.Event()
+
+    bus.nodes["n05"].request_critical_section(entered.set, "seat:1")
+    assert entered.wait(2)
+    bus.nodes["n05"].release_critical_section("seat:1")
+
+    others = len(grid_quorum("n05", ids)) - 1
+    assert others == 6
+    assert bus.sent == 3 * others
@@ -0,0 +1,44 @@
+import json
+from src.common.metrics import Metrics, MetricsDumper, NO_METRICS
+from src.node.core import CinemaNode
+
+
+def test_counters_gauges_and_histograms():
+    """Contatori per etichetta, gauge con massimo e istogrammi con percentili"""
+    metrics = Metrics()
+    metrics.count("messages_sent", "REQUEST", 3)
+    metrics.count("messages_sent", "REPLY")
+    metrics.count("bytes_sent", n=120)
+    metrics.gauge("deferred_requests", 4)
+    metrics.gauge("deferred_requests", 1)
+    for ms in range(1, 101):
+        metrics.observe("cs_wait", ms / 1000)
+
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"] == {"messages_sent": {"REQUEST": 3, "REPLY": 1}, "bytes_sent": 120}
+    assert snapshot["gauges"]["deferred_requests"] == {"value": 1, "max": 4}
+    wait = snapshot["histograms"]["cs_wait"]
+    assert wait["count"] == 100 and wait["max_ms"] == 100.0
+    assert 50 <= wait["p50_ms"] <= 60 and 99 <= wait["p99_ms"] <= 100
+
+
+def test_null_metrics_record_nothing():
+    """Il registro nullo (default degli algoritmi fuori da un nodo) non accumula nulla"""
+    NO_METRICS.count("x")
+    NO_METRICS.observe("y", 1.0)
+    assert NO_METRICS.snapshot()["counters"] == {} and NO_METRICS.snapshot()["histograms"] == {}
+
+
+def test_node_records_critical_sections(tmp_path):
+    """Un nodo misura attesa e durata delle sezioni critiche e scrive le statistiche su file"""
+    node = CinemaNode("A", 0, shards=["sala1:21h:10"], hold_time=0.0)
+    assert node.reserve([1])
+
+    stats = node.stats()
+    assert stats["counters"]["cs_entries"] == 1
+    assert stats["histograms"]["cs_wait"]["count"] == 1
+    assert stats["histograms"]["cs_hold"]["count"] == 1
+
+    path = tmp_path / "stats.json"
+    MetricsDumper(node.metrics, str(path), extra={"node_id": "A"}).dump()
+    assert json.loads(path.read_text())["node_id"] == "A"
@@ -26,4 +26,49 @@ def test_remove_peer():
     ns.register_peer("node_1", "127.0.0.1", 5001)
     ns.remove_peer("node_1")
     
-    assert "node_1" not in ns.get_peers()
\ No newline at end of file
+    assert "node_1" not in ns.get_peers()
+
+def test_sync_carries_only_changes_since_ack():
+    """Dopo un ack il peer riceve solo join e leave successivi"""
+    ns = NameServerLogic()
+    ns.register_peer("node_1", "127.0.0.1", 5001, directory_version=0)
+    ns.register_peer("node_2", "127.0.0.1", 5002, directory_version=0)
+    ns.acknowledge("node_1", ns.version)
+
+    ns.register_peer("node_3", "127.0.0.1", 5003)
+    ns.remove_peer("node_2")
+
+    sync = {pid: msg for pid, _, _, msg in ns.sync_messages("SYNC")}
+    assert sync["node_1"]["base"] == 2
+    assert sync["node_1"]["joined"] == {"node_3": {"host": "127.0.0.1", "port": 5003}}
+    assert sync["node_1"]["left"] == ["node_2"]
+    assert set(sync["node_3"]["peers"]) == {"node_1", "node_3"}
+
+def test_sync_falls_back_to_snapshot_past_history():
+    """Se la storia e' stata compattata si invia la directory completa"""
+    ns = NameServerLogic(history_size=2)
+    ns.register_peer("node_1", "127.0.0.1", 5001, directory_version=0)
+    ns.acknowledge("node_1", ns.version)
+    for i in range(2, 5):
+        ns.register_peer(f"node_{i}", "127.0.0.1", 5000 + i)
+
+    sync = {pid: msg for pid, _, _, msg in ns.sync_messages("SYNC", ["node_1"])}
+    assert "base" not in sync["node_1"]
+    assert len(sync["node_1"]["peers"]) == 4
+
+def test_expired_lease_removes_peer():
+    """Un peer che smette di inviare heartbeat viene rimosso alla scadenza del lease"""
+    now = [0.0]
+    ns = NameServerLogic(lease_duration=5.0, clock=lambda: now[0])
+    ns.register_peer("node_1", "127.0.0.1", 5001, directory_version=0)
+    ns.register_peer("node_2", "127.0.0.1", 5002, directory_version=0)
+    ns.acknowledge("node_1", ns.version)
+
+    now[0] = 4.0
+    assert ns.renew("node_1")
+    now[0] = 6.0
+    assert ns.expire() == ["node_2"]
+    assert list(ns.get_peers()) == ["node_1"]
+    assert ns.sync_messages("SYNC")[0][3]["left"] == ["node_2"]
+
+    assert not ns.renew("node_2")
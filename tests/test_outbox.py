@@ -0,0 +1,67 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from src.node.outbox import Outbox
+from src.common.protocol import PacketProtocol, FrameDecoder
+
+
+class RecordingSend:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.writes = []
+        self._lock = threading.Lock()
+
+    def __call__(self, host, port, data):
+        time.sleep(self.delay)
+        with self._lock:
+            self.writes.append((port, data))
+        return True
+
+
+def messages(data):
+    decoder = FrameDecoder()
+    decoder.feed(data)
+    return [m["n"] for m in decoder.frames()]
+
+
+def test_lone_message_is_sent_at_once():
+    """Un messaggio verso un nodo senza invii in corso parte subito, senza attendere altri messaggi"""
+    send = RecordingSend()
+    outbox = Outbox(send, ThreadPoolExecutor(4))
+
+    start = time.monotonic()
+    assert outbox.submit("h", 1, PacketProtocol.serialize({"n": 0}), batch=True).result(timeout=2)
+    assert time.monotonic() - start < 0.05
+    assert [messages(data) for _, data in send.writes] == [[0]]
+
+
+def test_messages_during_a_send_share_one_frame():
+    """I messaggi accodati mentre un invio verso lo stesso nodo è in corso partono insieme nel frame successivo"""
+    send = RecordingSend(delay=0.05)
+    outbox = Outbox(send, ThreadPoolExecutor(4))
+
+    futures = [outbox.submit("h", 1, PacketProtocol.serialize({"n": 0}), batch=True)]
+    time.sleep(0.01)
+    futures += [outbox.submit("h", 1, PacketProtocol.serialize({"n": i}), batch=True) for i in range(1, 4)]
+    futures.append(outbox.submit("h", 2, PacketProtocol.serialize({"n": 9}), batch=True))
+    assert all(f.result(timeout=2) for f in futures)
+
+    writes = [(port, messages(data)) for port, data in send.writes]
+    assert [m for port, m in writes if port == 1] == [[0], [1, 2, 3]]
+    assert [m for port, m in writes if port == 2] == [[9]]
+
+
+def test_order_kept_across_drains():
+    """L'ordine per destinazione resta FIFO anche con invii lenti"""
+    send = RecordingSend(delay=0.02)
+    outbox = Outbox(send, ThreadPoolExecutor(4))
+
+    futures = []
+    for i in range(20):
+        futures.append(outbox.submit("h", 1, PacketProtocol.serialize({"n": i})))
+        time.sleep(0.003)
+    assert all(f.result(timeout=5) for f in futures)
+
+    received = [n for _, data in send.writes for n in messages(data)]
+    assert received == list(range(20))
+    assert len(send.writes) < 20
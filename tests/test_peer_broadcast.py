@@ -0,0 +1,144 @@
+import threading
+import time
+from src.common.protocol import FrameDecoder, PacketProtocol
+from src.node.peer import Peer
+
+
+class SlowPool:
+    def __init__(self, delays, dead=()):
+        self.delays = delays
+        self.dead = set(dead)
+        self.frames = []
+        self._lock = threading.Lock()
+
+    def send(self, host, port, data):
+        time.sleep(self.delays.get(port, 0))
+        with self._lock:
+            self.frames.append(data)
+        return port not in self.dead
+
+    def discard(self, host, port):
+        pass
+
+    def close_all(self):
+        pass
+
+
+def make_peer(pool, lost):
+    peer = Peer("A", "127.0.0.1", 0, lambda msg: None, on_peer_disconnect=lost.append)
+    peer._pool = pool
+    peer.update_directory = lambda d: setattr(peer, "_peers_directory", d)
+    peer.update_directory({
+        "A": {"host": "127.0.0.1", "port": 1},
+        "B": {"host": "127.0.0.1", "port": 2},
+        "C": {"host": "127.0.0.1", "port": 3},
+        "D": {"host": "127.0.0.1", "port": 4},
+    })
+    return peer
+
+
+def test_broadcast_is_parallel():
+    """Un nodo lento non ritarda l'invio agli altri nodi"""
+    lost = []
+    pool = SlowPool({2: 0.3, 3: 0.3, 4: 0.3})
+    peer = make_peer(pool, lost)
+
+    start = time.monotonic()
+    recipients = peer.broadcast({"type": "REQUEST", "ts": 1})
+    elapsed = time.monotonic() - start
+
+    assert sorted(recipients) == ["B", "C", "D"]
+    assert elapsed < 0.6
+    assert len(set(pool.frames)) == 1
+
+
+def test_broadcast_drops_dead_nodes():
+    """I nodi irraggiungibili vengono rimossi e segnalati con on_peer_disconnect"""
+    lost = []
+    pool = SlowPool({}, dead={3})
+    peer = make_peer(pool, lost)
+    peer.directory_version = 7
+
+    recipients = peer.broadcast({"type": "REQUEST", "ts": 1})
+
+    assert sorted(recipients) == ["B", "D"]
+    assert lost == ["C"]
+    assert "C" not in peer.get_known_peers()
+    # Forces a full directory on the next SYNC, so C comes back if it is alive.
+    assert peer.directory_version == 0
+
+
+def test_directory_deltas_apply_in_order():
+    """I delta della directory si applicano solo se contigui alla versione locale"""
+    peer = Peer("A", "127.0.0.1", 0, lambda msg: None)
+    peer.update_directory({"A": {"host": "127.0.0.1", "port": 1}}, version=1)
+
+    assert peer.update_directory(version=3, base=1, joined={"B": {"host": "127.0.0.1", "port": 2}})
+    assert peer.update_directory(version=2, base=1, left=["A"])
+    assert sorted(peer.get_known_peers()) == ["A", "B"]
+
+    assert not peer.update_directory(version=5, base=4, left=["B"])
+    assert peer.update_directory(version=4, base=3, left=["B"])
+    assert peer.get_known_peers() == ["A"] and peer.directory_version == 4
+    peer.stop()
+
+
+def test_directory_leave_reports_lost_peer():
+    """Un leave ricevuto dal NameServer notifica la perdita del peer"""
+    lost = []
+    peer = Peer("A", "127.0.0.1", 0, lambda msg: None, on_peer_disconnect=lost.append)
+    peer.update_directory({"A": {"host": "127.0.0.1", "port": 1}, "B": {"host": "127.0.0.1", "port": 2}}, version=1)
+
+    peer.update_directory(version=2, base=1, left=["B", "C"])
+    assert lost == ["B"]
+    peer.stop()
+
+
+def test_message_waits_for_unknown_address():
+    """Un messaggio per un nodo non ancora in directory parte appena l'indirizzo e' noto"""
+    pool = SlowPool({})
+    pool.retain = lambda addresses: None
+    peer = Peer("A", "127.0.0.1", 0, lambda msg: None)
+    peer._pool = pool
+
+    peer.send_to_node("B", {"type": "STATE_DELTA", "events": []})
+    assert pool.frames == []
+
+    peer.update_directory({"B": {"host": "127.0.0.1", "port": 2}}, version=1)
+    time.sleep(0.1)
+    assert len(pool.frames) == 1
+
+
+def test_only_state_transfer_waits_for_an_address():
+    """Permessi e token per nodi sconosciuti vengono scartati; i messaggi in attesa di un nodo perso pure"""
+    pool = SlowPool({})
+    pool.retain = lambda addresses: None
+    peer = Peer("A", "127.0.0.1", 0, lambda msg: None)
+    peer._pool = pool
+
+    peer.send_to_node("B", {"type": "REPLY", "ts": 3})
+    peer.send_to_node("C", {"type": "STATE_REPLY", "seats": []})
+    peer.send_to_node("D", {"type": "STATE_REPLY", "seats": []})
+    peer.update_directory({"A": {"host": "127.0.0.1", "port": 1}}, version=1)
+    peer.update_directory(version=2, base=1, left=["D"])
+
+    peer.update_directory(version=3, base=2, joined={pid: {"host": "127.0.0.1", "port": port} for pid, port in (("B", 2), ("C", 3), ("D", 4))})
+    time.sleep(0.1)
+    assert len(pool.frames) == 1 and b"STATE_REPLY" in pool.frames[0]
+
+
+def test_handler_error_keeps_later_frames():
+    """Un'eccezione nel gestore di un messaggio non scarta i messaggi successivi letti insieme"""
+    received = []
+
+    def handle(msg):
+        if msg["seat_id"] == 99:
+            raise IndexError("seat index out of range")
+        received.append(msg["seat_id"])
+
+    peer = Peer("A", "127.0.0.1", 0, handle)
+    decoder = FrameDecoder()
+    decoder.feed(b"".join(PacketProtocol.serialize({"type": "SEAT_TAKEN", "seat_id": s}) for s in (1, 99, 2)))
+    peer._dispatch_frames(decoder)
+    assert received == [1, 2]
+    peer.stop()
@@ -1,7 +1,9 @@
 import pytest
 import json
 import struct
-from src.common.protocol import PacketProtocol
+import socket
+from src.common.protocol import PacketProtocol, FrameDecoder, FrameTooLarge, MalformedFrame
+from src.common.codec import CODEC_BINARY
 
 def test_serialize_message():
     """Verifica che un dizionario venga convertito in bytes con header di 4 byte"""
@@ -60,4 +62,99 @@ def test_deserialize_multiple_packets():
     
     result2, remainder2 = PacketProtocol.deserialize(remainder1)
     assert result2 == msg2
-    assert remainder2 == b""
\ No newline at end of file
+    assert remainder2 == b""
+
+def test_decoder_chunked_stream():
+    """Il decoder ricompone frame spezzati in chunk piccoli e frame multipli"""
+    messages = [{"id": i, "seats": [None] * 50} for i in range(20)]
+    stream = b"".join(PacketProtocol.serialize(m) for m in messages)
+
+    decoder = FrameDecoder()
+    decoded = []
+    for i in range(0, len(stream), 7):
+        decoder.feed(stream[i:i + 7])
+        decoded.extend(decoder.frames())
+
+    assert decoded == messages
+    assert len(decoder) == 0
+
+def test_decoder_recv_into():
+    """recv_into legge direttamente dal socket nel buffer del decoder"""
+    a, b = socket.socketpair()
+    message = {"type": "STATE_REPLY", "seats": ["node"] * 5000}
+    a.sendall(PacketProtocol.serialize(message) * 2)
+    a.close()
+
+    decoder = FrameDecoder()
+    decoded = []
+    while decoder.recv_into(b):
+        decoded.extend(decoder.frames())
+    b.close()
+
+    assert decoded == [message, message]
+
+def test_decoder_rejects_oversized_header():
+    """Un header con lunghezza oltre il limite solleva FrameTooLarge"""
+    decoder = FrameDecoder(max_frame_size=1024)
+    decoder.feed(struct.pack('>I', 4096) + b"{}")
+
+    with pytest.raises(FrameTooLarge):
+        list(decoder.frames())
+
+def test_decoder_skips_malformed_frame():
+    """Un payload JSON non valido viene segnalato e il frame successivo resta leggibile"""
+    bad = b"{not json"
+    decoder = FrameDecoder()
+    decoder.feed(struct.pack('>I', len(bad)) + bad + PacketProtocol.serialize({"id": 2}))
+
+    with pytest.raises(MalformedFrame):
+        list(decoder.frames())
+    assert list(decoder.frames()) == [{"id": 2}]
+
+def test_deserialize_malformed_raises():
+    """deserialize non restituisce più (None, buffer) per un payload corrotto"""
+    bad = b"\xff\xfe"
+    with pytest.raises(MalformedFrame):
+        PacketProtocol.deserialize(struct.pack('>I', len(bad)) + bad)
+
+def test_binary_codec_roundtrip():
+    """I messaggi RA e lo stato dei posti passano dal codec binario senza perdite"""
+    messages = [
+        {"type": "REQUEST", "sender": "Luca", "ts": 42},
+        {"type": "REPLY", "sender": "Marco", "ts": 43},
+        {"type": "SEAT_TAKEN", "seat_id": 7, "seat_owner": "Luca", "ts": 44, "sender": "Luca"},
+        {"type": "SEAT_FREED", "seat_id": 7, "sender": "Luca", "ts": 45},
+        {"type": "STATE_REPLY", "seats": ["Luca", None, "Marco", "Luca"], "sender": "Marco"},
+    ]
+    decoder = FrameDecoder()
+    for message in messages:
+        data = PacketProtocol.serialize(message, CODEC_BINARY)
+        assert data[0] == CODEC_BINARY
+        assert len(data) < len(PacketProtocol.serialize(message))
+        decoder.feed(data)
+
+    assert list(decoder.frames()) == messages
+
+def test_binary_codec_falls_back_to_json():
+    """Un messaggio senza layout binario viene inviato in JSON, leggibile dai peer legacy"""
+    message = {"type": "SYNC", "peers": {}}
+    data = PacketProtocol.serialize(message, CODEC_BINARY)
+
+    assert data == PacketProtocol.serialize(message)
+    assert PacketProtocol.deserialize(data) == (message, b"")
+
+    batch = {"type": "REQUEST", "sender": "Luca", "ts": 3, "resource": ["seat:1", "seat:2"]}
+    assert PacketProtocol.serialize(batch, CODEC_BINARY) == PacketProtocol.serialize(batch)
+
+def test_decoder_unpacks_batch_frames():
+    """Un frame batch restituisce i messaggi contenuti nell'ordine di invio"""
+    frames = [
+        PacketProtocol.serialize({"type": "SEAT_TAKEN", "seat_id": 3, "sender": "A", "ts": 7}, CODEC_BINARY),
+        PacketProtocol.serialize({"type": "REPLY", "sender": "A", "ts": 8}),
+    ]
+    batched = PacketProtocol.batch(frames)
+    assert len(batched) == 1
+
+    decoder = FrameDecoder()
+    decoder.feed(batched[0] + frames[1])
+    assert [m["type"] for m in decoder.frames()] == ["SEAT_TAKEN", "REPLY", "REPLY"]
@@ -1,79 +1,91 @@
-import threading
-import time
-import logging
+import os
+import subprocess
+import sys
+import pytest
 from src.node.algorithm import RicartAgrawala
-from src.common.models import LamportClock
+from src.node.mutex import ALGORITHMS
+from src.simulation.network import Simulator, FixedLatency, CrashModel
+from src.simulation.scenarios import ContentionScenario
 
-logging.basicConfig(level=logging.INFO, format='%(message)s')
 
-class MockTransport:
-    def __init__(self, my_id, network_bus):
-        self.my_id = my_id
-        self.bus = network_bus 
+def test_simultaneous_click():
+    """Due click simultanei: entra prima il nodo con ID minore (tie-breaker), poi l'altro"""
+    sim = Simulator(seed=1, latency=FixedLatency(0.001))
+    results = []
 
-    def broadcast(self, msg, exclude_self=True):
-        targets = []
-        for pid, algo in self.bus.items():
-            if pid != self.my_id:
-                threading.Thread(target=algo.handle_message, args=(msg,)).start()
-                targets.append(pid)
-        return targets
+    def click(node_id):
+        algo = sim.nodes[node_id]
 
-    def send_to_node(self, target_id, msg):
-        if target_id in self.bus:
-            threading.Thread(target=self.bus[target_id].handle_message, args=(msg,)).start()
+        def on_win():
+            results.append(node_id)
+            sim.schedule(0.5, algo.release_critical_section)
+        algo.request_critical_section(on_win)
 
-def test_simultaneous_click():
-    print("\n--- SIMULAZIONE CLICK SIMULTANEO ---")
-    
-    network_bus = {}
-    results = []
-    
-    clock1 = LamportClock()
-    clock2 = LamportClock()
-    
-    get_peers = lambda: list(network_bus.keys())
-    
-    algo_luca = RicartAgrawala("Luca", clock1, get_peers, None)
-    algo_marco = RicartAgrawala("Marco", clock2, get_peers, None)
-    
-    algo_luca.transport = MockTransport("Luca", network_bus)
-    algo_marco.transport = MockTransport("Marco", network_bus)
-    
-    network_bus["Luca"] = algo_luca
-    network_bus["Marco"] = algo_marco
-    
-
-    def on_luca_win():
-        print(f"LUCA è entrato nella Sezione Critica! (Clock: {algo_luca.clock.value})")
-        results.append("Luca")
-        time.sleep(0.5) 
-        algo_luca.release_critical_section()
-        
-    def on_marco_win():
-        print(f"MARCO è entrato nella Sezione Critica! (Clock: {algo_marco.clock.value})")
-        results.append("Marco")
-        time.sleep(0.5)
-        algo_marco.release_critical_section()
-
-    print(">>> CLICK SIMULTANEO SU ENTRAMBI I NODI...")
-    t1 = threading.Thread(target=algo_luca.request_critical_section, args=(on_luca_win,))
-    t2 = threading.Thread(target=algo_marco.request_critical_section, args=(on_marco_win,))
-    
-    t1.start()
-    t2.start()
-    
-    t1.join()
-    t2.join()
-    
-    time.sleep(2)
-    
-    print(f"\nOrdine di accesso reale: {results}")
-    
-    if results == ["Luca", "Marco"]:
-        print("TEST SUPERATO: Luca ha vinto per priorità ID (Tie-breaker corretto).")
-    else:
-        print("TEST FALLITO: Ordine errato.")
-
-if __name__ == "__main__":
-    test_simultaneous_click()
\ No newline at end of file
+    for node_id in ("Luca", "Marco"):
+        sim.add_node(node_id, RicartAgrawala)
+    sim.schedule(0.0, click, "Luca")
+    sim.schedule(0.0, click, "Marco")
+
+    assert sim.run()
+    assert results == ["Luca", "Marco"]
+
+
+@pytest.mark.parametrize("algorithm", sorted(ALGORITHMS))
+def test_contention_is_safe_and_live(algorithm):
+    """Su molti scenari con seed diversi nessun posto ha due HOLDer e ogni richiesta viene servita"""
+    scenario = ContentionScenario(algorithm, nodes=6, seats=3, batch_probability=0.3)
+    for seed in range(150):
+        outcome = scenario.run(seed)
+        assert outcome.safe, outcome
+        assert outcome.live, outcome
+        assert outcome.entries == 6 * 4
+
+
+@pytest.mark.parametrize("algorithm", sorted(ALGORITHMS))
+def test_crashes_do_not_block_survivors(algorithm):
+    """Un nodo che cade viene rilevato e i sopravvissuti completano le loro richieste"""
+    scenario = ContentionScenario(algorithm, crashes=CrashModel(0.5, horizon=0.02))
+    crashed = 0
+    for seed in range(60):
+        outcome = scenario.run(seed)
+        crashed += bool(outcome.crashed)
+        assert outcome.safe, outcome
+        assert outcome.live, outcome
+    assert crashed
+
+
+def test_same_seed_same_run():
+    """Lo stesso seed riproduce esattamente la stessa sequenza di eventi"""
+    scenario = ContentionScenario("maekawa", nodes=5)
+    first, second = scenario.run(7, trace=True), scenario.run(7, trace=True)
+
+    assert first.trace == second.trace
+    assert first.trace != scenario.run(8, trace=True).trace
+
+
+REPLAY = """
+import hashlib
+from src.simulation.network import CrashModel
+from src.simulation.scenarios import ContentionScenario
+for algorithm in ("ricart-agrawala", "maekawa", "suzuki-kasami"):
+    trace = ContentionScenario(algorithm, nodes=6, crashes=CrashModel(0.5, horizon=0.02)).run(4, trace=True).trace
+    print(hashlib.sha256(repr(trace).encode()).hexdigest())
+"""
+
+
+def test_same_seed_same_run_across_processes():
+    """Lo stesso seed riproduce la stessa esecuzione anche con un PYTHONHASHSEED diverso"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    runs = set()
+    for hash_seed in ("1", "2", "3"):
+        env = dict(os.environ, PYTHONHASHSEED=hash_seed, PYTHONPATH=root)
+        runs.add(subprocess.run([sys.executable, "-c", REPLAY], env=env, cwd=root, capture_output=True, text=True, check=True).stdout)
+    assert len(runs) == 1
+
+
+def test_hundreds_of_nodes():
+    """Il simulatore regge centinaia di istanze dell'algoritmo"""
+    scenario = ContentionScenario("suzuki-kasami", nodes=200, seats=20, requests_per_node=1)
+    outcome = scenario.run(3)
+    assert outcome.safe and outcome.live
+    assert outcome.entries == 200
@@ -0,0 +1,119 @@
+import threading
+import pytest
+from src.node.algorithm import MutualExclusion, RicartAgrawala, State
+from src.common.models import LamportClock
+
+
+class BusTransport:
+    def __init__(self, my_id, bus):
+        self.my_id = my_id
+        self.bus = bus
+        self.sent = []
+
+    def broadcast(self, msg, exclude_self=True, targets=None):
+        targets = [pid for pid in self.bus if pid != self.my_id and (targets is None or pid in targets)]
+        for pid in targets:
+            self.sent.append((pid, msg["type"]))
+            threading.Thread(target=self.bus[pid].handle_message, args=(dict(msg),)).start()
+        return targets
+
+    def send_to_node(self, target_id, msg):
+        self.sent.append((target_id, msg["type"]))
+        threading.Thread(target=self.bus[target_id].handle_message, args=(dict(msg),)).start()
+
+
+def make_cluster(ids):
+    bus = {}
+    for node_id in ids:
+        algo = RicartAgrawala(node_id, LamportClock(), lambda: list(bus.keys()), None)
+        algo.transport = BusTransport(node_id, bus)
+        bus[node_id] = algo
+    return bus
+
+
+def test_disjoint_seats_run_in_parallel():
+    """Posti diversi hanno sezioni critiche indipendenti"""
+    bus = make_cluster(["A", "B", "C"])
+    a_in, b_in = threading.Event(), threading.Event()
+
+    bus["A"].request_critical_section(a_in.set, "seat:1")
+    assert a_in.wait(2)
+
+    bus["B"].request_critical_section(b_in.set, "seat:2")
+    assert b_in.wait(2)
+    assert bus["A"].state_of("seat:1") == State.HELD
+
+    bus["A"].release_critical_section("seat:1")
+    bus["B"].release_critical_section("seat:2")
+
+
+def test_same_seat_serializes():
+    """Lo stesso posto resta in mutua esclusione finché il possessore non rilascia"""
+    bus = make_cluster(["A", "B", "C"])
+    a_in, b_in = threading.Event(), threading.Event()
+
+    bus["A"].request_critical_section(a_in.set, "seat:1")
+    assert a_in.wait(2)
+
+    bus["B"].request_critical_section(b_in.set, "seat:1")
+    assert not b_in.wait(0.3)
+    assert bus["B"].state_of("seat:1") == State.WANTED
+
+    bus["A"].release_critical_section("seat:1")
+    assert b_in.wait(2)
+    bus["B"].release_critical_section("seat:1")
+
+
+def test_batch_overlaps_single_seat():
+    """Una richiesta multi-posto entra una sola volta e blocca i posti che contiene"""
+    bus = make_cluster(["A", "B", "C"])
+    a_in, b_in, c_in = threading.Event(), threading.Event(), threading.Event()
+
+    bus["A"].request_critical_section(a_in.set, ["seat:1", "seat:2", "seat:3"])
+    assert a_in.wait(2)
+
+    bus["B"].request_critical_section(b_in.set, "seat:2")
+    bus["C"].request_critical_section(c_in.set, "seat:9")
+    assert c_in.wait(2)
+    assert not b_in.wait(0.3)
+
+    assert not bus["A"].request_critical_section(lambda: None, "seat:3")
+
+    bus["A"].release_critical_section(["seat:1", "seat:2", "seat:3"])
+    assert b_in.wait(2)
+
+
+def test_cached_permissions_skip_messages():
+    """Chi rientra senza richieste altrui non invia messaggi; chi ha chiesto va interpellato"""
+    bus = make_cluster(["A", "B", "C"])
+    entered = threading.Event()
+    bus["A"].request_critical_section(entered.set, "seat:1")
+    assert entered.wait(2)
+    bus["A"].release_critical_section("seat:1")
+
+    sent = len(bus["A"].transport.sent)
+    entered.clear()
+    bus["A"].request_critical_section(entered.set, "seat:1")
+    assert entered.wait(2)
+    bus["A"].release_critical_section("seat:1")
+    assert len(bus["A"].transport.sent) == sent
+
+    b_in = threading.Event()
+    bus["B"].request_critical_section(b_in.set, "seat:1")
+    assert b_in.wait(2)
+    bus["B"].release_critical_section("seat:1")
+
+    entered.clear()
+    bus["A"].request_critical_section(entered.set, "seat:1")
+    assert entered.wait(2)
+    assert bus["A"].transport.sent[-1] == ("B", "REQUEST")
+
+
+def test_algorithm_must_implement_the_whole_interface():
+    """Un algoritmo che non implementa tutta l'interfaccia di MutualExclusion non si può istanziare"""
+    class Partial(MutualExclusion):
+        def request_critical_section(self, callback, resource=None):
+            pass
+
+    with pytest.raises(TypeError):
+        Partial()
@@ -0,0 +1,90 @@
+import threading
+from src.node.changelog import SeatChangeLog
+from src.node.core import CinemaNode
+from src.node.screening import ShardTransport, parse_shard, DEFAULT_SHARD
+
+
+class DirectoryPeer:
+    def __init__(self, directory):
+        self.directory = directory
+        self.broadcasts = []
+        self.sent = []
+
+    def get_directory(self):
+        return dict(self.directory)
+
+    def broadcast(self, msg, exclude_self=True, targets=None, wait=True):
+        self.broadcasts.append((msg, targets))
+        return list(targets)
+
+    def send_to_node(self, target_id, msg):
+        self.sent.append((target_id, msg))
+
+
+def test_parse_shard():
+    """Le specifiche hall:screening[:posti] vengono interpretate correttamente"""
+    assert parse_shard("sala1:21h") == ("sala1:21h", 25)
+    assert parse_shard("sala1:21h:120") == ("sala1:21h", 120)
+
+
+def test_shard_broadcast_reaches_only_subscribers():
+    """I broadcast di una proiezione raggiungono solo i nodi che la servono"""
+    peer = DirectoryPeer({
+        "A": {"host": "h", "port": 1, "shards": ["sala1:21h", "sala2:18h"]},
+        "B": {"host": "h", "port": 2, "shards": ["sala2:18h"]},
+        "C": {"host": "h", "port": 3},
+    })
+    transport = ShardTransport(peer, "sala2:18h")
+    assert sorted(transport.subscribers()) == ["A", "B"]
+
+    transport.broadcast({"type": "REQUEST", "ts": 1})
+    msg, targets = peer.broadcasts[0]
+    assert msg["shard"] == "sala2:18h" and sorted(targets) == ["A", "B"]
+
+    assert ShardTransport(peer, DEFAULT_SHARD).subscribers() == ["C"]
+
+
+def test_applied_snapshot_is_not_served_as_delta():
+    """Chi ha ricevuto uno snapshot completo non può rispondere con un delta vuoto a chi parte da zero"""
+    a, b = CinemaNode("A", 0, hold_time=0.0), CinemaNode("B", 0, hold_time=0.0)
+    source = a.screening()
+    source.changelog = SeatChangeLog(capacity=2)
+    with source._state_lock:
+        for ts, seat_id in enumerate([1, 2, 3, 4], start=1):
+            source.record_change(ts, "A", [seat_id], "A")
+    assert source.changelog.since({}) is None
+
+    sent = []
+    source.transport.send_to_node = lambda target_id, msg: sent.append(msg)
+    source._answer_state_request("B", None)
+    b.on_network_message(sent[0])
+
+    assert list(b.seats)[:5] == [None, "A", "A", "A", "A"]
+    assert b.screening().changelog.since({}) is None
+
+
+def test_click_on_a_seat_in_flight_joins_its_round():
+    """Un click su un posto già richiesto entra nello stesso round, uno su un altro posto parte in parallelo"""
+    node = CinemaNode("A", 0, hold_time=0.0)
+    requests = []
+    requested = threading.Semaphore(0)
+
+    class Gate:
+        def request_critical_section(self, callback, resource=None):
+            requests.append((resource, callback))
+            requested.release()
+            return True
+
+        def release_critical_section(self, resource=None):
+            pass
+
+    node.screening().bookings.algo = Gate()
+    assert node.reserve_seats([3])
+    assert requested.acquire(timeout=2)
+    assert node.release_seats([3]) and node.reserve_seats([4])
+    assert requested.acquire(timeout=2)
+    assert len(requests) == 2
+
+    for _, enter in requests:
+        enter()
+    assert node.seats[3] is None and node.seats[4] == "A"
@@ -0,0 +1,46 @@
+from src.common.seatmap import SeatMap, NO_VERSION
+
+
+def test_set_and_lookup():
+    """Assegnazione e lettura dei posti con conteggio dei liberi"""
+    seats = SeatMap(30)
+    assert seats.free_count() == 30
+    assert seats[3] is None
+
+    seats[3] = "Luca"
+    seats.set(17, "Marco", (5, "Marco"))
+    seats[20] = "Luca"
+
+    assert seats[3] == "Luca"
+    assert seats.version(17) == (5, "Marco")
+    assert seats.version(3) == NO_VERSION
+    assert seats.free_count() == 27
+    assert 17 not in set(seats.free_seats())
+    assert seats.owned_by("Luca") == [3, 20]
+
+    seats[3] = None
+    assert seats.free_count() == 28
+    assert seats.is_free(3)
+
+
+def test_free_seats_bitmap():
+    """La bitmap dei posti liberi elenca solo posti esistenti"""
+    seats = SeatMap(10)
+    for seat_id in range(0, 10, 2):
+        seats[seat_id] = "Luca"
+
+    assert list(seats.free_seats()) == [1, 3, 5, 7, 9]
+
+
+def test_bytes_roundtrip():
+    """La serializzazione compatta conserva proprietari e versioni"""
+    seats = SeatMap(5000)
+    for seat_id in range(0, 5000, 7):
+        seats.set(seat_id, f"node-{seat_id % 13}", (seat_id + 1, f"node-{seat_id % 13}"))
+
+    restored = SeatMap.from_bytes(seats.to_bytes())
+
+    assert list(restored) == list(seats)
+    assert restored.free_count() == seats.free_count()
+    assert restored.version(7) == (8, "node-7")
+    assert list(restored.free_seats()) == list(seats.free_seats())
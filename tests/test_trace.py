@@ -0,0 +1,63 @@
+from src.analysis.critical_path import reconstruct, summarize
+from src.common.trace import TraceRecorder, TraceEvent, read_trace, trace_key, SEND, RECV, STATE
+from src.node.core import CinemaNode
+
+
+def test_recorder_round_trip(tmp_path):
+    """Gli eventi scritti dal recorder si rileggono identici, stringhe comprese"""
+    path = tmp_path / "A.trace"
+    recorder = TraceRecorder("A", str(path))
+    recorder.message(SEND, {"type": "REQUEST", "ts": 7, "shard": "sala1:21h", "resource": [4, 3]}, "B")
+    recorder.message(RECV, {"type": "REPLY", "ts": 9, "shard": "sala1:21h", "resource": [3, 4]}, "B")
+    recorder.for_shard("sala1:21h").state("HELD", 7, (3, 4))
+    recorder.close()
+
+    events = read_trace(str(path))
+    assert [(e.node, e.kind, e.ts, e.type, e.peer, e.resource) for e in events] == [
+        ("A", SEND, 7, "REQUEST", "B", "sala1:21h|3,4"),
+        ("A", RECV, 9, "REPLY", "B", "sala1:21h|3,4"),
+        ("A", STATE, 7, "HELD", "", "sala1:21h|3,4"),
+    ]
+    assert events[0].wall <= events[1].wall <= events[2].wall
+
+
+def test_node_traces_its_rounds(tmp_path):
+    """Un nodo con trace_dir registra WANTED, HELD e RELEASED per ogni prenotazione"""
+    node = CinemaNode("A", 0, shards=["sala1:21h:10"], hold_time=0.0, trace_dir=str(tmp_path))
+    assert node.reserve([1])
+    node.tracer.close()
+
+    states = [e.type for e in read_trace(str(tmp_path / "A.trace")) if e.kind == STATE]
+    assert states == ["WANTED", "HELD", "RELEASED"]
+
+
+def test_slowest_responder_and_queueing():
+    """L'analisi ricostruisce il round e attribuisce l'attesa a chi ha differito la REPLY"""
+    key = trace_key("sala1:21h", 5)
+    events = [
+        TraceEvent("A", STATE, 10, 0.000, "WANTED", "", key),
+        TraceEvent("A", SEND, 10, 0.001, "REQUEST", "B", key),
+        TraceEvent("A", SEND, 10, 0.001, "REQUEST", "C", key),
+        TraceEvent("B", RECV, 10, 0.002, "REQUEST", "A", key),
+        TraceEvent("B", SEND, 11, 0.003, "REPLY", "A", key),
+        TraceEvent("C", STATE, 8, 0.0015, "HELD", "", key),
+        TraceEvent("C", RECV, 10, 0.002, "REQUEST", "A", key),
+        TraceEvent("A", RECV, 11, 0.004, "REPLY", "B", key),
+        TraceEvent("C", STATE, 8, 0.050, "RELEASED", "", key),
+        TraceEvent("C", SEND, 12, 0.050, "REPLY", "A", key),
+        TraceEvent("A", RECV, 12, 0.051, "REPLY", "C", key),
+        TraceEvent("A", STATE, 10, 0.051, "HELD", "", key),
+        TraceEvent("A", STATE, 10, 0.060, "RELEASED", "", key),
+    ]
+    rounds = [r for r in reconstruct(events) if r.node == "A"]
+    assert len(rounds) == 1
+    r = rounds[0].to_dict()
+    assert r["wait_ms"] == 51.0 and r["slowest"] == "C"
+
+    hops = {h["responder"]: h for h in r["responders"]}
+    assert hops["C"]["queueing_ms"] == 48.0 and hops["C"]["network_ms"] == 2.0
+    assert hops["C"]["blocked_by"] == f"HELD {key}"
+    assert hops["B"]["queueing_ms"] == 1.0 and hops["B"]["blocked_by"] is None
+
+    summary = summarize(reconstruct(events))
+    assert summary["slowest_responder_counts"] == {"C": 1}